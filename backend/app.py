@@ -2,53 +2,201 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import random
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from email.utils import formatdate, parsedate_to_datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 
-from backend.config import ensure_runtime_dirs, get_app_config
+from backend.config import AppConfig, ensure_runtime_dirs, get_app_config
 from backend.schemas import ChatRequest, FileSaveRequest
-from backend.services.agent_service import AgentService
-from backend.services.file_service import FileService, PathSecurityError
-from backend.services.knowledge_service import KnowledgeService
+from backend.services.file_service import FileService, PathSecurityError, UploadTooLargeError, WriteConflictError
+from backend.services.knowledge_ingest import KNOWLEDGE_SUFFIXES
+from backend.services.memory_store import MemoryStore
+from backend.services.profiling import ProfileStore, profiled
 from backend.services.prompt_service import PromptService
 from backend.services.session_service import SessionService
 from backend.services.skill_service import SkillService
-from backend.tools import build_core_tools
+from backend.services.token_budget import get_tokenizer
+from backend.services.write_coalescer import WriteCoalescer
+
+if TYPE_CHECKING:
+    from backend.services.agent_service import AgentService
+    from backend.services.knowledge_service import KnowledgeService
+    from backend.services.python_pool import PythonWorkerPool
+    from backend.tools.output_compression import ToolOutputStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+KNOWLEDGE_MAX_UPLOAD_BYTES = int(os.getenv("KNOWLEDGE_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+FILE_SAVE_COALESCE_MS = int(os.getenv("FILE_SAVE_COALESCE_MS", "500"))
+SKILLS_TOP_K = int(os.getenv("SKILLS_TOP_K", "12"))
+SKILLS_ALWAYS_INCLUDE = tuple(
+    name.strip() for name in os.getenv("SKILLS_ALWAYS_INCLUDE", "").split(",") if name.strip()
+)
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))
+TOOL_OUTPUT_COMPRESSION = os.getenv("TOOL_OUTPUT_COMPRESSION", "1").lower() not in {"0", "false", "no"}
+HISTORY_TOOL_CALLS = os.getenv("HISTORY_TOOL_CALLS", "1").lower() not in {"0", "false", "no"}
+SKILLS_WATCH = os.getenv("SKILLS_WATCH", "1").lower() not in {"0", "false", "no"}
+# Share of chat turns profiled without the X-Profile header, in percent.
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))
+# Lets clients ask for a profile with X-Profile; enable only on development servers.
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER", "0").lower() not in {"0", "false", "no"}
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+
+class AppServices:
+    """Services and tools, each built on first use.
+
+    LangChain, LlamaIndex and the tool modules are imported inside the
+    properties so that importing the app (tests, uvicorn workers, spawned
+    pool processes) stays cheap.
+    """
+
+    def __init__(self, config: AppConfig) -> None:
+        self.config = config
+
+    @cached_property
+    def file_service(self) -> FileService:
+        return FileService(root_dir=self.config.root_dir)
+
+    @cached_property
+    def write_coalescer(self) -> WriteCoalescer:
+        return WriteCoalescer(self.file_service, window_seconds=FILE_SAVE_COALESCE_MS / 1000.0)
+
+    @cached_property
+    def skill_service(self) -> SkillService:
+        return SkillService(
+            skills_dir=self.config.skills_dir,
+            workspace_dir=self.config.workspace_dir,
+            root_dir=self.config.root_dir,
+            top_k=SKILLS_TOP_K,
+            always_include=SKILLS_ALWAYS_INCLUDE,
+        )
+
+    @cached_property
+    def prompt_service(self) -> PromptService:
+        return PromptService(workspace_dir=self.config.workspace_dir, memory_file=self.config.memory_file)
+
+    @cached_property
+    def memory_store(self) -> MemoryStore:
+        return MemoryStore(
+            memory_file=self.config.memory_file,
+            logs_dir=self.config.memory_file.parent / "logs",
+            token_budget=MEMORY_TOKEN_BUDGET,
+            count_tokens=lambda text: get_tokenizer().count(text),
+        )
+
+    @cached_property
+    def session_service(self) -> SessionService:
+        return SessionService(sessions_dir=self.config.sessions_dir)
+
+    @cached_property
+    def profile_store(self) -> ProfileStore:
+        return ProfileStore(self.config.tmp_dir / "profiles")
+
+    @cached_property
+    def knowledge_service(self) -> KnowledgeService:
+        from backend.services.knowledge_service import KnowledgeService
+
+        return KnowledgeService(
+            knowledge_dir=self.config.knowledge_dir,
+            storage_dir=self.config.storage_dir,
+            model_settings=self.config.model,
+        )
+
+    @cached_property
+    def python_pool(self) -> PythonWorkerPool:
+        from backend.tools.python_tool import create_python_pool
+
+        return create_python_pool()
+
+    @cached_property
+    def tool_output_store(self) -> ToolOutputStore:
+        # Always on: history tool results point at read_tool_output even when
+        # compression is off.
+        from backend.tools.output_compression import ToolOutputStore
+
+        return ToolOutputStore(self.session_service.blob_store)
+
+    @cached_property
+    def core_tools(self) -> list[Any]:
+        from backend.tools import build_core_tools
+
+        return build_core_tools(
+            root_dir=self.config.root_dir,
+            knowledge_service=self.knowledge_service,
+            fetch_cache_dir=self.config.tmp_dir / "http_cache",
+            python_pool=self.python_pool,
+            output_store=self.tool_output_store,
+        )
+
+    @cached_property
+    def agent_service(self) -> AgentService:
+        from backend.services.agent_service import AgentService
+
+        return AgentService(
+            model_settings=self.config.model,
+            prompt_service=self.prompt_service,
+            skill_service=self.skill_service,
+            session_service=self.session_service,
+            tools=self.core_tools,
+            memory_store=self.memory_store,
+            middleware=self._agent_middleware(),
+            history_tools=HISTORY_TOOL_CALLS,
+        )
+
+    def _agent_middleware(self) -> list[Any]:
+        if not TOOL_OUTPUT_COMPRESSION:
+            return []
+        from backend.tools.output_compression import ToolOutputCompressionMiddleware
+
+        return [ToolOutputCompressionMiddleware(self.tool_output_store)]
+
+    def close(self) -> None:
+        if "skill_service" in self.__dict__:
+            self.skill_service.stop_watching()
+        if "python_pool" in self.__dict__:
+            self.python_pool.close()
+
+
 config = get_app_config()
 ensure_runtime_dirs(config)
-
-file_service = FileService(root_dir=config.root_dir)
-skill_service = SkillService(skills_dir=config.skills_dir, workspace_dir=config.workspace_dir, root_dir=config.root_dir)
-prompt_service = PromptService(workspace_dir=config.workspace_dir, memory_file=config.memory_file)
-session_service = SessionService(sessions_dir=config.sessions_dir)
-knowledge_service = KnowledgeService(
-    knowledge_dir=config.knowledge_dir,
-    storage_dir=config.storage_dir,
-    model_settings=config.model,
-)
-core_tools = build_core_tools(root_dir=config.root_dir, knowledge_service=knowledge_service)
-agent_service = AgentService(
-    model_settings=config.model,
-    prompt_service=prompt_service,
-    skill_service=skill_service,
-    session_service=session_service,
-    tools=core_tools,
+services = AppServices(config)
+_SERVICE_NAMES = frozenset(
+    name for name, value in vars(AppServices).items() if isinstance(value, cached_property)
 )
 
+
+def __getattr__(name: str) -> Any:
+    # Keeps ``backend.app.agent_service`` and friends working without eager construction.
+    if name in _SERVICE_NAMES:
+        return getattr(services, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    skill_service.refresh_snapshot()
-    knowledge_service.initialize()
+    if SKILLS_WATCH:
+        services.skill_service.start_watching()
+    services.skill_service.refresh_snapshot()
+    gc = services.session_service.gc_blobs()
+    if gc.removed:
+        logger.info("Removed %s unreferenced session blobs (%s bytes)", gc.removed, gc.freed_bytes)
+    # Workers import their preload modules in the background while the index loads.
+    services.python_pool.start()
+    services.knowledge_service.initialize()
     logger.info("Backend initialized. root_dir=%s", config.root_dir)
     yield
+    services.close()
 
 
 app = FastAPI(title="mini-openclaw-backend", version="0.1.0", lifespan=lifespan)
@@ -58,6 +206,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Content-Range", "Accept-Ranges", "X-Profile-Id"],
 )
 
 
@@ -72,56 +221,183 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+def _should_profile(header: str | None) -> bool:
+    if header is not None and PROFILE_ALLOW_HEADER:
+        return header.strip().lower() not in {"", "0", "false", "no"}
+    return PROFILE_SAMPLE_PERCENT > 0 and random.random() * 100.0 < PROFILE_SAMPLE_PERCENT
+
+
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
-    async def event_stream() -> AsyncIterator[str]:
-        async for payload in agent_service.stream_chat(
-            message=request.message,
-            session_id=request.session_id,
-        ):
-            yield _sse(payload)
+async def chat(request: ChatRequest, x_profile: str | None = Header(default=None)):
+    events = services.agent_service.stream_chat(message=request.message, session_id=request.session_id)
+    headers: dict[str, str] = {}
+    if _should_profile(x_profile):
+        profile_id = ProfileStore.new_id()
+        headers["X-Profile-Id"] = profile_id
+        meta = {"session_id": request.session_id, "stream": request.stream}
+        events = profiled(events, services.profile_store, profile_id, meta, interval=PROFILE_INTERVAL_MS / 1000.0)
 
     if request.stream:
-        return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-    events = []
-    async for payload in agent_service.stream_chat(message=request.message, session_id=request.session_id):
-        events.append(payload)
-    return JSONResponse({"events": events})
+        async def event_stream() -> AsyncIterator[str]:
+            async for payload in events:
+                yield _sse(payload)
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+    collected = [payload async for payload in events]
+    return JSONResponse({"events": collected}, headers=headers)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [item.strip() for item in header.split(",")]
+    return "*" in candidates or etag in (item.removeprefix("W/") for item in candidates)
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and int(mtime) <= since.timestamp()
 
 
 @app.get("/api/files")
-async def get_file(path: str = Query(..., description="backend relative path, e.g. memory/MEMORY.md")):
+async def get_file(
+    request: Request,
+    path: str = Query(..., description="backend relative path, e.g. memory/MEMORY.md"),
+    raw: bool = Query(False, description="stream the file bytes instead of JSON; Range requests imply raw"),
+):
     try:
-        content = file_service.read_text(path)
-        return {"path": path, "content": content}
+        target, stat_result = services.file_service.stat(path)
     except PathSecurityError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except FileNotFoundError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
 
+    etag = services.file_service.etag_for(stat_result)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if raw or request.headers.get("range"):
+        # FileResponse streams in chunks and answers Range / If-Range itself.
+        return FileResponse(target, stat_result=stat_result, headers=headers)
+
+    try:
+        content = await run_in_threadpool(target.read_text, encoding="utf-8")
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=415, detail="file is not UTF-8 text; request it with raw=true") from exc
+    return JSONResponse({"path": path, "content": content, "etag": etag}, headers=headers)
+
 
 @app.post("/api/files")
 async def save_file(payload: FileSaveRequest):
     try:
-        file_service.write_text(payload.path, payload.content)
-        return {"ok": True, "path": payload.path}
+        etag = await services.write_coalescer.write_text(payload.path, payload.content, payload.base_etag)
+    except PathSecurityError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except WriteConflictError as exc:
+        return JSONResponse(
+            {"detail": str(exc), "etag": exc.current_etag},
+            status_code=409,
+            headers={"ETag": exc.current_etag} if exc.current_etag else None,
+        )
+    return JSONResponse({"ok": True, "path": payload.path, "etag": etag}, headers={"ETag": etag})
+
+
+def _knowledge_relative_path(path: str) -> str:
+    relative = f"knowledge/{path.strip().lstrip('/')}"
+    try:
+        services.file_service.resolve_safe_path(relative)
     except PathSecurityError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not relative.lower().endswith(KNOWLEDGE_SUFFIXES):
+        raise HTTPException(status_code=400, detail=f"unsupported document type; allowed: {', '.join(KNOWLEDGE_SUFFIXES)}")
+    return relative
+
+
+@app.get("/api/knowledge/documents")
+async def list_knowledge_documents():
+    documents = await run_in_threadpool(services.knowledge_service.list_documents)
+    return {"documents": documents}
+
+
+@app.post("/api/knowledge/documents")
+async def upload_knowledge_document(
+    request: Request,
+    path: str = Query(..., description="path under knowledge/, e.g. manuals/guide.md"),
+):
+    relative = _knowledge_relative_path(path)
+    started = time.perf_counter()
+    try:
+        size_bytes = await services.file_service.write_stream(
+            relative, request.stream(), max_bytes=KNOWLEDGE_MAX_UPLOAD_BYTES
+        )
+    except PathSecurityError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    upload_seconds = time.perf_counter() - started
+
+    target = services.file_service.resolve_safe_path(relative)
+    result = await run_in_threadpool(services.knowledge_service.add_document, target)
+    payload = {**result, "path": path, "size_bytes": size_bytes, "upload_seconds": upload_seconds}
+    if result.get("error"):
+        return JSONResponse(payload, status_code=422)
+    return payload
+
+
+@app.delete("/api/knowledge/documents")
+async def delete_knowledge_document(path: str = Query(..., description="path under knowledge/")):
+    relative = _knowledge_relative_path(path)
+    target = services.file_service.resolve_safe_path(relative)
+    existed = target.is_file()
+    if existed:
+        target.unlink()
+    removed_chunks = await run_in_threadpool(services.knowledge_service.remove_document, target)
+    if not existed and not removed_chunks:
+        raise HTTPException(status_code=404, detail=f"document not found: {path}")
+    return {"ok": True, "path": path, "removed_chunks": removed_chunks}
 
 
 @app.get("/api/sessions")
 async def list_sessions():
-    return {"sessions": session_service.list_sessions()}
+    return {"sessions": services.session_service.list_sessions()}
 
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
-    safe_id = session_service.normalize_session_id(session_id)
-    entries = session_service.load(safe_id)
+    safe_id = services.session_service.normalize_session_id(session_id)
+    entries = services.session_service.hydrate(services.session_service.load(safe_id))
     return {"session_id": safe_id, "entries": entries}
 
 
+@app.get("/api/debug/profiles")
+async def list_profiles():
+    return {"profiles": services.profile_store.list()}
+
+
+@app.get("/api/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    try:
+        path = services.profile_store.path_for(profile_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"profile not found: {profile_id}")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=path.name)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1 @@
+"""Offline benchmark suites for mini-openclaw backend."""
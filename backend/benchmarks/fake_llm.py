@@ -0,0 +1,193 @@
+"""Local stand-in for an OpenAI-compatible chat-completions API.
+
+Streams replies at a configurable time to first token and tokens per second,
+and can answer with scripted tool calls, so the backend can be load-tested
+offline. The script is a JSON list of steps; step ``n`` answers the ``n``-th
+model round of a turn (rounds after the last user message), and rounds past
+the end of the script get the plain text reply:
+
+    [{"tool_calls": [{"name": "read_file", "arguments": {"file_path": "memory/MEMORY.md"}}]},
+     {"content": "The memory file is short."}]
+
+    python -m backend.benchmarks.fake_llm --port 8787 --first-token-ms 300 --tps 40 --script script.json
+
+``/v1/embeddings`` answers with deterministic hashing vectors so the
+knowledge index can start against the same base URL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = (
+    "This is a canned reply from the local fake model. It streams a fixed paragraph at the configured "
+    "rate so that time to first token and streaming throughput can be measured without a provider."
+)
+
+
+@dataclass
+class FakeLLMConfig:
+    first_token_ms: float = 200.0
+    tokens_per_second: float = 50.0
+    reply: str = DEFAULT_REPLY
+    script: list[dict[str, Any]] = field(default_factory=list)
+    model: str = "fake-model"
+
+    @classmethod
+    def load_script(cls, path: Path) -> list[dict[str, Any]]:
+        steps = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(steps, list):
+            raise ValueError(f"{path}: a script is a JSON list of steps")
+        return steps
+
+
+def reply_tokens(text: str) -> list[str]:
+    """Word-sized pieces that re-join to ``text``."""
+    pieces = text.split(" ")
+    return [piece if index == 0 else f" {piece}" for index, piece in enumerate(pieces)]
+
+
+def script_step(config: FakeLLMConfig, messages: list[dict[str, Any]]) -> dict[str, Any]:
+    rounds = 0
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            break
+        if message.get("role") == "assistant" and message.get("tool_calls"):
+            rounds += 1
+    if rounds < len(config.script):
+        return config.script[rounds]
+    return {"content": config.reply}
+
+
+def _tool_calls(step: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        {
+            "index": index,
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments") or {})},
+        }
+        for index, call in enumerate(step.get("tool_calls") or [])
+    ]
+
+
+@lru_cache(maxsize=1)
+def _embedder() -> Any:
+    from backend.benchmarks.offline import HashEmbedding
+
+    return HashEmbedding()
+
+
+def create_fake_llm_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI(title="fake-openai")
+
+    def chunk(completion_id: str, delta: dict[str, Any], finish_reason: str | None = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": config.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def stream(step: dict[str, Any], include_usage: bool) -> AsyncIterator[str]:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        await asyncio.sleep(config.first_token_ms / 1000.0)
+        yield chunk(completion_id, {"role": "assistant", "content": ""})
+        tokens = reply_tokens(str(step.get("content") or ""))
+        for index, token in enumerate(tokens if step.get("content") else []):
+            if index:
+                await asyncio.sleep(interval)
+            yield chunk(completion_id, {"content": token})
+        calls = _tool_calls(step)
+        for call in calls:
+            yield chunk(completion_id, {"tool_calls": [call]})
+        yield chunk(completion_id, {}, "tool_calls" if calls else "stop")
+        if include_usage:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": config.model,
+                "choices": [],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            }
+            yield f"data: {json.dumps(payload)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.get("/v1/models")
+    async def models() -> dict[str, Any]:
+        return {"object": "list", "data": [{"id": config.model, "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        body = await request.json()
+        step = script_step(config, body.get("messages") or [])
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(stream(step, include_usage), media_type="text/event-stream")
+
+        await asyncio.sleep(config.first_token_ms / 1000.0)
+        calls = _tool_calls(step)
+        message: dict[str, Any] = {"role": "assistant", "content": step.get("content") or None}
+        if calls:
+            message["tool_calls"] = [{key: value for key, value in call.items() if key != "index"} for call in calls]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": config.model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if calls else "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        inputs = body.get("input") or []
+        texts = [inputs] if isinstance(inputs, str) else [str(item) for item in inputs]
+        data = [
+            {"object": "embedding", "index": index, "embedding": _embedder().get_text_embedding(text)}
+            for index, text in enumerate(texts)
+        ]
+        usage = {"prompt_tokens": 0, "total_tokens": 0}
+        return JSONResponse({"object": "list", "data": data, "model": body.get("model", ""), "usage": usage})
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible streaming server for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tps", type=float, default=50.0, help="streamed tokens per second after the first")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--script", type=Path, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeLLMConfig(
+        first_token_ms=args.first_token_ms,
+        tokens_per_second=args.tps,
+        reply=args.reply,
+        script=FakeLLMConfig.load_script(args.script) if args.script else [],
+    )
+    uvicorn.run(create_fake_llm_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
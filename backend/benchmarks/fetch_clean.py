@@ -0,0 +1,164 @@
+"""HTML cleaning benchmark for ``fetch_url``.
+
+Compares the single-pass ``html_to_markdown`` extractor with the previous
+BeautifulSoup + html2text approach on a directory of saved pages:
+
+    python -m backend.benchmarks.fetch_clean --pages-dir path/to/saved/pages
+
+When ``--pages-dir`` has no ``*.html`` files, synthetic pages of increasing
+size are generated there first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from backend.config import get_app_config
+from backend.tools.fetch_tool import FetchCleaner
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_KB = (20, 200, 1_000, 4_000)
+MAX_CHARS = 6_000
+_WORDS = (
+    "latency",
+    "throughput",
+    "cache",
+    "index",
+    "vector",
+    "parser",
+    "stream",
+    "budget",
+    "worker",
+    "request",
+    "response",
+    "session",
+)
+
+
+def legacy_clean(raw: str, max_chars: int = MAX_CHARS) -> str:
+    """The previous ``FetchCleaner.clean``: two full parses, keep the longer one."""
+    from bs4 import BeautifulSoup
+    from html2text import HTML2Text
+
+    converter = HTML2Text()
+    converter.ignore_links = False
+    converter.ignore_images = True
+    converter.body_width = 0
+
+    text = raw.strip()
+    soup = BeautifulSoup(text, "html.parser")
+    extracted = soup.get_text("\n")
+    markdown = converter.handle(text)
+    text = markdown.strip() if len(markdown.strip()) >= len(extracted.strip()) else extracted.strip()
+    if len(text) > max_chars:
+        text = f"{text[: max_chars - 10]}...[truncated]"
+    return text
+
+
+def single_pass_clean(raw: str, max_chars: int = MAX_CHARS) -> str:
+    return FetchCleaner(max_chars=max_chars).clean(raw)
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+def generate_pages(pages_dir: Path, sizes_kb: tuple[int, ...] = DEFAULT_PAGE_KB, seed: int = 7) -> list[Path]:
+    rng = random.Random(seed)
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    nav = "<nav><ul>" + "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(40)) + "</ul></nav>"
+    script = "<script>" + "var tracking = {};" * 200 + "</script>"
+    paths: list[Path] = []
+    for size_kb in sizes_kb:
+        sections: list[str] = []
+        length = 0
+        index = 0
+        while length < size_kb * 1024:
+            paragraphs = "".join(f"<p>{_sentence(rng)} <a href='/ref/{index}'>ref {index}</a></p>" for _ in range(4))
+            section = f"<section><h2>Part {index}</h2>{paragraphs}<ul><li>{_sentence(rng)}</li></ul></section>"
+            sections.append(section)
+            length += len(section)
+            index += 1
+        html = (
+            "<html><head><title>Synthetic</title><style>body{margin:0}</style></head><body>"
+            f"{nav}{script}<main>{''.join(sections)}</main><footer>footer links</footer></body></html>"
+        )
+        path = pages_dir / f"synthetic-{size_kb}kb.html"
+        path.write_text(html, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def _time(function: Any, raw: str, repeat: int) -> float:
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(raw)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return min(samples)
+
+
+def run(pages_dir: Path, repeat: int) -> dict[str, Any]:
+    pages = sorted(pages_dir.glob("*.html"))
+    if not pages:
+        logger.info("No saved pages in %s, generating synthetic ones", pages_dir)
+        pages = generate_pages(pages_dir)
+
+    results: list[dict[str, Any]] = []
+    for path in pages:
+        raw = path.read_text(encoding="utf-8", errors="replace")
+        legacy_ms = _time(legacy_clean, raw, repeat)
+        single_ms = _time(single_pass_clean, raw, repeat)
+        results.append(
+            {
+                "page": path.name,
+                "size_kb": round(len(raw.encode("utf-8")) / 1024.0, 1),
+                "legacy_ms": legacy_ms,
+                "single_pass_ms": single_ms,
+                "speedup": legacy_ms / single_ms if single_ms else 0.0,
+                "legacy_chars": len(legacy_clean(raw)),
+                "single_pass_chars": len(single_pass_clean(raw)),
+            }
+        )
+        logger.info("%s: %.1f ms -> %.1f ms", path.name, legacy_ms, single_ms)
+
+    return {
+        "benchmark": "fetch_clean",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "repeat": repeat,
+        "max_chars": MAX_CHARS,
+        "legacy_total_ms": sum(item["legacy_ms"] for item in results),
+        "single_pass_total_ms": sum(item["single_pass_ms"] for item in results),
+        "results": results,
+    }
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Benchmark HTML cleaning for fetch_url.")
+    parser.add_argument("--pages-dir", type=Path, default=config.tmp_dir / "benchmarks" / "pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "fetch_clean.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(args.pages_dir, repeat=args.repeat)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info("Wrote fetch clean benchmark report to %s", args.output)
+    print(
+        f"legacy {report['legacy_total_ms']:.1f} ms, single-pass {report['single_pass_total_ms']:.1f} ms "
+        f"over {len(report['results'])} pages"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Micro-benchmarks for the per-request hot paths.
+
+Times chunk/final-text extraction over realistic agent event streams, SSE
+encoding, session append and history rebuild at 10/1k/10k entries, system
+prompt assembly, skill snapshot refresh with 10/500 skills and HTML
+cleaning of large pages. Each case is calibrated to run for at least
+``--min-time`` seconds; the median time per call is compared against
+``hot_paths_thresholds.json`` and, when given, a baseline report:
+
+    python -m backend.benchmarks.hot_paths --baseline tmp/benchmarks/hot_paths-baseline.json --check
+
+``--check`` exits non-zero when a case is over its threshold or slower than
+the baseline by more than ``--max-regression``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import shutil
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from backend.config import get_app_config
+
+logger = logging.getLogger(__name__)
+
+THRESHOLDS_PATH = Path(__file__).with_name("hot_paths_thresholds.json")
+SESSION_SIZES = (10, 1_000, 10_000)
+SKILL_COUNTS = (10, 500)
+PAGE_KB = (200, 1_000)
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], Any]
+    # Untimed reset before every round, for cases that mutate state.
+    before: Callable[[], Any] | None = None
+
+
+@dataclass
+class CaseResult:
+    name: str
+    rounds: int
+    min_us: float
+    median_us: float
+    mean_us: float
+    threshold_us: float | None = None
+    baseline_us: float | None = None
+    status: str = "ok"
+
+
+def measure(case: Case, min_time: float, min_rounds: int = 5, max_rounds: int = 10_000) -> CaseResult:
+    if case.before is not None:
+        case.before()
+    case.run()
+    samples: list[float] = []
+    spent = 0.0
+    while len(samples) < max_rounds and (len(samples) < min_rounds or spent < min_time):
+        if case.before is not None:
+            case.before()
+        started = time.perf_counter()
+        case.run()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed * 1e6)
+        spent += elapsed
+    return CaseResult(
+        name=case.name,
+        rounds=len(samples),
+        min_us=round(min(samples), 2),
+        median_us=round(statistics.median(samples), 2),
+        mean_us=round(statistics.fmean(samples), 2),
+    )
+
+
+def _event_stream(chunks: int = 400) -> list[Any]:
+    from langchain_core.messages import AIMessageChunk
+
+    stream: list[Any] = []
+    for index in range(chunks):
+        if index % 25 == 0:
+            call = {"name": "read_file", "args": "{}", "id": f"c{index}", "index": 0}
+            stream.append(AIMessageChunk(content="", tool_call_chunks=[call]))
+        elif index % 10 == 0:
+            stream.append(AIMessageChunk(content=[{"type": "text", "text": f"block {index} "}]))
+        else:
+            stream.append(AIMessageChunk(content=f"token{index} "))
+    stream.extend([None, {"text": "tail"}, "raw"])
+    return stream
+
+
+def _agent_output(rounds: int = 12) -> dict[str, Any]:
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    messages: list[Any] = [HumanMessage(content="summarize the logs")]
+    for index in range(rounds):
+        call = {"name": "terminal", "args": {"command": f"tail -n 50 app-{index}.log"}, "id": f"call_{index}"}
+        messages.append(AIMessage(content="", tool_calls=[call]))
+        messages.append(ToolMessage(content="INFO ok\n" * 200, tool_call_id=f"call_{index}"))
+    messages.append(AIMessage(content=[{"type": "text", "text": "The logs show two payment timeouts."}]))
+    return {"messages": messages}
+
+
+def _sse_events(count: int = 200) -> list[dict[str, Any]]:
+    events: list[dict[str, Any]] = []
+    for index in range(count):
+        if index % 20 == 0:
+            tool_input = {"file_path": f"workspace/notes-{index}.md"}
+            events.append({"type": "tool_call", "name": "read_file", "input": tool_input})
+        elif index % 20 == 1:
+            events.append({"type": "tool_result", "name": "read_file", "output": "结果 line\n" * 200})
+        else:
+            events.append({"type": "thought", "content": f"token {index} "})
+    events.append({"type": "final", "content": "done " * 200})
+    return events
+
+
+def _session_cases(work_dir: Path, sizes: tuple[int, ...]) -> list[Case]:
+    from backend.services.session_service import SessionEntry, SessionService
+
+    service = SessionService(sessions_dir=work_dir / "sessions")
+    outputs = [f"row {index}\n" * (40 + index * 10) for index in range(20)]
+    cases: list[Case] = []
+    for size in sizes:
+        session_id = f"bench-{size}"
+        entries: list[dict[str, Any]] = []
+        for index in range(size):
+            kind = index % 4
+            if kind == 0:
+                entry = SessionEntry(type="user", content=f"question {index}: what changed in module {index % 37}?")
+            elif kind == 1:
+                tool = {"name": "read_file", "input": {"file_path": f"workspace/m{index}.md"}, "id": f"run-{index}"}
+                entry = SessionEntry(type="tool", content="read_file called", tool=tool)
+            elif kind == 2:
+                tool = service.tool_result("read_file", f"run-{index - 1}", outputs[index % len(outputs)])
+                entry = SessionEntry(type="tool", content="read_file result", tool=tool)
+            else:
+                entry = SessionEntry(type="assistant", content=f"answer {index} " * 30)
+            entries.append(entry.to_dict())
+        service.save(session_id, entries)
+        new_entries = [SessionEntry(type="user", content="next question"), SessionEntry(type="assistant", content="ok")]
+        cases.append(
+            Case(
+                f"session_append[{size}]",
+                lambda session_id=session_id, new_entries=new_entries: service.append(session_id, new_entries),
+                before=lambda session_id=session_id, entries=entries: service.save(session_id, entries),
+            )
+        )
+        cases.append(
+            Case(
+                f"session_to_chat_messages[{size}]",
+                lambda session_id=session_id: service.to_chat_messages(session_id, include_tools=True),
+            )
+        )
+    return cases
+
+
+def _prompt_case(work_dir: Path) -> Case:
+    from backend.services.prompt_service import PromptService
+
+    workspace = work_dir / "workspace"
+    workspace.mkdir(parents=True, exist_ok=True)
+    paragraph = "The agent reads files, runs tools and keeps notes about the user's projects. " * 8
+    sizes = {"SOUL.md": 10, "IDENTITY.md": 6, "USER.md": 8, "AGENTS.md": 12, "SKILLS_SNAPSHOT.md": 20}
+    for name, repeats in sizes.items():
+        (workspace / name).write_text(f"# {name}\n\n" + "\n\n".join([paragraph] * repeats), encoding="utf-8")
+    memory_file = work_dir / "memory" / "MEMORY.md"
+    memory_file.parent.mkdir(parents=True, exist_ok=True)
+    notes = [f"- 2026-10-{index % 28 + 1:02d}: note {index} {paragraph[:120]}" for index in range(300)]
+    memory_file.write_text("\n".join(notes), encoding="utf-8")
+    service = PromptService(workspace_dir=workspace, memory_file=memory_file)
+    return Case("prompt_build_system_prompt", service.build_system_prompt)
+
+
+def _skill_cases(work_dir: Path, counts: tuple[int, ...]) -> list[Case]:
+    from backend.services.skill_service import SkillService
+
+    cases: list[Case] = []
+    for count in counts:
+        root = work_dir / f"skills-{count}"
+        for index in range(count):
+            skill_dir = root / "skills" / f"skill-{index:04d}"
+            skill_dir.mkdir(parents=True, exist_ok=True)
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: skill-{index:04d}\ndescription: Handles task family {index} for reports & exports\n---\n\n"
+                + "Step by step instructions.\n" * 40,
+                encoding="utf-8",
+            )
+
+        def build(root: Path = root) -> SkillService:
+            return SkillService(skills_dir=root / "skills", workspace_dir=root / "workspace", root_dir=root)
+
+        warm = build()
+        warm.refresh_snapshot()
+        cases.append(Case(f"skill_refresh_snapshot_warm[{count}]", warm.refresh_snapshot))
+        cases.append(Case(f"skill_refresh_snapshot_cold[{count}]", lambda build=build: build().refresh_snapshot()))
+    return cases
+
+
+def _fetch_cases(work_dir: Path, sizes_kb: tuple[int, ...]) -> list[Case]:
+    from backend.benchmarks.fetch_clean import generate_pages
+    from backend.tools.fetch_tool import FetchCleaner
+
+    cleaner = FetchCleaner()
+    cases: list[Case] = []
+    for path, size_kb in zip(generate_pages(work_dir / "pages", sizes_kb), sizes_kb):
+        raw = path.read_text(encoding="utf-8")
+        cases.append(Case(f"fetch_clean[{size_kb}kb]", lambda raw=raw: cleaner.clean(raw)))
+    return cases
+
+
+def build_cases(work_dir: Path, quick: bool = False) -> list[Case]:
+    """Every benchmark case; ``quick`` keeps only the smallest size of each family."""
+    from backend.app import _sse
+    from backend.services.agent_service import AgentService
+    from backend.services.prompt_service import PromptService
+    from backend.services.session_service import SessionService
+    from backend.services.skill_service import SkillService
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    config = get_app_config()
+    agent = AgentService(
+        model_settings=config.model,
+        prompt_service=PromptService(workspace_dir=work_dir, memory_file=work_dir / "MEMORY.md"),
+        skill_service=SkillService(skills_dir=work_dir, workspace_dir=work_dir, root_dir=work_dir),
+        session_service=SessionService(sessions_dir=work_dir),
+        tools=[],
+    )
+    stream = _event_stream()
+    output = _agent_output()
+    events = _sse_events()
+
+    cases = [
+        Case("agent_extract_chunk_text", lambda: [agent._extract_chunk_text(chunk) for chunk in stream]),
+        Case("agent_extract_final_text", lambda: agent._extract_final_text(output)),
+        Case("sse_encode", lambda: [_sse(event) for event in events]),
+    ]
+    cases += _session_cases(work_dir, SESSION_SIZES[:1] if quick else SESSION_SIZES)
+    cases.append(_prompt_case(work_dir))
+    cases += _skill_cases(work_dir, SKILL_COUNTS[:1] if quick else SKILL_COUNTS)
+    cases += _fetch_cases(work_dir, PAGE_KB[:1] if quick else PAGE_KB)
+    return cases
+
+
+def evaluate(
+    results: list[CaseResult],
+    thresholds: dict[str, float],
+    baseline: dict[str, Any] | None = None,
+    max_regression: float = 0.25,
+) -> list[str]:
+    """Mark each result against its threshold and the baseline; returns the failures."""
+    previous = {item["name"]: item["median_us"] for item in (baseline or {}).get("results", [])}
+    failures: list[str] = []
+    for result in results:
+        result.threshold_us = thresholds.get(result.name)
+        result.baseline_us = previous.get(result.name)
+        if result.threshold_us is not None and result.median_us > result.threshold_us:
+            result.status = "over_threshold"
+            failures.append(f"{result.name}: median {result.median_us:.0f}us > threshold {result.threshold_us:.0f}us")
+        elif result.baseline_us and result.median_us > result.baseline_us * (1.0 + max_regression):
+            change = (result.median_us / result.baseline_us - 1.0) * 100.0
+            result.status = "regressed"
+            failures.append(
+                f"{result.name}: median {result.baseline_us:.0f}us -> {result.median_us:.0f}us ({change:+.1f}%)"
+            )
+    return failures
+
+
+def run(work_dir: Path, min_time: float, quick: bool = False) -> list[CaseResult]:
+    results: list[CaseResult] = []
+    for case in build_cases(work_dir, quick=quick):
+        result = measure(case, min_time=min_time, min_rounds=1 if quick else 5)
+        logger.info("%s: median %.1fus over %d rounds", result.name, result.median_us, result.rounds)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for backend hot paths.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds each case runs for at least")
+    parser.add_argument("--work-dir", type=Path, default=config.tmp_dir / "benchmarks" / "hot_paths")
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "hot_paths.json")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_PATH)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when a case fails")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run(args.work_dir, min_time=args.min_time)
+    thresholds = json.loads(args.thresholds.read_text(encoding="utf-8")) if args.thresholds.exists() else {}
+    baseline = None
+    if args.baseline is not None and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    failures = evaluate(results, thresholds, baseline, max_regression=args.max_regression)
+
+    report = {
+        "benchmark": "hot_paths",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "max_regression": args.max_regression,
+        "results": [asdict(item) for item in results],
+        "failures": failures,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info("Wrote hot path benchmark report to %s", args.output)
+    for result in results:
+        print(f"{result.name:<40} {result.median_us:>12.1f}us  {result.status}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
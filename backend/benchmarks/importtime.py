@@ -0,0 +1,116 @@
+"""Import-time profile for backend modules.
+
+Runs ``python -X importtime`` in a fresh interpreter and reports the
+slowest imports by cumulative time:
+
+    python -m backend.benchmarks.importtime backend.app --top 25
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from backend.config import get_app_config
+
+# Packages that must not load while importing the app; they belong behind first use.
+HEAVY_PACKAGES = (
+    "bs4",
+    "html2text",
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "langchain_openai",
+    "langgraph",
+    "llama_index",
+    "numpy",
+    "openai",
+    "requests",
+)
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    records: list[ImportRecord] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        stripped = name.lstrip(" ")
+        # The name column is one space plus two spaces per nesting level.
+        records.append(
+            ImportRecord(
+                name=stripped,
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return records
+
+
+def profile_import(module: str, project_root: Path | None = None) -> list[ImportRecord]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=project_root or get_app_config().project_root,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def total_ms(records: list[ImportRecord], module: str) -> float:
+    for record in records:
+        if record.name == module and record.depth == 0:
+            return record.cumulative_us / 1000.0
+    return 0.0
+
+
+def loaded_heavy_packages(records: list[ImportRecord]) -> list[str]:
+    loaded = {record.name.split(".", 1)[0] for record in records}
+    return sorted(loaded.intersection(HEAVY_PACKAGES))
+
+
+def format_report(records: list[ImportRecord], module: str, top: int) -> str:
+    lines = [f"{module}: {total_ms(records, module):.1f} ms cumulative, {len(records)} modules"]
+    lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for record in sorted(records, key=lambda item: item.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{record.cumulative_us / 1000.0:>14.1f} {record.self_us / 1000.0:>9.1f}  {record.name}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Import-time profile for backend modules.")
+    parser.add_argument("module", nargs="?", default="backend.app")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "importtime.json")
+    args = parser.parse_args()
+
+    records = profile_import(args.module, config.project_root)
+    report: dict[str, Any] = {
+        "module": args.module,
+        "total_ms": total_ms(records, args.module),
+        "heavy_packages": loaded_heavy_packages(records),
+        "records": [asdict(record) for record in records],
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(format_report(records, args.module, args.top))
+
+
+if __name__ == "__main__":
+    main()
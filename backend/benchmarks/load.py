@@ -0,0 +1,354 @@
+"""End-to-end load test of ``/api/chat`` against the local fake model.
+
+Starts ``backend.benchmarks.fake_llm`` and the backend (uvicorn) as
+subprocesses, points the backend at the fake model, then runs ``--requests``
+streaming chat sessions with ``--concurrency`` in flight and reports
+throughput, time to first token, end-to-end latency percentiles and the
+backend process's CPU time and RSS:
+
+    python -m backend.benchmarks.load --concurrency 16 --requests 200 \
+        --script tmp/benchmarks/read-file-script.json \
+        --baseline tmp/benchmarks/load-baseline.json
+
+The backend runs against a copy of the skills, workspace and memory under
+``--work-dir`` (via ``BACKEND_ROOT_DIR``) with empty knowledge, storage and
+sessions, so the real data directories are never written.
+
+Time to first token is measured to the first event the model produced (the
+first event after the ``prompt_budget`` debug event). CPU and RSS are read
+from ``/proc`` and are only available on Linux.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from backend.config import get_app_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCRIPT: list[dict[str, Any]] = [
+    {"tool_calls": [{"name": "read_file", "arguments": {"file_path": "memory/MEMORY.md"}}]},
+]
+COMPARED_METRICS = (
+    "throughput_rps",
+    "ttft_p50_ms",
+    "ttft_p95_ms",
+    "latency_p50_ms",
+    "latency_p95_ms",
+    "latency_p99_ms",
+    "cpu_seconds",
+    "rss_peak_mb",
+)
+
+
+@dataclass
+class SessionResult:
+    ok: bool
+    ttft_ms: float | None
+    latency_ms: float
+    events: int
+    tool_calls: int
+    error: str = ""
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProcessSampler:
+    """Samples a process's CPU time and RSS from ``/proc`` on a background thread."""
+
+    def __init__(self, pid: int, interval: float = 0.2) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.rss_peak_mb = 0.0
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+        self._cpu_start = 0.0
+        self.cpu_used = 0.0
+        self.rss_end_mb = 0.0
+
+    def cpu_seconds(self) -> float:
+        fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15 of the full line.
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss_mb(self) -> float:
+        for line in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+        return 0.0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.rss_peak_mb = max(self.rss_peak_mb, self.rss_mb())
+            except OSError:
+                return
+
+    def __enter__(self) -> ProcessSampler:
+        self._cpu_start = self.cpu_seconds()
+        self.rss_peak_mb = self.rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.cpu_used = self.cpu_seconds() - self._cpu_start
+        self.rss_end_mb = self.rss_mb()
+
+
+async def run_session(client: httpx.AsyncClient, base_url: str, message: str, session_id: str) -> SessionResult:
+    started = time.perf_counter()
+    ttft_ms: float | None = None
+    events = tool_calls = 0
+    model_started = finished = False
+    error = ""
+    try:
+        async with client.stream(
+            "POST", f"{base_url}/api/chat", json={"message": message, "session_id": session_id, "stream": True}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: ") :])
+                events += 1
+                if event.get("type") == "debug":
+                    model_started = True
+                    continue
+                if model_started and ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000.0
+                if event.get("type") == "tool_call":
+                    tool_calls += 1
+                elif event.get("type") == "final":
+                    finished = True
+                elif event.get("type") == "error":
+                    error = str(event.get("content", ""))
+    except httpx.HTTPError as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    return SessionResult(
+        ok=finished and not error,
+        ttft_ms=ttft_ms,
+        latency_ms=(time.perf_counter() - started) * 1000.0,
+        events=events,
+        tool_calls=tool_calls,
+        error=error,
+    )
+
+
+async def drive(base_url: str, requests: int, concurrency: int, message: str, run_id: str) -> list[SessionResult]:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300.0), limits=limits) as client:
+
+        async def one(index: int) -> SessionResult:
+            async with semaphore:
+                return await run_session(client, base_url, message, f"load-{run_id}-{index}")
+
+        return await asyncio.gather(*(one(index) for index in range(requests)))
+
+
+def summarize(results: list[SessionResult], wall_seconds: float) -> dict[str, Any]:
+    completed = [item for item in results if item.ok]
+    ttft = [item.ttft_ms for item in completed if item.ttft_ms is not None]
+    latency = [item.latency_ms for item in completed]
+    errors = sorted({item.error for item in results if item.error})
+    return {
+        "requests": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(completed) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "tool_calls": sum(item.tool_calls for item in results),
+        "ttft_p50_ms": round(_percentile(ttft, 50), 1),
+        "ttft_p95_ms": round(_percentile(ttft, 95), 1),
+        "ttft_p99_ms": round(_percentile(ttft, 99), 1),
+        "latency_p50_ms": round(_percentile(latency, 50), 1),
+        "latency_p95_ms": round(_percentile(latency, 95), 1),
+        "latency_p99_ms": round(_percentile(latency, 99), 1),
+        "errors": errors[:5],
+    }
+
+
+def compare_reports(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    lines: list[str] = []
+    for key in COMPARED_METRICS:
+        now, before = current["results"].get(key), baseline.get("results", {}).get(key)
+        if now is None or before is None:
+            lines.append(f"{key}: n/a")
+            continue
+        change = ((now - before) / before * 100.0) if before else 0.0
+        lines.append(f"{key}: {before:.3f} -> {now:.3f} ({change:+.1f}%)")
+    return lines
+
+
+def _wait_ready(url: str, process: subprocess.Popen[bytes], timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} was not ready after {timeout:.0f}s")
+
+
+def _stop(process: subprocess.Popen[bytes]) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def prepare_root(root: Path, source: Path) -> None:
+    """Fresh backend data tree with copies of the prompt inputs and nothing to index."""
+    shutil.rmtree(root, ignore_errors=True)
+    for name in ("skills", "workspace", "memory"):
+        if (source / name).is_dir():
+            shutil.copytree(source / name, root / name)
+    for name in ("knowledge", "storage", "sessions"):
+        (root / name).mkdir(parents=True, exist_ok=True)
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    config = get_app_config()
+    script_path = args.script
+    if script_path is None:
+        script_path = args.work_dir / "default-script.json"
+        script_path.parent.mkdir(parents=True, exist_ok=True)
+        script_path.write_text(json.dumps(DEFAULT_SCRIPT), encoding="utf-8")
+
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    backend_url = f"http://127.0.0.1:{args.backend_port}"
+    fake_llm = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "backend.benchmarks.fake_llm",
+            "--port",
+            str(args.llm_port),
+            "--first-token-ms",
+            str(args.first_token_ms),
+            "--tps",
+            str(args.tps),
+            "--script",
+            str(script_path),
+        ],
+        cwd=config.project_root,
+    )
+    data_root = args.work_dir / "root"
+    prepare_root(data_root, config.root_dir)
+    backend_env = {
+        **os.environ,
+        "BACKEND_ROOT_DIR": str(data_root),
+        "OPENAI_BASE_URL": f"{llm_url}/v1",
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_MODEL": "fake-model",
+        "OPENAI_TOOL_MODEL": "",
+        "SKILLS_WATCH": "0",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.backend_port), "--log-level", "warning"],
+        cwd=config.project_root,
+        env=backend_env,
+    )
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        _wait_ready(f"{llm_url}/v1/models", fake_llm)
+        _wait_ready(f"{backend_url}/api/health", backend)
+        asyncio.run(drive(backend_url, min(args.concurrency, 4), args.concurrency, args.message, f"{run_id}-warmup"))
+
+        with ProcessSampler(backend.pid) as sampler:
+            started = time.perf_counter()
+            results = asyncio.run(drive(backend_url, args.requests, args.concurrency, args.message, run_id))
+            wall_seconds = time.perf_counter() - started
+    finally:
+        _stop(backend)
+        _stop(fake_llm)
+
+    summary = summarize(results, wall_seconds)
+    summary["cpu_seconds"] = round(sampler.cpu_used, 3)
+    summary["cpu_percent"] = round(sampler.cpu_used / wall_seconds * 100.0, 1) if wall_seconds > 0 else 0.0
+    summary["rss_peak_mb"] = round(sampler.rss_peak_mb, 1)
+    summary["rss_end_mb"] = round(sampler.rss_end_mb, 1)
+    return {
+        "benchmark": "load",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "first_token_ms": args.first_token_ms,
+            "tps": args.tps,
+            "script": json.loads(script_path.read_text(encoding="utf-8")),
+        },
+        "results": summary,
+        "slowest": [asdict(item) for item in sorted(results, key=lambda item: -item.latency_ms)[:3]],
+    }
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Load-test /api/chat against a local fake model.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tps", type=float, default=50.0)
+    parser.add_argument("--script", type=Path, default=None, help="fake model tool-call script (JSON list of steps)")
+    parser.add_argument("--message", default="Check the memory file and summarize it.")
+    parser.add_argument("--llm-port", type=int, default=8787)
+    parser.add_argument("--backend-port", type=int, default=8788)
+    parser.add_argument("--work-dir", type=Path, default=config.tmp_dir / "benchmarks" / "load")
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "load.json")
+    parser.add_argument("--baseline", type=Path, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = run(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    logger.info("Wrote load test report to %s", args.output)
+    results = report["results"]
+    print(
+        f"{results['completed']}/{results['requests']} ok, {results['throughput_rps']} req/s, "
+        f"ttft p50 {results['ttft_p50_ms']}ms, latency p50/p95/p99 "
+        f"{results['latency_p50_ms']}/{results['latency_p95_ms']}/{results['latency_p99_ms']}ms, "
+        f"cpu {results['cpu_seconds']}s, rss peak {results['rss_peak_mb']}MB"
+    )
+    if args.baseline is not None and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
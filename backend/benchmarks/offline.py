@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import hashlib
+import re
+
+from llama_index.core.embeddings import BaseEmbedding
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class HashEmbedding(BaseEmbedding):
+    """Deterministic bag-of-words hashing embedding for offline runs."""
+
+    dim: int = 256
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        return vector
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._embed(text)
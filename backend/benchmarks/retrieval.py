@@ -0,0 +1,290 @@
+"""Retrieval benchmark for KnowledgeService.
+
+Generates synthetic corpora with known answers, then builds, reloads and
+queries the knowledge index in fresh subprocesses so that build time, load
+time and memory are measured per size without interference:
+
+    python -m backend.benchmarks.retrieval --sizes 1000 10000 \
+        --baseline tmp/benchmarks/retrieval-baseline.json
+
+Everything runs offline with ``HashEmbedding``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from backend.config import ModelSettings, get_app_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 10_000)
+SEARCH_MODES = ("vector", "bm25", "hybrid")
+_SYLLABLES = ("ka", "lo", "mi", "ne", "su", "ta", "ri", "po", "ve", "zu", "an", "el", "or", "ix", "um", "ba")
+_COMMON_WORDS = 3_000
+_RARE_WORDS_PER_DOC = 6
+_COMMON_WORDS_PER_DOC = 60
+
+
+def _make_vocab(rng: random.Random, size: int, syllables: int) -> list[str]:
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(syllables)))
+    return sorted(words)
+
+
+def generate_corpus(corpus_dir: Path, size: int, queries: int = 200, seed: int = 13) -> list[dict[str, str]]:
+    """Write ``size`` one-chunk documents plus ``queries.json`` with their answers."""
+    queries_path = corpus_dir / "queries.json"
+    if queries_path.exists():
+        return json.loads(queries_path.read_text(encoding="utf-8"))
+
+    rng = random.Random(seed)
+    common = _make_vocab(rng, _COMMON_WORDS, 3)
+    common_set = set(common)
+    rare = [word for word in _make_vocab(rng, max(1_000, size) + _COMMON_WORDS, 4) if word not in common_set]
+    weights = [1.0 / (rank + 1) for rank in range(len(common))]
+
+    knowledge_dir = corpus_dir / "knowledge"
+    knowledge_dir.mkdir(parents=True, exist_ok=True)
+    targets = set(rng.sample(range(size), min(queries, size)))
+    cases: list[dict[str, str]] = []
+    for doc_index in range(size):
+        name = f"chunk-{doc_index:06d}.txt"
+        distinctive = rng.sample(rare, _RARE_WORDS_PER_DOC)
+        words = rng.choices(common, weights=weights, k=_COMMON_WORDS_PER_DOC) + distinctive
+        rng.shuffle(words)
+        sentences = [" ".join(words[start : start + 11]).capitalize() + "." for start in range(0, len(words), 11)]
+        (knowledge_dir / name).write_text(" ".join(sentences), encoding="utf-8")
+        if doc_index in targets:
+            query_words = rng.sample(distinctive, 3) + rng.choices(common, weights=weights, k=1)
+            rng.shuffle(query_words)
+            cases.append({"query": " ".join(query_words), "answer": name})
+
+    queries_path.write_text(json.dumps(cases, ensure_ascii=False), encoding="utf-8")
+    return cases
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextmanager
+def _hash_embeddings() -> Iterator[None]:
+    """Embed with ``HashEmbedding`` for one phase, then restore the global model."""
+    from llama_index.core import Settings
+
+    from backend.benchmarks.offline import HashEmbedding
+
+    previous = Settings._embed_model
+    Settings.embed_model = HashEmbedding()
+    try:
+        yield
+    finally:
+        Settings._embed_model = previous
+
+
+def _service(corpus_dir: Path, storage_dir: Path) -> Any:
+    from backend.services.knowledge_service import KnowledgeService
+
+    return KnowledgeService(
+        knowledge_dir=corpus_dir / "knowledge",
+        storage_dir=storage_dir,
+        model_settings=ModelSettings(base_url="", api_key="", model=""),
+    )
+
+
+def build_phase(corpus_dir: Path, storage_dir: Path) -> dict[str, Any]:
+    service = _service(corpus_dir, storage_dir)
+    started = time.perf_counter()
+    with _hash_embeddings():
+        service.initialize()
+    build_seconds = time.perf_counter() - started
+    report = service.last_ingest_report
+    return {
+        "build_seconds": build_seconds,
+        "chunks": report.chunk_count if report is not None else 0,
+        "failed_files": len(report.failed) if report is not None else 0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def query_phase(corpus_dir: Path, storage_dir: Path, top_k: int = 5) -> dict[str, Any]:
+    with _hash_embeddings():
+        cases = json.loads((corpus_dir / "queries.json").read_text(encoding="utf-8"))
+        service = _service(corpus_dir, storage_dir)
+        started = time.perf_counter()
+        service.initialize()
+        load_seconds = time.perf_counter() - started
+        load_rss_mb = _peak_rss_mb()
+
+        modes: dict[str, Any] = {}
+        for mode in SEARCH_MODES:
+            service.retrieve(cases[0]["query"], top_k=top_k, mode=mode)
+            latencies: list[float] = []
+            hits = 0
+            for case in cases:
+                query_started = time.perf_counter()
+                results = service.retrieve(case["query"], top_k=top_k, mode=mode)
+                latencies.append((time.perf_counter() - query_started) * 1000.0)
+                names = [str(item.node.metadata.get("file_name", "")) for item in results]
+                hits += int(case["answer"] in names)
+            modes[mode] = {
+                "p50_ms": _percentile(latencies, 50),
+                "p99_ms": _percentile(latencies, 99),
+                f"recall@{top_k}": hits / len(cases) if cases else 0.0,
+            }
+
+    return {
+        "load_seconds": load_seconds,
+        "load_peak_rss_mb": load_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+        "queries": len(cases),
+        "modes": modes,
+    }
+
+
+def _run_phase(phase: str, corpus_dir: Path, storage_dir: Path, top_k: int) -> dict[str, Any]:
+    command = [
+        sys.executable,
+        "-m",
+        "backend.benchmarks.retrieval",
+        "--phase",
+        phase,
+        "--corpus-dir",
+        str(corpus_dir),
+        "--storage-dir",
+        str(storage_dir),
+        "--top-k",
+        str(top_k),
+    ]
+    completed = subprocess.run(command, check=True, capture_output=True, text=True, cwd=get_app_config().project_root)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_commit(project_root: Path) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=project_root, check=True
+        )
+        return completed.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare_reports(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    lines: list[str] = []
+    baseline_sizes = {item["size"]: item for item in baseline.get("results", [])}
+    for result in current.get("results", []):
+        previous = baseline_sizes.get(result["size"])
+        if previous is None:
+            continue
+        for key in ("build_seconds", "load_seconds", "peak_rss_mb"):
+            lines.append(_delta_line(f"{result['size']} {key}", result.get(key), previous.get(key)))
+        for mode, stats in result.get("modes", {}).items():
+            for key, value in stats.items():
+                lines.append(_delta_line(f"{result['size']} {mode} {key}", value, previous["modes"][mode].get(key)))
+    return lines
+
+
+def _delta_line(label: str, current: float | None, previous: float | None) -> str:
+    if current is None or previous is None:
+        return f"{label}: n/a"
+    change = ((current - previous) / previous * 100.0) if previous else 0.0
+    return f"{label}: {previous:.4f} -> {current:.4f} ({change:+.1f}%)"
+
+
+def run(sizes: list[int], work_dir: Path, top_k: int, queries: int) -> dict[str, Any]:
+    config = get_app_config()
+    results: list[dict[str, Any]] = []
+    for size in sizes:
+        corpus_dir = work_dir / f"corpus-{size}"
+        storage_dir = work_dir / f"storage-{size}-{os.getenv('KNOWLEDGE_VECTOR_STORE', 'simple')}"
+        logger.info("Generating corpus with %d chunks in %s", size, corpus_dir)
+        generate_corpus(corpus_dir, size, queries=queries)
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+        logger.info("Building index for %d chunks", size)
+        build = _run_phase("build", corpus_dir, storage_dir, top_k)
+        logger.info("Querying index for %d chunks", size)
+        query = _run_phase("query", corpus_dir, storage_dir, top_k)
+        results.append(
+            {
+                "size": size,
+                "build_seconds": build["build_seconds"],
+                "build_peak_rss_mb": build["peak_rss_mb"],
+                "chunks": build["chunks"],
+                "load_seconds": query["load_seconds"],
+                "peak_rss_mb": query["load_peak_rss_mb"],
+                "queries": query["queries"],
+                "modes": query["modes"],
+            }
+        )
+
+    return {
+        "benchmark": "retrieval",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(config.project_root),
+        "top_k": top_k,
+        "vector_store": os.getenv("KNOWLEDGE_VECTOR_STORE", "simple"),
+        "vector_dtype": os.getenv("KNOWLEDGE_VECTOR_DTYPE", "float32"),
+        "results": results,
+    }
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark for KnowledgeService.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--work-dir", type=Path, default=config.tmp_dir / "benchmarks" / "retrieval")
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "retrieval.json")
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--phase", choices=("build", "query"), default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--corpus-dir", type=Path, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--storage-dir", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase == "build":
+        print(json.dumps(build_phase(args.corpus_dir, args.storage_dir)))
+        return
+    if args.phase == "query":
+        print(json.dumps(query_phase(args.corpus_dir, args.storage_dir, top_k=args.top_k)))
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    report = run(args.sizes, args.work_dir, top_k=args.top_k, queries=args.queries)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    logger.info("Wrote retrieval benchmark report to %s", args.output)
+    if args.baseline is not None and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        for line in compare_reports(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Replay multi-turn conversations and count repeated tool calls per history mode.
+
+Each case writes a few files into a sandbox root, then plays its user turns
+through AgentService twice: once with text-only history and once with tool
+calls replayed into the history. A call is "repeated" when the same tool
+with the same arguments already ran in an earlier turn of that session:
+
+    python -m backend.benchmarks.tool_replay --repeat 3
+
+Needs a configured model (OPENAI_* / KEY.md); it talks to the real API.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from backend.config import ModelSettings, get_app_config
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MODES = ("text", "tools")
+
+REPLAY_CASES: list[dict[str, Any]] = [
+    {
+        "name": "plan-followups",
+        "files": {
+            "workspace/replay/plan.md": (
+                "# Launch plan\n\n- Milestone 1: API freeze, owner Mei, due 2026-11-03\n"
+                "- Milestone 2: load test, owner Ravi, due 2026-11-17\n"
+                "- Milestone 3: public beta, owner Ana, due 2026-12-01\n"
+            ),
+        },
+        "turns": [
+            "Read workspace/replay/plan.md and tell me when the public beta is due.",
+            "Who owns the load test milestone in that plan?",
+            "How many days are there between the API freeze and the public beta?",
+        ],
+    },
+    {
+        "name": "log-triage",
+        "files": {
+            "workspace/replay/app.log": "".join(
+                f"2026-10-18T10:{minute:02d}:00 {'ERROR payment timeout' if minute % 17 == 3 else 'INFO ok'}\n"
+                for minute in range(60)
+            ),
+        },
+        "turns": [
+            "Use the terminal to count the ERROR lines in workspace/replay/app.log.",
+            "At which minutes did those errors happen?",
+            "Which component do the errors come from?",
+        ],
+    },
+    {
+        "name": "config-diff",
+        "files": {
+            "workspace/replay/a.env": "DB_POOL=10\nCACHE_TTL=60\nFEATURE_X=on\n",
+            "workspace/replay/b.env": "DB_POOL=25\nCACHE_TTL=60\nFEATURE_X=off\n",
+        },
+        "turns": [
+            "Read workspace/replay/a.env and workspace/replay/b.env and list the keys that differ.",
+            "What is DB_POOL in the second file?",
+            "Is CACHE_TTL the same in both?",
+        ],
+    },
+]
+
+
+def call_signature(name: str, args: Any) -> str:
+    return f"{name}:{json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+def count_repeated_calls(turn_calls: list[list[str]]) -> int:
+    """Calls whose signature already appeared in an earlier turn of the same session."""
+    seen: set[str] = set()
+    repeated = 0
+    for calls in turn_calls:
+        repeated += sum(1 for signature in calls if signature in seen)
+        seen.update(calls)
+    return repeated
+
+
+def _prepare_root(root: Path, case: dict[str, Any]) -> None:
+    shutil.rmtree(root, ignore_errors=True)
+    for relative, content in case["files"].items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    for name in ("skills", "workspace", "memory", "sessions"):
+        (root / name).mkdir(parents=True, exist_ok=True)
+
+
+async def _play_case(
+    case: dict[str, Any], root: Path, model_settings: ModelSettings, history_tools: bool
+) -> dict[str, Any]:
+    from backend.services.agent_service import AgentService
+    from backend.services.prompt_service import PromptService
+    from backend.services.session_service import SessionService
+    from backend.services.skill_service import SkillService
+    from backend.tools.file_tool import create_read_file_tool
+    from backend.tools.output_compression import (
+        ToolOutputCompressionMiddleware,
+        ToolOutputStore,
+        create_read_tool_output_tool,
+    )
+    from backend.tools.terminal_tool import create_terminal_tool
+
+    _prepare_root(root, case)
+    session_service = SessionService(sessions_dir=root / "sessions")
+    store = ToolOutputStore(session_service.blob_store)
+    service = AgentService(
+        model_settings=model_settings,
+        prompt_service=PromptService(workspace_dir=root / "workspace", memory_file=root / "memory" / "MEMORY.md"),
+        skill_service=SkillService(skills_dir=root / "skills", workspace_dir=root / "workspace", root_dir=root),
+        session_service=session_service,
+        tools=[create_read_file_tool(root), create_terminal_tool(root), create_read_tool_output_tool(store)],
+        middleware=[ToolOutputCompressionMiddleware(store)],
+        history_tools=history_tools,
+    )
+
+    turn_calls: list[list[str]] = []
+    prompt_tokens: list[int] = []
+    started = time.perf_counter()
+    for turn in case["turns"]:
+        calls: list[str] = []
+        async for event in service.stream_chat(turn, session_id=case["name"]):
+            if event["type"] == "tool_call":
+                calls.append(call_signature(event["name"], event["input"]))
+            elif event["type"] == "debug":
+                prompt_tokens.append(int(event["data"]["used"]))
+            elif event["type"] == "error":
+                raise RuntimeError(f"{case['name']}: {event['content']}")
+        turn_calls.append(calls)
+    return {
+        "case": case["name"],
+        "tool_calls": sum(len(calls) for calls in turn_calls),
+        "repeated_calls": count_repeated_calls(turn_calls),
+        "prompt_tokens": prompt_tokens,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def run(work_dir: Path, model_settings: ModelSettings, repeat: int = 1) -> dict[str, Any]:
+    modes: dict[str, Any] = {}
+    for mode in HISTORY_MODES:
+        runs = [
+            asyncio.run(_play_case(case, work_dir / mode / case["name"], model_settings, mode == "tools"))
+            for _ in range(repeat)
+            for case in REPLAY_CASES
+        ]
+        modes[mode] = {
+            "tool_calls": sum(item["tool_calls"] for item in runs),
+            "repeated_calls": sum(item["repeated_calls"] for item in runs),
+            "seconds": round(sum(item["seconds"] for item in runs), 2),
+            "runs": runs,
+        }
+        logger.info("%s history: %s tool calls, %s repeated", mode, modes[mode]["tool_calls"], modes[mode]["repeated_calls"])
+    return {
+        "benchmark": "tool_replay",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model": model_settings.model,
+        "repeat": repeat,
+        "modes": modes,
+    }
+
+
+def main() -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="Count repeated tool calls with and without tool history.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--work-dir", type=Path, default=config.tmp_dir / "benchmarks" / "tool_replay")
+    parser.add_argument("--output", type=Path, default=config.tmp_dir / "benchmarks" / "tool_replay.json")
+    args = parser.parse_args()
+
+    if not config.model.model or not config.model.api_key:
+        parser.error("a model is required: set OPENAI_MODEL / OPENAI_API_KEY or configure KEY.md")
+    logging.basicConfig(level=logging.INFO)
+    report = run(args.work_dir, config.model, repeat=args.repeat)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    for mode, summary in report["modes"].items():
+        print(f"{mode:>6}: {summary['tool_calls']} tool calls, {summary['repeated_calls']} repeated, {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -77,17 +77,19 @@ def _resolve_model_settings(project_root: Path) -> ModelSettings:
 def get_app_config() -> AppConfig:
     project_root = Path(__file__).resolve().parents[1]
     backend_root = project_root / "backend"
+    # BACKEND_ROOT_DIR points the data directories (memory, sessions, skills, ...) at another tree.
+    root_dir = Path(os.getenv("BACKEND_ROOT_DIR", "") or backend_root).resolve()
 
     return AppConfig(
         project_root=project_root,
         backend_root=backend_root,
-        root_dir=backend_root,
-        memory_file=backend_root / "memory" / "MEMORY.md",
-        sessions_dir=backend_root / "sessions",
-        skills_dir=backend_root / "skills",
-        workspace_dir=backend_root / "workspace",
-        knowledge_dir=backend_root / "knowledge",
-        storage_dir=backend_root / "storage",
+        root_dir=root_dir,
+        memory_file=root_dir / "memory" / "MEMORY.md",
+        sessions_dir=root_dir / "sessions",
+        skills_dir=root_dir / "skills",
+        workspace_dir=root_dir / "workspace",
+        knowledge_dir=root_dir / "knowledge",
+        storage_dir=root_dir / "storage",
         tmp_dir=project_root / "tmp",
         model=_resolve_model_settings(project_root),
     )
@@ -95,7 +97,7 @@ def get_app_config() -> AppConfig:
 
 def ensure_runtime_dirs(config: AppConfig) -> None:
     required_dirs = [
-        config.backend_root,
+        config.root_dir,
         config.memory_file.parent,
         config.memory_file.parent / "logs",
         config.sessions_dir,
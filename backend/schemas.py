@@ -12,3 +12,5 @@ class ChatRequest(BaseModel):
 class FileSaveRequest(BaseModel):
     path: str
     content: str
+    # ETag the editor loaded; the save is rejected with 409 if the file changed since.
+    base_etag: str | None = None
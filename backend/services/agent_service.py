@@ -9,9 +9,11 @@ from langchain.agents import create_agent
 from langchain_openai import ChatOpenAI
 
 from backend.config import ModelSettings
+from backend.services.memory_store import MemoryStore
 from backend.services.prompt_service import PromptService
 from backend.services.session_service import SessionEntry, SessionService
 from backend.services.skill_service import SkillService
+from backend.services.token_budget import prompt_budget_for
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +26,19 @@ class AgentService:
         skill_service: SkillService,
         session_service: SessionService,
         tools: list[Any],
+        memory_store: MemoryStore | None = None,
+        middleware: list[Any] | None = None,
+        history_tools: bool = False,
     ) -> None:
         self.model_settings = model_settings
         self.prompt_service = prompt_service
         self.skill_service = skill_service
         self.session_service = session_service
         self.tools = tools
+        self.memory_store = memory_store
+        self.middleware = middleware or []
+        # Replay earlier tool calls and (summarized) results into the history.
+        self.history_tools = history_tools
 
     def _resolve_runtime_model(self) -> tuple[str, str | None]:
         configured = self.model_settings.model
@@ -51,7 +60,8 @@ class AgentService:
             base_url=self.model_settings.base_url or None,
             temperature=0,
         )
-        return create_agent(model=model, tools=self.tools, system_prompt=system_prompt), runtime_model
+        agent = create_agent(model=model, tools=self.tools, system_prompt=system_prompt, middleware=self.middleware)
+        return agent, runtime_model
 
     def _extract_chunk_text(self, chunk: Any) -> str:
         if chunk is None:
@@ -137,6 +147,12 @@ class AgentService:
             return "".join(parts)
         return str(content)
 
+    def _tool_output_value(self, output: Any) -> Any:
+        # Tools invoked through a tool call return a ToolMessage; keep only its content.
+        if hasattr(output, "tool_call_id") and hasattr(output, "content"):
+            return self._message_content(output)
+        return output
+
     def _shorten(self, value: Any, max_chars: int = 2_000) -> str:
         if value is None:
             raw = ""
@@ -151,6 +167,11 @@ class AgentService:
             return raw
         return f"{raw[: max_chars - 14]}...[truncated]"
 
+    def _context_query(self, message: str, history: list[dict[str, str]], turns: int = 3) -> str:
+        # The current message plus the last few user turns, so follow-ups keep their skills and memories.
+        recent = [item["content"] for item in history if item.get("role") == "user"][-turns:]
+        return "\n".join([*recent, message])
+
     async def stream_chat(self, message: str, session_id: str) -> AsyncIterator[dict[str, Any]]:
         session = self.session_service.normalize_session_id(session_id)
 
@@ -161,10 +182,20 @@ class AgentService:
             }
             return
 
-        self.skill_service.refresh_snapshot()
-        system_prompt = self.prompt_service.build_system_prompt()
-        history = self.session_service.to_chat_messages(session)
-        agent, runtime_model = self._build_agent(system_prompt)
+        history = self.session_service.to_chat_messages(session, include_tools=self.history_tools)
+        query = self._context_query(message, history)
+        skills_snapshot = self.skill_service.snapshot_for(query)
+        memory = self.memory_store.context_for(query) if self.memory_store is not None else None
+        runtime_model, _ = self._resolve_runtime_model()
+        plan = self.prompt_service.plan(
+            message=message,
+            history=history,
+            skills_snapshot=skills_snapshot,
+            memory=memory,
+            budget=prompt_budget_for(runtime_model),
+        )
+        logger.debug("Prompt budget for %s: %s", session, plan.to_event()["data"])
+        agent, runtime_model = self._build_agent(plan.system_prompt)
 
         pending_entries: list[SessionEntry] = [SessionEntry(type="user", content=message)]
         tool_call_cache: dict[str, dict[str, Any]] = {}
@@ -172,6 +203,7 @@ class AgentService:
         final_emitted = False
 
         yield {"type": "thought", "content": "已加载技能快照与系统提示，开始执行。"}
+        yield plan.to_event()
         if runtime_model != self.model_settings.model:
             yield {
                 "type": "thought",
@@ -180,7 +212,8 @@ class AgentService:
 
         try:
             async for event in agent.astream_events(
-                {"messages": [*history, {"role": "user", "content": message}]},
+                {"messages": [*plan.history, {"role": "user", "content": message}]},
+                config={"configurable": {"session_id": session}},
                 version="v2",
             ):
                 event_type = event.get("event")
@@ -201,7 +234,7 @@ class AgentService:
                         SessionEntry(
                             type="tool",
                             content=f"{tool_name} called",
-                            tool={"name": tool_name, "input": tool_input},
+                            tool={"name": tool_name, "input": tool_input, "id": run_id},
                         )
                     )
                     yield {"type": "tool_call", "name": tool_name, "input": tool_input}
@@ -210,17 +243,14 @@ class AgentService:
                 if event_type == "on_tool_end":
                     cached = tool_call_cache.get(run_id, {})
                     tool_name = str(cached.get("name") or event.get("name") or "tool")
-                    output = data.get("output")
+                    output = self._tool_output_value(data.get("output"))
                     output_text = self._shorten(output)
+                    full_output = output if isinstance(output, str) else self._shorten(output, max_chars=1_000_000)
                     pending_entries.append(
                         SessionEntry(
                             type="tool",
                             content=f"{tool_name} result",
-                            tool={
-                                "name": tool_name,
-                                "input": cached.get("input", {}),
-                                "output": output_text,
-                            },
+                            tool=self.session_service.tool_result(tool_name, run_id, full_output),
                         )
                     )
                     yield {"type": "tool_result", "name": tool_name, "output": output_text}
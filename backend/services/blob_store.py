@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+_KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+@dataclass
+class GcResult:
+    removed: int
+    kept: int
+    freed_bytes: int
+
+
+class BlobStore:
+    """Content-addressed text blobs under ``sessions/blobs/<k[:2]>/<k>.txt``.
+
+    The key is the first 128 bits of the SHA-256 of the UTF-8 text, so the same
+    output read in a thousand sessions is stored once.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def is_key(key: str) -> bool:
+        return bool(_KEY_PATTERN.fullmatch(key))
+
+    def path_for(self, key: str) -> Path:
+        if not self.is_key(key):
+            raise ValueError(f"invalid blob key: {key!r}")
+        return self.root / key[:2] / f"{key}.txt"
+
+    def put(self, text: str) -> str:
+        key = self.key_for(text)
+        path = self.path_for(key)
+        if path.exists():
+            # Refresh the age so a concurrent gc grace period covers the new reference.
+            os.utime(path)
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            partial.write_text(text, encoding="utf-8")
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        return key
+
+    def get(self, key: str) -> str | None:
+        try:
+            return self.path_for(key).read_text(encoding="utf-8")
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def read_prefix(self, key: str, max_chars: int) -> tuple[str, bool] | None:
+        """The first ``max_chars`` characters and whether the blob is longer, without reading it all."""
+        try:
+            with self.path_for(key).open(encoding="utf-8") as handle:
+                text = handle.read(max_chars + 1)
+        except (FileNotFoundError, ValueError):
+            return None
+        return text[:max_chars], len(text) > max_chars
+
+    def gc(self, referenced: set[str], min_age_seconds: float = 3_600) -> GcResult:
+        """Delete blobs no session references; recent blobs are kept for in-flight runs."""
+        cutoff = time.time() - min_age_seconds
+        removed = kept = freed = 0
+        for path in self.root.glob("??/*.txt"):
+            stat_result = path.stat()
+            if path.stem in referenced or stat_result.st_mtime > cutoff:
+                kept += 1
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += stat_result.st_size
+        return GcResult(removed=removed, kept=kept, freed_bytes=freed)
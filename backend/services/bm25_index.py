@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.types import BaseDocumentStore
+
+BM25_INDEX_DIRNAME = "bm25"
+
+_META_FILE = "meta.json"
+_VOCAB_FILE = "vocab.json"
+_DOC_IDS_FILE = "doc_ids.json"
+_OFFSETS_FILE = "offsets.npy"
+_POSTING_DOCS_FILE = "posting_docs.npy"
+_POSTING_TFS_FILE = "posting_tfs.npy"
+_DOC_LENS_FILE = "doc_lens.npy"
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]+")
+_CJK_PATTERN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    tokens: list[str] = []
+    for run in _WORD_PATTERN.findall(text.lower()):
+        if not _CJK_PATTERN.match(run):
+            if run not in _STOPWORDS:
+                tokens.append(run)
+            continue
+        # CJK text has no spaces: index overlapping character bigrams.
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[idx : idx + 2] for idx in range(len(run) - 1))
+    return tokens
+
+
+def _save_npy_atomic(path: Path, array: np.ndarray) -> None:
+    tmp_path = path.with_name(f".{path.stem}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _write_json_atomic(path: Path, payload: Any) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class BM25Index:
+    """Okapi BM25 statistics persisted as CSR-style postings under ``storage/bm25``.
+
+    The on-disk base segment is memory-mapped on first search; documents added
+    or removed afterwards live in an in-memory delta until ``persist`` merges
+    both into a new base segment.
+    """
+
+    def __init__(self, index_dir: Path, k1: float = 1.5, b: float = 0.75) -> None:
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self._base_count = 0
+        self._loaded = False
+
+        self._vocab: dict[str, int] = {}
+        self._offsets: np.ndarray | None = None
+        self._posting_docs: np.ndarray | None = None
+        self._posting_tfs: np.ndarray | None = None
+        self._base_lens: np.ndarray = np.empty(0, dtype=np.int32)
+
+        self._doc_ids: list[str | None] = []
+        self._row_by_doc: dict[str, int] = {}
+        self._delta_lens: list[int] = []
+        self._delta_postings: dict[str, dict[int, int]] = {}
+        self._deleted: set[int] = set()
+        self._total_len = 0
+
+        meta_path = index_dir / _META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self._base_count = int(meta.get("doc_count", 0))
+            self._total_len = int(meta.get("total_len", 0))
+        else:
+            self._loaded = True
+
+    @property
+    def exists(self) -> bool:
+        return (self.index_dir / _META_FILE).exists()
+
+    @property
+    def doc_count(self) -> int:
+        if not self._loaded:
+            return self._base_count
+        return len(self._row_by_doc)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._delta_lens or self._deleted)
+
+    def clear(self) -> None:
+        self._offsets = self._posting_docs = self._posting_tfs = None
+        self._base_lens = np.empty(0, dtype=np.int32)
+        self._vocab = {}
+        self._doc_ids = []
+        self._row_by_doc = {}
+        self._delta_lens = []
+        self._delta_postings = {}
+        self._deleted = set()
+        self._base_count = 0
+        self._total_len = 0
+        self._loaded = True
+        (self.index_dir / _META_FILE).unlink(missing_ok=True)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        vocab_terms: list[str] = json.loads((self.index_dir / _VOCAB_FILE).read_text(encoding="utf-8"))
+        self._vocab = {term: idx for idx, term in enumerate(vocab_terms)}
+        self._doc_ids = json.loads((self.index_dir / _DOC_IDS_FILE).read_text(encoding="utf-8"))
+        self._row_by_doc = {doc_id: row for row, doc_id in enumerate(self._doc_ids) if doc_id is not None}
+        self._offsets = np.load(self.index_dir / _OFFSETS_FILE, mmap_mode="r")
+        self._posting_docs = np.load(self.index_dir / _POSTING_DOCS_FILE, mmap_mode="r")
+        self._posting_tfs = np.load(self.index_dir / _POSTING_TFS_FILE, mmap_mode="r")
+        self._base_lens = np.load(self.index_dir / _DOC_LENS_FILE, mmap_mode="r")
+
+    def contains(self, doc_id: str) -> bool:
+        self._ensure_loaded()
+        return doc_id in self._row_by_doc
+
+    def doc_ids(self) -> list[str]:
+        self._ensure_loaded()
+        return list(self._row_by_doc)
+
+    def add(self, doc_id: str, text: str) -> None:
+        self._ensure_loaded()
+        if doc_id in self._row_by_doc:
+            self.remove(doc_id)
+
+        counts = Counter(tokenize(text))
+        row = len(self._doc_ids)
+        length = sum(counts.values())
+        self._doc_ids.append(doc_id)
+        self._row_by_doc[doc_id] = row
+        self._delta_lens.append(length)
+        self._total_len += length
+        for term, tf in counts.items():
+            self._delta_postings.setdefault(term, {})[row] = tf
+
+    def remove(self, doc_id: str) -> bool:
+        self._ensure_loaded()
+        row = self._row_by_doc.pop(doc_id, None)
+        if row is None:
+            return False
+        self._doc_ids[row] = None
+        self._deleted.add(row)
+        self._total_len -= self._doc_length(row)
+        return True
+
+    def _doc_length(self, row: int) -> int:
+        if row < self._base_count:
+            return int(self._base_lens[row])
+        return self._delta_lens[row - self._base_count]
+
+    def _lengths(self) -> np.ndarray:
+        lengths = np.empty(len(self._doc_ids), dtype=np.float32)
+        lengths[: self._base_count] = self._base_lens
+        lengths[self._base_count :] = self._delta_lens
+        return lengths
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        docs: list[np.ndarray] = []
+        tfs: list[np.ndarray] = []
+        term_id = self._vocab.get(term)
+        if term_id is not None and self._offsets is not None:
+            start, stop = int(self._offsets[term_id]), int(self._offsets[term_id + 1])
+            docs.append(np.asarray(self._posting_docs[start:stop], dtype=np.int64))
+            tfs.append(np.asarray(self._posting_tfs[start:stop], dtype=np.float32))
+        delta = self._delta_postings.get(term)
+        if delta:
+            docs.append(np.fromiter(delta.keys(), dtype=np.int64, count=len(delta)))
+            tfs.append(np.fromiter(delta.values(), dtype=np.float32, count=len(delta)))
+        if not docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def search(self, query: str, top_k: int = 4) -> list[tuple[str, float]]:
+        self._ensure_loaded()
+        live_count = len(self._row_by_doc)
+        terms = set(tokenize(query))
+        if not terms or live_count == 0:
+            return []
+
+        deleted = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+        lengths = self._lengths()
+        avgdl = max(self._total_len / live_count, 1.0)
+        norms = self.k1 * (1.0 - self.b + self.b * lengths / avgdl)
+        scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+
+        for term in terms:
+            docs, tfs = self._postings(term)
+            if deleted.size and docs.size:
+                keep = ~np.isin(docs, deleted)
+                docs, tfs = docs[keep], tfs[keep]
+            if not docs.size:
+                continue
+            df = docs.size
+            idf = math.log(1.0 + (live_count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norms[docs])
+
+        matched = np.flatnonzero(scores > 0)
+        if not matched.size:
+            return []
+        if matched.size > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        ordered = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(str(self._doc_ids[row]), float(scores[row])) for row in ordered]
+
+    def persist(self) -> None:
+        self._ensure_loaded()
+        if self.exists and not self.dirty:
+            return
+
+        live_rows = [row for row, doc_id in enumerate(self._doc_ids) if doc_id is not None]
+        remap = np.full(len(self._doc_ids), -1, dtype=np.int64)
+        remap[live_rows] = np.arange(len(live_rows))
+        lengths = self._lengths()[live_rows].astype(np.int32) if live_rows else np.empty(0, dtype=np.int32)
+
+        terms = sorted(set(self._vocab) | set(self._delta_postings))
+        vocab: list[str] = []
+        offsets: list[int] = [0]
+        doc_chunks: list[np.ndarray] = []
+        tf_chunks: list[np.ndarray] = []
+        for term in terms:
+            docs, tfs = self._postings(term)
+            new_docs = remap[docs] if docs.size else docs
+            keep = new_docs >= 0
+            if not keep.any():
+                continue
+            order = np.argsort(new_docs[keep], kind="stable")
+            doc_chunks.append(new_docs[keep][order].astype(np.int32))
+            tf_chunks.append(tfs[keep][order].astype(np.int32))
+            vocab.append(term)
+            offsets.append(offsets[-1] + int(keep.sum()))
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        # Drop the maps before replacing the files they point at.
+        self._offsets = self._posting_docs = self._posting_tfs = None
+        self._base_lens = np.empty(0, dtype=np.int32)
+        _save_npy_atomic(self.index_dir / _OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+        _save_npy_atomic(
+            self.index_dir / _POSTING_DOCS_FILE,
+            np.concatenate(doc_chunks) if doc_chunks else np.empty(0, dtype=np.int32),
+        )
+        _save_npy_atomic(
+            self.index_dir / _POSTING_TFS_FILE,
+            np.concatenate(tf_chunks) if tf_chunks else np.empty(0, dtype=np.int32),
+        )
+        _save_npy_atomic(self.index_dir / _DOC_LENS_FILE, lengths)
+        _write_json_atomic(self.index_dir / _VOCAB_FILE, vocab)
+        _write_json_atomic(self.index_dir / _DOC_IDS_FILE, [self._doc_ids[row] for row in live_rows])
+        _write_json_atomic(
+            self.index_dir / _META_FILE,
+            {"version": 1, "doc_count": len(live_rows), "total_len": int(lengths.sum()), "k1": self.k1, "b": self.b},
+        )
+
+        self._base_count = len(live_rows)
+        self._total_len = int(lengths.sum())
+        self._delta_lens = []
+        self._delta_postings = {}
+        self._deleted = set()
+        self._loaded = False
+        self._ensure_loaded()
+
+
+class PersistentBM25Retriever(BaseRetriever):
+    def __init__(self, index: BM25Index, docstore: BaseDocumentStore, similarity_top_k: int = 4) -> None:
+        super().__init__()
+        self.index = index
+        self.docstore = docstore
+        self.similarity_top_k = similarity_top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        results: list[NodeWithScore] = []
+        for node_id, score in self.index.search(query_bundle.query_str, top_k=self.similarity_top_k):
+            node = self.docstore.get_node(node_id, raise_error=False)
+            if node is not None:
+                results.append(NodeWithScore(node=node, score=score))
+        return results
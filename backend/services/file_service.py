@@ -1,20 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import stat
+import threading
+import uuid
+import weakref
 from pathlib import Path
+from typing import AsyncIterator, BinaryIO
 
 
 class PathSecurityError(ValueError):
     """Raised when a path attempts to escape root_dir or violates policy."""
 
 
+class UploadTooLargeError(ValueError):
+    """Raised when a streamed upload exceeds the allowed size."""
+
+
+class WriteConflictError(ValueError):
+    """Raised when a write's base ETag no longer matches the file on disk."""
+
+    def __init__(self, relative_path: str, current_etag: str | None) -> None:
+        super().__init__(f"{relative_path} changed since it was read")
+        self.current_etag = current_etag
+
+
 class FileService:
     def __init__(
         self,
         root_dir: Path,
-        writable_prefixes: tuple[str, ...] = ("memory/", "skills/", "workspace/", "sessions/"),
+        writable_prefixes: tuple[str, ...] = ("memory/", "skills/", "workspace/", "sessions/", "knowledge/"),
     ) -> None:
         self.root_dir = root_dir.resolve()
         self.writable_prefixes = writable_prefixes
+        # Weak values: a path's lock lives only while some writer holds it, so
+        # the map does not grow with every file ever written.
+        self._write_locks: weakref.WeakValueDictionary[Path, threading.Lock] = weakref.WeakValueDictionary()
+        self._write_locks_guard = threading.Lock()
 
     def _normalize_relative_path(self, relative_path: str) -> str:
         path = relative_path.strip().replace("\\", "/")
@@ -42,16 +65,93 @@ class FileService:
         normalized = self._normalize_relative_path(relative_path)
         return any(normalized.startswith(prefix) for prefix in self.writable_prefixes)
 
+    def stat(self, relative_path: str) -> tuple[Path, os.stat_result]:
+        target = self.resolve_safe_path(relative_path)
+        try:
+            stat_result = target.stat()
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(f"file not found: {relative_path}")
+        return target, stat_result
+
+    @staticmethod
+    def etag_for(stat_result: os.stat_result) -> str:
+        # mtime_ns plus size changes on every write without hashing the content.
+        return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
     def read_text(self, relative_path: str) -> str:
         target = self.resolve_safe_path(relative_path)
         if not target.exists() or not target.is_file():
             raise FileNotFoundError(f"file not found: {relative_path}")
         return target.read_text(encoding="utf-8")
 
-    def write_text(self, relative_path: str, content: str) -> None:
+    def _write_lock(self, target: Path) -> threading.Lock:
+        with self._write_locks_guard:
+            return self._write_locks.setdefault(target, threading.Lock())
+
+    def write_text(self, relative_path: str, content: str, base_etag: str | None = None) -> str:
+        """Atomically replace the file and return its new ETag.
+
+        With ``base_etag`` the write only happens if the file still has that
+        ETag (an empty string means "must not exist yet"). Writing identical
+        content leaves the file, and its mtime, untouched.
+        """
         if not self.can_write(relative_path):
             raise PathSecurityError("write path is not allowed")
 
         target = self.resolve_safe_path(relative_path)
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(content, encoding="utf-8")
+        data = content.encode("utf-8")
+        with self._write_lock(target):
+            try:
+                current: os.stat_result | None = target.stat()
+            except FileNotFoundError:
+                current = None
+            current_etag = self.etag_for(current) if current is not None else None
+            if base_etag is not None and base_etag != (current_etag or ""):
+                raise WriteConflictError(relative_path, current_etag)
+            if current is not None and current.st_size == len(data) and target.read_bytes() == data:
+                return current_etag or ""
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.part")
+            try:
+                partial.write_bytes(data)
+                # Readers see either the old file or the new one, never a half-written one.
+                os.replace(partial, target)
+            finally:
+                partial.unlink(missing_ok=True)
+            return self.etag_for(target.stat())
+
+    async def write_stream(
+        self,
+        relative_path: str,
+        chunks: AsyncIterator[bytes],
+        max_bytes: int | None = None,
+    ) -> int:
+        if not self.can_write(relative_path):
+            raise PathSecurityError("write path is not allowed")
+
+        target = self.resolve_safe_path(relative_path)
+        partial = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.part")
+        written = 0
+        # Disk writes run in worker threads so a slow disk never stalls the event loop.
+        handle = await asyncio.to_thread(self._open_partial, partial)
+        try:
+            try:
+                async for chunk in chunks:
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        raise UploadTooLargeError(f"upload exceeds {max_bytes} bytes")
+                    await asyncio.to_thread(handle.write, chunk)
+            finally:
+                await asyncio.to_thread(handle.close)
+            await asyncio.to_thread(os.replace, partial, target)
+        finally:
+            await asyncio.to_thread(partial.unlink, missing_ok=True)
+        return written
+
+    @staticmethod
+    def _open_partial(partial: Path) -> BinaryIO:
+        partial.parent.mkdir(parents=True, exist_ok=True)
+        return partial.open("wb")
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from llama_index.core import Document
+    from llama_index.core.schema import BaseNode
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_SUFFIXES = (".md", ".txt", ".pdf")
+
+
+@dataclass
+class FileIngestResult:
+    path: str
+    nodes: list[BaseNode] = field(default_factory=list)
+    parse_seconds: float = 0.0
+    index_seconds: float = 0.0
+    error: str | None = None
+
+    def to_report(self) -> dict[str, Any]:
+        data = asdict(self)
+        data.pop("nodes")
+        data["chunks"] = len(self.nodes)
+        return data
+
+
+@dataclass
+class IngestReport:
+    files: list[dict[str, Any]] = field(default_factory=list)
+    workers: int = 1
+    total_seconds: float = 0.0
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(int(item["chunks"]) for item in self.files)
+
+    @property
+    def failed(self) -> list[dict[str, Any]]:
+        return [item for item in self.files if item["error"]]
+
+
+def list_knowledge_files(knowledge_dir: Path) -> list[Path]:
+    return sorted(
+        path for path in knowledge_dir.rglob("*") if path.is_file() and path.suffix.lower() in KNOWLEDGE_SUFFIXES
+    )
+
+
+def _load_pdf(path: Path) -> list[Document]:
+    from llama_index.core import Document
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    documents: list[Document] = []
+    for page_number, page in enumerate(reader.pages, start=1):
+        text = (page.extract_text() or "").strip()
+        if not text:
+            continue
+        documents.append(
+            Document(
+                id_=f"{path}_page_{page_number}",
+                text=text,
+                metadata={"file_path": str(path), "file_name": path.name, "page_label": str(page_number)},
+            )
+        )
+    return documents
+
+
+def parse_file(path: str, chunk_size: int, chunk_overlap: int) -> FileIngestResult:
+    # Runs inside pool workers, so it must stay a picklable top-level function.
+    # llama_index is imported here so that importing this module stays cheap.
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.core.node_parser import SentenceSplitter
+
+    started = time.perf_counter()
+    result = FileIngestResult(path=path)
+    try:
+        file_path = Path(path)
+        if file_path.suffix.lower() == ".pdf":
+            documents = _load_pdf(file_path)
+        else:
+            documents = SimpleDirectoryReader(input_files=[file_path], filename_as_id=True).load_data()
+        splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        result.nodes = splitter.get_nodes_from_documents(documents)
+    except Exception as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.parse_seconds = time.perf_counter() - started
+    return result
+
+
+def iter_parsed_files(
+    paths: Iterable[Path],
+    workers: int,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Iterator[FileIngestResult]:
+    pending_paths = [str(path) for path in paths]
+    if workers <= 1 or len(pending_paths) <= 1:
+        for path in pending_paths:
+            yield parse_file(path, chunk_size, chunk_overlap)
+        return
+
+    # spawn, not fork: the server process has live threads and event loops.
+    context = multiprocessing.get_context("spawn")
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight: dict[Future[FileIngestResult], str] = {}
+        queue = iter(pending_paths)
+        while True:
+            while len(in_flight) < max_in_flight:
+                path = next(queue, None)
+                if path is None:
+                    break
+                in_flight[pool.submit(parse_file, path, chunk_size, chunk_overlap)] = path
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except Exception as exc:
+                    yield FileIngestResult(path=path, error=f"{type(exc).__name__}: {exc}")
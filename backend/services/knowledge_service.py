@@ -2,23 +2,73 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Hashable, Iterator
 
 from backend.config import ModelSettings
 
 logger = logging.getLogger(__name__)
 
 try:
-    from llama_index.core import Settings, SimpleDirectoryReader, StorageContext, VectorStoreIndex, load_index_from_storage
-    from llama_index.retrievers.bm25 import BM25Retriever
+    from llama_index.core import Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+    from llama_index.core.indices.utils import embed_nodes
+    from llama_index.core.schema import NodeWithScore, QueryBundle
+
+    from backend.services.bm25_index import BM25_INDEX_DIRNAME, BM25Index, PersistentBM25Retriever
+    from backend.services.knowledge_ingest import (
+        FileIngestResult,
+        IngestReport,
+        iter_parsed_files,
+        list_knowledge_files,
+    )
+    from backend.services.vector_store import (
+        MMAP_STORE_DIRNAME,
+        MmapVectorStore,
+        find_simple_vector_store,
+        migrate_simple_vector_store,
+    )
 except Exception:  # pragma: no cover - import guard for environments without deps
     Settings = None
-    SimpleDirectoryReader = None
     StorageContext = None
     VectorStoreIndex = None
     load_index_from_storage = None
-    BM25Retriever = None
+    BM25Index = None
+    MmapVectorStore = None
+
+SEARCH_MODES = ("hybrid", "vector", "bm25")
+RRF_K = 60
+
+
+class _ResultCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
 
 
 class KnowledgeService:
@@ -27,8 +77,18 @@ class KnowledgeService:
         self.storage_dir = storage_dir
         self.model_settings = model_settings
         self.vector_index: Any | None = None
+        self.bm25_index: Any | None = None
         self.bm25_retriever: Any | None = None
         self.initialized = False
+        self.vector_store_kind = os.getenv("KNOWLEDGE_VECTOR_STORE", "simple").strip().lower()
+        self.vector_dtype = os.getenv("KNOWLEDGE_VECTOR_DTYPE", "float32").strip().lower()
+        self.index_version = 0
+        self._retrievers: dict[tuple[str, int], Any] = {}
+        self._result_cache = _ResultCache(int(os.getenv("KNOWLEDGE_SEARCH_CACHE_SIZE", "256")))
+        self._retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kb-retrieve")
+        self.ingest_workers = int(os.getenv("KNOWLEDGE_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.last_ingest_report: Any | None = None
+        self._lock = threading.RLock()
 
     def _configure_embeddings(self) -> None:
         if Settings is None:
@@ -47,43 +107,241 @@ class KnowledgeService:
         except Exception as exc:  # pragma: no cover - external dependency behavior
             logger.warning("Failed to configure embedding model: %s", exc)
 
+    def _build_vector_store(self, fresh: bool) -> Any | None:
+        if self.vector_store_kind != "mmap" or MmapVectorStore is None:
+            return None
+
+        mmap_dir = self.storage_dir / MMAP_STORE_DIRNAME
+        if fresh:
+            store = MmapVectorStore(persist_dir=mmap_dir, dtype=self.vector_dtype)
+            store.clear()
+            return store
+        if (mmap_dir / "meta.json").exists():
+            return MmapVectorStore.from_persist_dir(mmap_dir, dtype=self.vector_dtype)
+        if find_simple_vector_store(self.storage_dir) is not None:
+            return migrate_simple_vector_store(self.storage_dir, dtype=self.vector_dtype)
+        return MmapVectorStore(persist_dir=mmap_dir, dtype=self.vector_dtype)
+
     def initialize(self) -> None:
         if self.initialized:
             return
 
         self.initialized = True
-        if SimpleDirectoryReader is None or StorageContext is None or VectorStoreIndex is None:
+        if StorageContext is None or VectorStoreIndex is None:
             logger.warning("LlamaIndex dependencies are unavailable; knowledge search will fallback")
             return
 
         self._configure_embeddings()
-        docs = list(self.knowledge_dir.rglob("*.md")) + list(self.knowledge_dir.rglob("*.txt")) + list(
-            self.knowledge_dir.rglob("*.pdf")
-        )
+        docs = list_knowledge_files(self.knowledge_dir)
         if not docs:
             return
 
         try:
             self.storage_dir.mkdir(parents=True, exist_ok=True)
-            has_storage = any(self.storage_dir.iterdir())
+            has_storage = (self.storage_dir / "docstore.json").exists()
             if has_storage:
-                storage_context = StorageContext.from_defaults(persist_dir=str(self.storage_dir))
+                storage_context = StorageContext.from_defaults(
+                    persist_dir=str(self.storage_dir),
+                    vector_store=self._build_vector_store(fresh=False),
+                )
                 self.vector_index = load_index_from_storage(storage_context)
+                self.bm25_index = BM25Index(self.storage_dir / BM25_INDEX_DIRNAME)
+                self._sync_bm25_index()
+                self._attach_bm25_retriever()
             else:
-                reader = SimpleDirectoryReader(input_dir=str(self.knowledge_dir), recursive=True)
-                documents = reader.load_data()
-                self.vector_index = VectorStoreIndex.from_documents(documents)
-                self.vector_index.storage_context.persist(persist_dir=str(self.storage_dir))
-
-            if BM25Retriever is not None and self.vector_index is not None:
-                self.bm25_retriever = BM25Retriever.from_defaults(
-                    docstore=self.vector_index.docstore,
-                    similarity_top_k=4,
-                )
+                self._create_empty_index()
+                self.ingest_files(docs)
+                self._persist()
         except Exception as exc:  # pragma: no cover - external dependency behavior
             logger.warning("Failed to initialize knowledge index: %s", exc)
             self.vector_index = None
+            self.bm25_index = None
             self.bm25_retriever = None
+        self._mark_index_changed()
+
+    def _create_empty_index(self) -> None:
+        storage_context = StorageContext.from_defaults(vector_store=self._build_vector_store(fresh=True))
+        self.vector_index = VectorStoreIndex(nodes=[], storage_context=storage_context)
+        self.bm25_index = BM25Index(self.storage_dir / BM25_INDEX_DIRNAME)
+        self.bm25_index.clear()
+        self._attach_bm25_retriever()
+
+    def _attach_bm25_retriever(self) -> None:
+        self.bm25_retriever = PersistentBM25Retriever(
+            self.bm25_index,
+            docstore=self.vector_index.docstore,
+            similarity_top_k=4,
+        )
+
+    def _persist(self) -> None:
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.vector_index.storage_context.persist(persist_dir=str(self.storage_dir))
+        if self.bm25_index is not None:
+            self.bm25_index.persist()
+
+    def _ref_doc_ids_for(self, path: Path) -> list[str]:
+        target = path.resolve()
+        ref_doc_infos = self.vector_index.docstore.get_all_ref_doc_info() or {}
+        return [
+            ref_doc_id
+            for ref_doc_id, info in ref_doc_infos.items()
+            if Path(str(info.metadata.get("file_path", ""))).resolve() == target
+        ]
+
+    def _remove_ref_docs(self, ref_doc_ids: list[str]) -> int:
+        removed = 0
+        docstore = self.vector_index.docstore
+        for ref_doc_id in ref_doc_ids:
+            info = docstore.get_ref_doc_info(ref_doc_id)
+            node_ids = list(info.node_ids) if info is not None else []
+            self.vector_index.delete_ref_doc(ref_doc_id, delete_from_docstore=True)
+            if self.bm25_index is not None:
+                for node_id in node_ids:
+                    self.bm25_index.remove(node_id)
+            removed += len(node_ids)
+        return removed
+
+    def add_document(self, path: Path) -> dict[str, Any]:
+        previous_report = self.last_ingest_report
+        self.initialize()
+        if StorageContext is None:
+            return {"path": str(path), "chunks": 0, "error": "LlamaIndex dependencies are unavailable"}
+
+        # A first upload can trigger the initial build, which already ingested
+        # and persisted this file; ingesting it again would only redo the work.
+        report = self.last_ingest_report
+        if report is not None and report is not previous_report:
+            target = path.resolve()
+            for entry in report.files:
+                if Path(entry["path"]).resolve() == target:
+                    return {**entry, "replaced_chunks": 0, "persist_seconds": 0.0}
+
+        # Parsing and embedding wait on the embedding API, so they run before the
+        # lock is taken; searches only wait for the swap and the persist.
+        [parsed] = list(self._parse_and_embed([path], workers=1))
+        with self._lock:
+            if self.vector_index is None:
+                self._create_empty_index()
+            replaced = self._remove_ref_docs(self._ref_doc_ids_for(path))
+            self._index_parsed(parsed)
+            persist_started = time.perf_counter()
+            self._persist()
+            self._mark_index_changed()
+
+        result = parsed.to_report()
+        result["replaced_chunks"] = replaced
+        result["persist_seconds"] = time.perf_counter() - persist_started
+        return result
+
+    def remove_document(self, path: Path) -> int:
+        self.initialize()
+        if self.vector_index is None:
+            return 0
+
+        with self._lock:
+            removed = self._remove_ref_docs(self._ref_doc_ids_for(path))
+            if removed:
+                self._persist()
+                self._mark_index_changed()
+        return removed
+
+    def list_documents(self) -> list[dict[str, Any]]:
+        self.initialize()
+        chunk_counts: dict[Path, int] = {}
+        if self.vector_index is not None:
+            with self._lock:
+                ref_doc_infos = self.vector_index.docstore.get_all_ref_doc_info() or {}
+            for info in ref_doc_infos.values():
+                file_path = Path(str(info.metadata.get("file_path", ""))).resolve()
+                chunk_counts[file_path] = chunk_counts.get(file_path, 0) + len(info.node_ids)
+
+        documents: list[dict[str, Any]] = []
+        for path in list_knowledge_files(self.knowledge_dir):
+            stat = path.stat()
+            documents.append(
+                {
+                    "path": path.relative_to(self.knowledge_dir).as_posix(),
+                    "size_bytes": stat.st_size,
+                    "updated_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat(),
+                    "chunks": chunk_counts.get(path.resolve(), 0),
+                }
+            )
+        return documents
+
+    def ingest_files(self, paths: list[Path]) -> IngestReport:
+        started = time.perf_counter()
+        workers = max(1, min(self.ingest_workers, len(paths)))
+        report = IngestReport(workers=workers)
+
+        # Files are embedded and indexed as each worker finishes, so at most a
+        # few parsed files are held in memory at any time.
+        for result in self._parse_and_embed(paths, workers):
+            with self._lock:
+                self._index_parsed(result)
+            report.files.append(result.to_report())
+
+        report.total_seconds = time.perf_counter() - started
+        self.last_ingest_report = report
+        logger.info(
+            "Ingested %d files (%d chunks, %d failed) in %.2fs with %d workers",
+            len(report.files),
+            report.chunk_count,
+            len(report.failed),
+            report.total_seconds,
+            workers,
+        )
+        return report
+
+    def _parse_and_embed(self, paths: list[Path], workers: int) -> Iterator[FileIngestResult]:
+        for result in iter_parsed_files(paths, workers, Settings.chunk_size, Settings.chunk_overlap):
+            if result.error is None and result.nodes:
+                embed_started = time.perf_counter()
+                try:
+                    embeddings = embed_nodes(result.nodes, Settings.embed_model)
+                    for node in result.nodes:
+                        node.embedding = embeddings[node.node_id]
+                except Exception as exc:  # pragma: no cover - external dependency behavior
+                    result.error = f"{type(exc).__name__}: {exc}"
+                result.index_seconds += time.perf_counter() - embed_started
+            if result.error is not None:
+                logger.warning("Failed to ingest %s: %s", result.path, result.error)
+            yield result
+
+    def _index_parsed(self, result: FileIngestResult) -> None:
+        """Insert already embedded nodes; the caller holds ``_lock``."""
+        if result.error is not None or not result.nodes:
+            return
+        index_started = time.perf_counter()
+        try:
+            self.vector_index.insert_nodes(result.nodes)
+            if self.bm25_index is not None:
+                for node in result.nodes:
+                    self.bm25_index.add(node.node_id, self._node_content(node))
+        except Exception as exc:  # pragma: no cover - external dependency behavior
+            result.error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Failed to ingest %s: %s", result.path, result.error)
+        result.index_seconds += time.perf_counter() - index_started
+
+    def _sync_bm25_index(self) -> None:
+        if self.bm25_index is None or self.vector_index is None:
+            return
+
+        node_ids = set(self.vector_index.index_struct.nodes_dict.values())
+        # Compare ids, not counts: a rebuild can keep the count but mint new ids.
+        indexed = set(self.bm25_index.doc_ids())
+        if self.bm25_index.exists and indexed == node_ids:
+            return
+
+        # Only nodes missing from the persisted statistics are tokenized.
+        docstore = self.vector_index.docstore
+        for node_id in node_ids - indexed:
+            node = docstore.get_node(node_id, raise_error=False)
+            if node is not None:
+                self.bm25_index.add(node_id, self._node_content(node))
+        for node_id in indexed - node_ids:
+            self.bm25_index.remove(node_id)
+        self.bm25_index.persist()
+        logger.info("BM25 index synced: %d documents", self.bm25_index.doc_count)
 
     def _node_content(self, node_like: Any) -> str:
         node = getattr(node_like, "node", node_like)
@@ -94,6 +352,81 @@ class KnowledgeService:
             return str(text)
         return str(node)
 
+    def _mark_index_changed(self) -> None:
+        self.index_version += 1
+        self._retrievers.clear()
+        self._result_cache.clear()
+
+    def _retriever(self, kind: str, top_k: int) -> Any:
+        key = (kind, top_k)
+        retriever = self._retrievers.get(key)
+        if retriever is None:
+            if kind == "vector":
+                retriever = self.vector_index.as_retriever(similarity_top_k=top_k)
+            else:
+                retriever = PersistentBM25Retriever(
+                    self.bm25_index,
+                    docstore=self.vector_index.docstore,
+                    similarity_top_k=top_k,
+                )
+            self._retrievers[key] = retriever
+        return retriever
+
+    def _safe_retrieve(self, kind: str, query: str, top_k: int) -> list[Any] | None:
+        """Results of one retriever, or None when it failed."""
+        try:
+            query_bundle = QueryBundle(query_str=query)
+            if kind == "vector":
+                # Embed outside the lock so uploads only block the index lookup.
+                query_bundle.embedding = Settings.embed_model.get_query_embedding(query)
+            with self._lock:
+                return list(self._retriever(kind, top_k).retrieve(query_bundle))
+        except Exception as exc:  # pragma: no cover - external dependency behavior
+            logger.warning("%s retrieval failed: %s", "Vector" if kind == "vector" else "BM25", exc)
+            return None
+
+    def _fuse(self, result_lists: list[list[Any]], top_k: int) -> list[Any]:
+        fused: dict[str, float] = {}
+        first_seen: dict[str, Any] = {}
+        for results in result_lists:
+            ordered = sorted(results, key=lambda item: item.score or 0.0, reverse=True)
+            rank = 0
+            previous_score: float | None = None
+            for position, item in enumerate(ordered, start=1):
+                # Equal raw scores share a rank instead of being split by list order.
+                if item.score != previous_score:
+                    rank = position
+                    previous_score = item.score
+                node_id = item.node.node_id
+                fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (RRF_K + rank)
+                first_seen.setdefault(node_id, item)
+
+        ranked = sorted(fused, key=lambda node_id: fused[node_id], reverse=True)[:top_k]
+        return [NodeWithScore(node=first_seen[node_id].node, score=fused[node_id]) for node_id in ranked]
+
+    def retrieve(self, query: str, top_k: int = 4, mode: str = "hybrid") -> list[Any]:
+        return self._retrieve(query, top_k, mode)[0]
+
+    def _retrieve(self, query: str, top_k: int, mode: str) -> tuple[list[Any], bool]:
+        """Fused results, and whether every retriever answered without an error."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"unknown search mode: {mode}")
+        self.initialize()
+        if self.vector_index is None or not query.strip():
+            return [], True
+
+        kinds = [kind for kind in ("vector", "bm25") if mode in ("hybrid", kind)]
+        if self.bm25_retriever is None and "bm25" in kinds:
+            kinds.remove("bm25")
+        if len(kinds) == 1:
+            result_lists = [self._safe_retrieve(kinds[0], query, top_k)]
+        else:
+            # The vector side waits on the embedding API, so BM25 runs alongside it.
+            futures = [self._retrieval_pool.submit(self._safe_retrieve, kind, query, top_k) for kind in kinds]
+            result_lists = [future.result() for future in futures]
+        fused = self._fuse([results for results in result_lists if results is not None], top_k)
+        return fused, all(results is not None for results in result_lists)
+
     def search(self, query: str, top_k: int = 4) -> str:
         self.initialize()
 
@@ -103,31 +436,25 @@ class KnowledgeService:
         if self.vector_index is None:
             return "Knowledge base unavailable or empty."
 
-        try:
-            vector_retriever = self.vector_index.as_retriever(similarity_top_k=top_k)
-            vector_results = vector_retriever.retrieve(query)
-        except Exception as exc:  # pragma: no cover - external dependency behavior
-            logger.warning("Vector retrieval failed: %s", exc)
-            vector_results = []
-
-        try:
-            bm25_results = self.bm25_retriever.retrieve(query) if self.bm25_retriever is not None else []
-        except Exception as exc:  # pragma: no cover - external dependency behavior
-            logger.warning("BM25 retrieval failed: %s", exc)
-            bm25_results = []
+        cache_key = (" ".join(query.lower().split()), top_k, self.index_version)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
+        results, complete = self._retrieve(query, top_k, "hybrid")
         merged: list[str] = []
-        seen: set[str] = set()
-        for item in [*vector_results, *bm25_results]:
+        for item in results:
             content = self._node_content(item).strip()
-            if content and content not in seen:
-                seen.add(content)
+            if content:
                 merged.append(content)
 
         if not merged:
-            return "No relevant knowledge found."
-
-        payload = "\n\n---\n\n".join(merged[:top_k])
-        if len(payload) > 6_000:
-            payload = f"{payload[:5990]}...[truncated]"
+            payload = "No relevant knowledge found."
+        else:
+            payload = "\n\n---\n\n".join(merged)
+            if len(payload) > 6_000:
+                payload = f"{payload[:5990]}...[truncated]"
+        # A failed retriever is usually transient; don't pin its partial answer.
+        if complete:
+            self._result_cache.put(cache_key, payload)
         return payload
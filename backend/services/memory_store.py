@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from backend.services.token_budget import estimate_tokens
+
+if TYPE_CHECKING:
+    from backend.services.bm25_index import BM25Index
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*)$")
+_LIST_ITEM = re.compile(r"^(?:[-*+]|\d+[.)])\s+")
+
+
+@dataclass
+class MemoryChunk:
+    source: str
+    position: int
+    heading: str
+    text: str
+
+
+@dataclass
+class _IndexedFile:
+    fingerprint: tuple[int, int]
+    chunks: list[MemoryChunk]
+
+
+def chunk_markdown(source: str, text: str, max_chars: int = 600) -> list[MemoryChunk]:
+    """Split markdown into heading-scoped entries: one per list item or paragraph."""
+    units: list[tuple[str, str]] = []
+    heading = ""
+    current: list[str] = []
+
+    def flush() -> None:
+        body = "\n".join(current).strip()
+        current.clear()
+        if not body:
+            return
+        for start in range(0, len(body), max_chars):
+            units.append((heading, body[start : start + max_chars]))
+
+    for line in text.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            flush()
+            heading = match.group(1).strip()
+        elif not line.strip():
+            flush()
+        elif _LIST_ITEM.match(line):
+            flush()
+            current.append(line)
+        else:
+            current.append(line)
+    flush()
+    return [MemoryChunk(source, position, unit_heading, body) for position, (unit_heading, body) in enumerate(units)]
+
+
+class MemoryStore:
+    """Chunked, BM25-indexed view of MEMORY.md and memory/logs/*.md.
+
+    Files are re-chunked and re-indexed only when their mtime or size
+    changes, so a turn with unchanged memory costs a few ``stat`` calls.
+    """
+
+    def __init__(
+        self,
+        memory_file: Path,
+        logs_dir: Path,
+        token_budget: int = 1_200,
+        chunk_chars: int = 600,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        min_relative_score: float = 0.3,
+    ) -> None:
+        self.memory_file = memory_file
+        self.logs_dir = logs_dir
+        self.token_budget = token_budget
+        self.chunk_chars = chunk_chars
+        self.count_tokens = count_tokens
+        # Entries scoring below this fraction of the best match only share common words with the query.
+        self.min_relative_score = min_relative_score
+        self._files: dict[Path, _IndexedFile] = {}
+        self._index: BM25Index | None = None
+        self._lock = threading.Lock()
+
+    def _sources(self) -> list[Path]:
+        logs = sorted(self.logs_dir.glob("*.md")) if self.logs_dir.is_dir() else []
+        return [self.memory_file, *logs]
+
+    def _source_name(self, path: Path) -> str:
+        if path == self.memory_file:
+            return path.name
+        return f"logs/{path.name}"
+
+    def _doc_id(self, chunk: MemoryChunk) -> str:
+        return f"{chunk.source}#{chunk.position}"
+
+    def refresh(self) -> None:
+        """Re-chunk and re-index only files that were added, changed or removed."""
+        from backend.services.bm25_index import BM25Index
+
+        if self._index is None:
+            # Memory is small enough to rebuild at startup; the index is never persisted.
+            self._index = BM25Index(index_dir=self.memory_file.parent / ".memory_index")
+        seen: set[Path] = set()
+        for path in self._sources():
+            try:
+                stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+            seen.add(path)
+            fingerprint = (stat_result.st_mtime_ns, stat_result.st_size)
+            indexed = self._files.get(path)
+            if indexed is not None and indexed.fingerprint == fingerprint:
+                continue
+            if indexed is not None:
+                for chunk in indexed.chunks:
+                    self._index.remove(self._doc_id(chunk))
+            chunks = chunk_markdown(self._source_name(path), path.read_text(encoding="utf-8"), self.chunk_chars)
+            for chunk in chunks:
+                self._index.add(self._doc_id(chunk), f"{chunk.heading}\n{chunk.text}")
+            self._files[path] = _IndexedFile(fingerprint=fingerprint, chunks=chunks)
+
+        for path in [path for path in self._files if path not in seen]:
+            for chunk in self._files.pop(path).chunks:
+                self._index.remove(self._doc_id(chunk))
+
+    def context_for(self, query: str) -> str:
+        """Memory text for one turn, at most ``token_budget`` tokens.
+
+        MEMORY.md goes in whole while it fits; log entries relevant to ``query``
+        fill what is left. Once MEMORY.md outgrows the budget its entries are
+        ranked together with the logs.
+        """
+        with self._lock:
+            self.refresh()
+            assert self._index is not None
+            whole = ""
+            if self.memory_file in self._files:
+                whole = self.memory_file.read_text(encoding="utf-8").strip()
+                if self.count_tokens(whole) > self.token_budget:
+                    whole = ""
+            used = self.count_tokens(whole)
+
+            chunks = {self._doc_id(chunk): chunk for indexed in self._files.values() for chunk in indexed.chunks}
+            skip_source = self._source_name(self.memory_file) if whole else None
+            selected: list[MemoryChunk] = []
+            results = self._index.search(query, top_k=max(1, len(chunks)))
+            cutoff = results[0][1] * self.min_relative_score if results else 0.0
+            for doc_id, score in results:
+                if score < cutoff:
+                    break
+                chunk = chunks.get(doc_id)
+                if chunk is None or chunk.source == skip_source:
+                    continue
+                cost = self.count_tokens(chunk.heading) + self.count_tokens(chunk.text) + 2
+                if used + cost > self.token_budget:
+                    continue
+                selected.append(chunk)
+                used += cost
+            rendered = self._render(selected)
+            return "\n\n".join(part for part in (whole, rendered) if part)
+
+    def _render(self, chunks: list[MemoryChunk]) -> str:
+        # Source order reads better than score order; headings are repeated once per group.
+        order = {self._source_name(path): rank for rank, path in enumerate(self._sources())}
+        lines: list[str] = []
+        last: tuple[str, str] | None = None
+        for chunk in sorted(chunks, key=lambda item: (order.get(item.source, len(order)), item.position)):
+            if (chunk.source, chunk.heading) != last:
+                label = chunk.source if not chunk.heading else f"{chunk.source} / {chunk.heading}"
+                lines.append(f"## {label}")
+                last = (chunk.source, chunk.heading)
+            lines.append(chunk.text)
+        return "\n".join(lines)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Any, AsyncIterator
+
+_PROFILE_ID = re.compile(r"[0-9]{8}T[0-9]{6}-[0-9a-f]{8}")
+
+
+class StackSampler:
+    """Wall-clock sampling profiler over every Python thread.
+
+    A daemon thread snapshots ``sys._current_frames()`` every ``interval``
+    seconds and counts stacks in collapsed form (``thread;outer;...;leaf``),
+    which flamegraph.pl and speedscope read directly. Sampling all threads
+    catches tool calls that run in executor threads; leaf frames such as
+    ``select`` or ``wait`` are time spent waiting, e.g. on the model.
+
+    Samples are not attributed to a request: the event-loop thread and the
+    executor threads are shared, so work from other requests running at the
+    same time shows up in the profile too. Profile on a quiet server, or
+    read stacks of other sessions as background.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _label(frame: FrameType) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+    def _stack(self, frame: FrameType | None) -> list[str]:
+        labels: list[str] = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._stack(frame)
+                self.stacks[";".join([names.get(ident, f"thread-{ident}"), *stack])] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def request_stop(self) -> None:
+        """Stop sampling without waiting for the sampler thread."""
+        self._stop.set()
+
+    def stop(self) -> None:
+        self.request_stop()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Collapsed-stack profiles plus a JSON sidecar each, newest ``max_profiles`` kept."""
+
+    def __init__(self, directory: Path, max_profiles: int = 200) -> None:
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    def path_for(self, profile_id: str) -> Path:
+        if not _PROFILE_ID.fullmatch(profile_id):
+            raise ValueError(f"invalid profile id: {profile_id!r}")
+        return self.directory / f"{profile_id}.collapsed"
+
+    def save(self, profile_id: str, sampler: StackSampler, meta: dict[str, Any]) -> dict[str, Any]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(profile_id)
+        path.write_text(sampler.collapsed(), encoding="utf-8")
+        record = {
+            "id": profile_id,
+            "file": path.name,
+            "samples": sampler.samples,
+            "interval_ms": sampler.interval * 1000.0,
+            **meta,
+        }
+        path.with_suffix(".json").write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        self._prune()
+        return record
+
+    def list(self) -> list[dict[str, Any]]:
+        records: list[dict[str, Any]] = []
+        for sidecar in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                record = json.loads(sidecar.read_text(encoding="utf-8"))
+                record["size_bytes"] = sidecar.with_suffix(".collapsed").stat().st_size
+            except (OSError, ValueError):
+                continue
+            records.append(record)
+        return records
+
+    def _prune(self) -> None:
+        for sidecar in sorted(self.directory.glob("*.json"), reverse=True)[self.max_profiles :]:
+            sidecar.with_suffix(".collapsed").unlink(missing_ok=True)
+            sidecar.unlink(missing_ok=True)
+
+
+# Saves still running after their request was cancelled; held so they are not collected.
+_pending_saves: set[asyncio.Future[Any]] = set()
+
+
+def _finish(sampler: StackSampler, store: ProfileStore, profile_id: str, meta: dict[str, Any]) -> None:
+    sampler.stop()
+    store.save(profile_id, sampler, meta)
+
+
+async def profiled(
+    events: AsyncIterator[dict[str, Any]],
+    store: ProfileStore,
+    profile_id: str,
+    meta: dict[str, Any],
+    interval: float = 0.005,
+) -> AsyncIterator[dict[str, Any]]:
+    """Pass ``events`` through while sampling stacks; the profile is saved when the stream ends."""
+    sampler = StackSampler(interval=interval)
+    started_at = datetime.now(timezone.utc).isoformat()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        async for event in events:
+            yield event
+    finally:
+        sampler.request_stop()
+        seconds = round(time.perf_counter() - started, 3)
+        # Joining the sampler and writing files run in a worker thread. The save is
+        # shielded: on client disconnect the stream is cancelled, and aborted
+        # requests are often the slow ones worth keeping.
+        record = {**meta, "started_at": started_at, "seconds": seconds}
+        saving = asyncio.ensure_future(asyncio.to_thread(_finish, sampler, store, profile_id, record))
+        _pending_saves.add(saving)
+        saving.add_done_callback(_pending_saves.discard)
+        await asyncio.shield(saving)
@@ -2,53 +2,94 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
+from backend.services.token_budget import PromptPlan, PromptSection, TokenBudget, Tokenizer, get_tokenizer
 
 TRUNCATED_MARKER = "...[truncated]"
+# Used when the caller does not pass a model-specific budget.
+DEFAULT_PROMPT_BUDGET = 20_000
+HISTORY_PRIORITY = 4
 
 
 @dataclass(frozen=True)
 class PromptFileSpec:
     name: str
     path: Path
-    max_chars: int
+    max_tokens: int
+    # Lower numbers are funded first when the budget is tight.
+    priority: int
 
 
 class PromptService:
-    def __init__(self, workspace_dir: Path, memory_file: Path) -> None:
+    def __init__(self, workspace_dir: Path, memory_file: Path, tokenizer: Tokenizer | None = None) -> None:
         self.workspace_dir = workspace_dir
         self.memory_file = memory_file
+        self._tokenizer = tokenizer
 
-    def _truncate(self, text: str, max_chars: int) -> str:
-        if len(text) <= max_chars:
-            return text
-        allowed = max(0, max_chars - len(TRUNCATED_MARKER))
-        return f"{text[:allowed]}{TRUNCATED_MARKER}"
+    @property
+    def tokenizer(self) -> Tokenizer:
+        # Resolved on first use so importing the service never loads tiktoken.
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer()
+        return self._tokenizer
 
-    def _read_with_budget(self, spec: PromptFileSpec) -> str:
-        if not spec.path.exists():
+    def _specs(self) -> list[PromptFileSpec]:
+        return [
+            PromptFileSpec("SKILLS_SNAPSHOT.md", self.workspace_dir / "SKILLS_SNAPSHOT.md", 4_000, 1),
+            PromptFileSpec("SOUL.md", self.workspace_dir / "SOUL.md", 3_500, 1),
+            PromptFileSpec("IDENTITY.md", self.workspace_dir / "IDENTITY.md", 3_500, 1),
+            PromptFileSpec("USER.md", self.workspace_dir / "USER.md", 2_800, 2),
+            PromptFileSpec("AGENTS.md", self.workspace_dir / "AGENTS.md", 2_800, 2),
+            PromptFileSpec("MEMORY.md", self.memory_file, 2_000, 3),
+        ]
+
+    def _read(self, path: Path) -> str:
+        if not path.exists():
             return ""
-        text = spec.path.read_text(encoding="utf-8")
-        return self._truncate(text, spec.max_chars)
-
-    def build_system_prompt(self) -> str:
-        specs = [
-            PromptFileSpec("SKILLS_SNAPSHOT.md", self.workspace_dir / "SKILLS_SNAPSHOT.md", 10_000),
-            PromptFileSpec("SOUL.md", self.workspace_dir / "SOUL.md", 9_000),
-            PromptFileSpec("IDENTITY.md", self.workspace_dir / "IDENTITY.md", 9_000),
-            PromptFileSpec("USER.md", self.workspace_dir / "USER.md", 7_000),
-            PromptFileSpec("AGENTS.md", self.workspace_dir / "AGENTS.md", 7_000),
-            PromptFileSpec("MEMORY.md", self.memory_file, 5_000),
+        return path.read_text(encoding="utf-8")
+
+    def plan(
+        self,
+        message: str = "",
+        history: list[dict[str, Any]] | None = None,
+        skills_snapshot: str | None = None,
+        memory: str | None = None,
+        budget: int = DEFAULT_PROMPT_BUDGET,
+    ) -> PromptPlan:
+        """Fit the system sections and chat history into one token budget.
+
+        The current message is charged first, then sections by priority (each
+        capped at its ``max_tokens``), then as many recent history messages as
+        still fit.
+        """
+        specs = self._specs()
+        overrides = {"SKILLS_SNAPSHOT.md": skills_snapshot, "MEMORY.md": memory}
+        tokens = TokenBudget(budget, self.tokenizer, marker=TRUNCATED_MARKER)
+        if message:
+            tokens.reserve("message", message)
+        tokens.reserve("system_headers", "\n\n".join(f"# {spec.name}\n" for spec in specs))
+
+        sections = [
+            PromptSection(
+                name=spec.name,
+                text=overrides[spec.name] if overrides.get(spec.name) is not None else self._read(spec.path),
+                priority=spec.priority,
+                max_tokens=spec.max_tokens,
+            )
+            for spec in specs
         ]
+        fitted = tokens.fit_sections(sections)
+        kept_history = tokens.fit_history(history or [], priority=HISTORY_PRIORITY)
+
+        system_prompt = "\n\n".join(f"# {spec.name}\n{fitted[spec.name]}" for spec in specs)
+        return PromptPlan(
+            system_prompt=system_prompt,
+            history=kept_history,
+            budget=budget,
+            tokenizer=self.tokenizer.name,
+            allocations=tokens.allocations,
+        )
 
-        parts: list[str] = []
-        for spec in specs:
-            content = self._read_with_budget(spec)
-            section = f"# {spec.name}\n{content}" if content else f"# {spec.name}\n"
-            parts.append(section)
-
-        prompt = "\n\n".join(parts)
-        if len(prompt) > 50_000:
-            allowed = 50_000 - len(TRUNCATED_MARKER)
-            prompt = f"{prompt[:allowed]}{TRUNCATED_MARKER}"
-        return prompt
+    def build_system_prompt(self, skills_snapshot: str | None = None, memory: str | None = None) -> str:
+        return self.plan(skills_snapshot=skills_snapshot, memory=memory).system_prompt
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import ast
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import resource
+import signal
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRELOAD = ("math", "json", "re", "datetime", "collections", "itertools", "statistics", "numpy")
+
+
+@dataclass
+class ReplResult:
+    output: str
+    error: str | None = None
+    timed_out: bool = False
+    namespace_reset: bool = False
+    elapsed_ms: float = 0.0
+
+
+# --- worker side -------------------------------------------------------------
+# Everything below up to ``PythonWorkerPool`` runs inside the spawned workers and
+# must stay importable without the rest of the backend.
+
+
+class _BoundedWriter(io.TextIOBase):
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.parts: list[str] = []
+        self.size = 0
+        self.truncated = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(len(text), room)
+        if len(text) > room:
+            self.truncated = True
+        return len(text)
+
+    def getvalue(self) -> str:
+        value = "".join(self.parts)
+        return f"{value}...[truncated]" if self.truncated else value
+
+
+class _ExecutionLimit(BaseException):
+    # BaseException so that a bare ``except Exception`` in user code cannot swallow it.
+    pass
+
+
+def _raise_limit(signum: int, _frame: Any) -> None:
+    reason = "wall-clock timeout" if signum == signal.SIGALRM else "CPU time limit"
+    raise _ExecutionLimit(f"Execution stopped: {reason} exceeded")
+
+
+def _set_memory_limit(memory_mb: int) -> None:
+    if memory_mb <= 0:
+        return
+    baseline = 0
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            baseline = int(handle.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    limit = baseline + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _execute(namespace: dict[str, Any], code: str) -> None:
+    tree = ast.parse(code, mode="exec")
+    last_expr = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+    exec(compile(tree, "<python_repl>", "exec"), namespace)
+    if last_expr is not None:
+        value = eval(compile(ast.Expression(last_expr.value), "<python_repl>", "eval"), namespace)
+        if value is not None:
+            print(repr(value))
+
+
+def _export_namespace(namespace: dict[str, Any]) -> dict[str, tuple[str, Any]]:
+    exported: dict[str, tuple[str, Any]] = {}
+    for name, value in namespace.items():
+        if name == "__builtins__":
+            continue
+        if type(value).__name__ == "module":
+            exported[name] = ("module", value.__name__)
+            continue
+        try:
+            exported[name] = ("value", pickle.dumps(value))
+        except Exception:
+            continue
+    return exported
+
+
+def _import_namespace(payload: dict[str, tuple[str, Any]]) -> dict[str, Any]:
+    import importlib
+
+    namespace: dict[str, Any] = {}
+    for name, (kind, data) in payload.items():
+        try:
+            namespace[name] = importlib.import_module(data) if kind == "module" else pickle.loads(data)
+        except Exception:
+            continue
+    return namespace
+
+
+def _worker_main(
+    conn: Connection,
+    preload: tuple[str, ...],
+    cpu_seconds: int,
+    memory_mb: int,
+    timeout: float,
+    max_output: int,
+) -> None:
+    import importlib
+
+    # Workers run side by side; keep numeric libraries from oversubscribing cores.
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, "1")
+    loaded: list[str] = []
+    for module in preload:
+        try:
+            importlib.import_module(module)
+            loaded.append(module)
+        except Exception:
+            continue
+    _set_memory_limit(memory_mb)
+    signal.signal(signal.SIGXCPU, _raise_limit)
+    signal.signal(signal.SIGALRM, _raise_limit)
+    conn.send(("ready", loaded))
+
+    namespaces: dict[str, dict[str, Any]] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        command = message[0]
+        if command == "exec":
+            _, session_id, code = message
+            namespace = namespaces.setdefault(session_id, {"__name__": "__main__"})
+            writer = _BoundedWriter(max_output)
+            error: str | None = None
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(used.ru_utime + used.ru_stime) + cpu_seconds
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                with redirect_stdout(writer), redirect_stderr(writer):
+                    _execute(namespace, code)
+            except _ExecutionLimit as exc:
+                error = str(exc)
+            except BaseException as exc:  # noqa: BLE001 - report SystemExit and friends too
+                error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                resource.setrlimit(resource.RLIMIT_CPU, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+            conn.send(("result", writer.getvalue(), error))
+        elif command == "export":
+            conn.send(("namespaces", {sid: _export_namespace(ns) for sid, ns in namespaces.items()}))
+        elif command == "import":
+            for session_id, payload in message[1].items():
+                namespaces[session_id] = {"__name__": "__main__", **_import_namespace(payload)}
+        elif command == "drop":
+            namespaces.pop(message[1], None)
+        elif command == "stop":
+            return
+
+
+# --- server side -------------------------------------------------------------
+
+
+class _WorkerHandle:
+    def __init__(self, context: Any, options: tuple[Any, ...]) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, *options), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.ready = False
+        self.executions = 0
+        self.sessions: set[str] = set()
+        # Sessions detached from this worker whose namespaces it still holds.
+        self.pending_drops: list[str] = []
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError("Python worker did not start in time")
+        message = self.conn.recv()
+        self.ready = message[0] == "ready"
+
+    def request(self, message: tuple[Any, ...], timeout: float) -> tuple[Any, ...]:
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self, grace: float = 0.0) -> None:
+        if grace:
+            self.process.join(timeout=grace)
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class PythonWorkerPool:
+    """Pre-started interpreter processes with per-session namespaces.
+
+    A session stays on one worker. Workers are replaced after ``max_executions``
+    runs; picklable namespace entries and imported modules carry over.
+    Sessions idle for ``idle_seconds`` are dropped, and a worker holds at most
+    ``max_sessions_per_worker`` namespaces, evicting the least recently used.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        preload: tuple[str, ...] = DEFAULT_PRELOAD,
+        cpu_seconds: int = 30,
+        memory_mb: int = 1024,
+        timeout: float = 30.0,
+        max_executions: int = 100,
+        max_output: int = 8_000,
+        startup_timeout: float = 60.0,
+        idle_seconds: float = 1_800.0,
+        max_sessions_per_worker: int = 32,
+    ) -> None:
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.max_executions = max_executions
+        self.startup_timeout = startup_timeout
+        self.idle_seconds = idle_seconds
+        self.max_sessions_per_worker = max(1, max_sessions_per_worker)
+        self._options = (preload, cpu_seconds, memory_mb, timeout, max_output)
+        # spawn, not fork: the server process has live threads and event loops.
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: list[_WorkerHandle] = []
+        self._assignments: dict[str, _WorkerHandle] = {}
+        self._last_used: dict[str, float] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def start(self) -> None:
+        with self._lock:
+            while len(self._workers) < self.size:
+                self._workers.append(_WorkerHandle(self._context, self._options))
+
+    def _worker_for(self, session_id: str) -> _WorkerHandle:
+        self.start()
+        with self._lock:
+            now = time.monotonic()
+            for idle_id, last_used in list(self._last_used.items()):
+                if now - last_used > self.idle_seconds:
+                    self._detach_locked(idle_id)
+            self._last_used[session_id] = now
+            worker = self._assignments.get(session_id)
+            if worker is None:
+                worker = min(self._workers, key=lambda item: len(item.sessions))
+                if len(worker.sessions) >= self.max_sessions_per_worker:
+                    oldest = min(worker.sessions, key=lambda item: self._last_used.get(item, 0.0))
+                    self._detach_locked(oldest)
+                worker.sessions.add(session_id)
+                self._assignments[session_id] = worker
+            return worker
+
+    def _detach_locked(self, session_id: str) -> _WorkerHandle | None:
+        # The namespace is dropped before the worker's next run, under its lock.
+        self._last_used.pop(session_id, None)
+        worker = self._assignments.pop(session_id, None)
+        if worker is not None:
+            worker.sessions.discard(session_id)
+            worker.pending_drops.append(session_id)
+        return worker
+
+    def _flush_drops(self, worker: _WorkerHandle) -> None:
+        with self._lock:
+            drops, worker.pending_drops = worker.pending_drops, []
+        for session_id in drops:
+            worker.conn.send(("drop", session_id))
+
+    def _replace(self, worker: _WorkerHandle, carry_over: dict[str, Any] | None) -> None:
+        replacement = _WorkerHandle(self._context, self._options)
+        if carry_over:
+            with self._lock:
+                live = set(worker.sessions)
+            carry_over = {session_id: payload for session_id, payload in carry_over.items() if session_id in live}
+            replacement.conn.send(("import", carry_over))
+        with self._lock:
+            replacement.sessions = set(worker.sessions)
+            # Sessions detached since the export above are dropped on the next run.
+            replacement.pending_drops = [item for item in worker.pending_drops if item in (carry_over or {})]
+            self._workers[self._workers.index(worker)] = replacement
+            for session_id in replacement.sessions:
+                self._assignments[session_id] = replacement
+        worker.kill()
+
+    def execute(self, session_id: str, code: str) -> ReplResult:
+        started = time.perf_counter()
+        while True:
+            worker = self._worker_for(session_id)
+            with worker.lock:
+                # The worker may have been replaced while this call waited for it.
+                if self._assignments.get(session_id) is not worker:
+                    continue
+                return self._execute_locked(worker, session_id, code, started)
+
+    def _execute_locked(self, worker: _WorkerHandle, session_id: str, code: str, started: float) -> ReplResult:
+        try:
+            worker.wait_ready(self.startup_timeout)
+            self._flush_drops(worker)
+            # The worker stops itself at ``timeout``; the margin covers a stuck C call.
+            _, output, error = worker.request(("exec", session_id, code), self.timeout + 5.0)
+        except (TimeoutError, EOFError, OSError) as exc:
+            timed_out = isinstance(exc, TimeoutError)
+            logger.warning("Python worker pid=%s lost (%s); restarting", worker.process.pid, type(exc).__name__)
+            self._replace(worker, None)
+            return ReplResult(
+                output="",
+                error="Execution timed out." if timed_out else "Python worker crashed (resource limit?).",
+                timed_out=timed_out,
+                namespace_reset=True,
+                elapsed_ms=(time.perf_counter() - started) * 1000.0,
+            )
+
+        worker.executions += 1
+        if worker.executions >= self.max_executions:
+            self._recycle(worker)
+        return ReplResult(
+            output=output,
+            error=error,
+            timed_out=bool(error and "wall-clock timeout" in error),
+            elapsed_ms=(time.perf_counter() - started) * 1000.0,
+        )
+
+    def _recycle(self, worker: _WorkerHandle) -> None:
+        carry_over: dict[str, Any] | None = None
+        try:
+            carry_over = worker.request(("export",), self.timeout)[1]
+        except (TimeoutError, EOFError, OSError):
+            logger.warning("Could not export namespaces from python worker pid=%s", worker.process.pid)
+        self._replace(worker, carry_over)
+
+    def reset(self, session_id: str) -> None:
+        with self._lock:
+            worker = self._detach_locked(session_id)
+        if worker is not None and worker.process.is_alive():
+            with worker.lock:
+                self._flush_drops(worker)
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+            self._assignments.clear()
+            self._last_used.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(("stop",))
+            except OSError:
+                pass
+            worker.kill(grace=1.0)
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 import re
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from backend.services.blob_store import BlobStore, GcResult
+
+
+logger = logging.getLogger(__name__)
+
+# History keeps this much of each tool output; longer outputs are referenced by ``ref``.
+TOOL_OUTPUT_SUMMARY_CHARS = 600
+
 
 @dataclass
 class SessionEntry:
@@ -26,8 +36,9 @@ class SessionEntry:
 
 
 class SessionService:
-    def __init__(self, sessions_dir: Path) -> None:
+    def __init__(self, sessions_dir: Path, blob_store: BlobStore | None = None) -> None:
         self.sessions_dir = sessions_dir
+        self.blob_store = blob_store if blob_store is not None else BlobStore(sessions_dir / "blobs")
 
     def normalize_session_id(self, session_id: str) -> str:
         cleaned = re.sub(r"[^a-zA-Z0-9_-]", "-", session_id).strip("-")
@@ -49,13 +60,55 @@ class SessionService:
     def save(self, session_id: str, entries: list[dict[str, Any]]) -> None:
         path = self._session_path(session_id)
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        partial = path.with_name(f".{path.name}.part")
+        partial.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(partial, path)
 
     def append(self, session_id: str, new_entries: list[SessionEntry]) -> None:
         entries = self.load(session_id)
         entries.extend(item.to_dict() for item in new_entries)
         self.save(session_id, entries)
 
+    def tool_result(self, name: str, call_id: str, output: str) -> dict[str, Any]:
+        """Session record for a tool result: the full output goes to the blob store, not the JSON."""
+        return {"name": name, "id": call_id, "output_blob": self.blob_store.put(output), "output_chars": len(output)}
+
+    def tool_output(self, tool: dict[str, Any], max_chars: int) -> tuple[str, bool]:
+        """Up to ``max_chars`` of a recorded output and whether it was cut; handles inline legacy records."""
+        key = tool.get("output_blob")
+        if isinstance(key, str):
+            found = self.blob_store.read_prefix(key, max_chars)
+            if found is not None:
+                return found
+            return "(output no longer stored)", False
+        output = str(tool.get("output") or "")
+        return output[:max_chars], len(output) > max_chars
+
+    def hydrate(self, entries: list[dict[str, Any]], max_chars: int = 2_000) -> list[dict[str, Any]]:
+        """Entries with blob outputs filled in as ``output`` (shortened) for clients."""
+        hydrated: list[dict[str, Any]] = []
+        for entry in entries:
+            tool = entry.get("tool")
+            if isinstance(tool, dict) and "output_blob" in tool:
+                text, cut = self.tool_output(tool, max_chars)
+                entry = {**entry, "tool": {**tool, "output": f"{text}...[truncated]" if cut else text}}
+            hydrated.append(entry)
+        return hydrated
+
+    def gc_blobs(self, min_age_seconds: float = 3_600) -> GcResult:
+        referenced: set[str] = set()
+        for path in self.sessions_dir.glob("*.json"):
+            try:
+                entries = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning("Skipping blob gc: cannot read session %s", path.name)
+                return GcResult(removed=0, kept=0, freed_bytes=0)
+            for entry in entries if isinstance(entries, list) else []:
+                tool = entry.get("tool") if isinstance(entry, dict) else None
+                if isinstance(tool, dict) and isinstance(tool.get("output_blob"), str):
+                    referenced.add(tool["output_blob"])
+        return self.blob_store.gc(referenced, min_age_seconds=min_age_seconds)
+
     def list_sessions(self) -> list[dict[str, Any]]:
         result: list[dict[str, Any]] = []
         for file_path in sorted(self.sessions_dir.glob("*.json"), key=lambda item: item.stat().st_mtime, reverse=True):
@@ -69,12 +122,71 @@ class SessionService:
             )
         return result
 
-    def to_chat_messages(self, session_id: str, max_messages: int = 30) -> list[dict[str, str]]:
+    def to_chat_messages(
+        self,
+        session_id: str,
+        max_messages: int = 30,
+        include_tools: bool = False,
+        tool_output_chars: int = TOOL_OUTPUT_SUMMARY_CHARS,
+    ) -> list[dict[str, Any]]:
+        """Chat history for the model.
+
+        With ``include_tools`` every finished tool call is replayed as an
+        assistant tool-call message plus a tool result holding a short prefix
+        of the output and, when stored, a ``read_tool_output`` reference to the
+        full text, so the agent can reuse earlier results instead of re-running
+        the tool. ``max_messages`` counts user and assistant turns only; each
+        kept assistant turn brings along the tool calls made before it.
+        """
         history = self.load(session_id)
-        messages: list[dict[str, str]] = []
-        for item in history:
+        messages: list[dict[str, Any]] = []
+        turns: list[int] = []
+        pending: list[dict[str, Any]] = []
+        for index, item in enumerate(history):
             role = item.get("type")
             content = item.get("content")
             if role in {"user", "assistant"} and isinstance(content, str):
+                turns.append(len(messages))
                 messages.append({"role": role, "content": content})
-        return messages[-max_messages:]
+                continue
+            tool = item.get("tool")
+            if not include_tools or role != "tool" or not isinstance(tool, dict):
+                continue
+            if "output" not in tool and "output_blob" not in tool:
+                pending.append({"id": str(tool.get("id") or f"call_{index}"), "tool": tool})
+                continue
+            call = self._match_call(pending, tool)
+            call_id = call["id"] if call is not None else str(tool.get("id") or f"call_{index}")
+            tool_input = call["tool"].get("input") if call is not None else tool.get("input")
+            args = tool_input if isinstance(tool_input, dict) else {"input": tool_input}
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [{"id": call_id, "name": str(tool.get("name") or "tool"), "args": args}],
+                }
+            )
+            messages.append(
+                {"role": "tool", "tool_call_id": call_id, "content": self._summarize_output(tool, tool_output_chars)}
+            )
+        if len(turns) <= max_messages:
+            return messages
+        # Start right after the last dropped turn so tool pairs stay with their reply.
+        return messages[turns[-max_messages - 1] + 1 :] if max_messages > 0 else []
+
+    @staticmethod
+    def _match_call(pending: list[dict[str, Any]], result: dict[str, Any]) -> dict[str, Any] | None:
+        # Older sessions have no call ids; pair each result with the oldest open call of the same tool.
+        for position, call in enumerate(pending):
+            same_id = result.get("id") is not None and call["tool"].get("id") == result.get("id")
+            if same_id or (result.get("id") is None and call["tool"].get("name") == result.get("name")):
+                return pending.pop(position)
+        return None
+
+    def _summarize_output(self, tool: dict[str, Any], max_chars: int) -> str:
+        text, cut = self.tool_output(tool, max_chars)
+        if not cut:
+            return text
+        key = tool.get("output_blob")
+        note = f'full output: read_tool_output(ref="out_{key}")' if key else "full output not kept"
+        return f"{text}\n[... truncated; {note}]"
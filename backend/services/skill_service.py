@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import logging
+import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 from xml.sax.saxutils import escape
 
 import yaml
 
+if TYPE_CHECKING:
+    from backend.services.bm25_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class SkillMeta:
@@ -15,6 +23,13 @@ class SkillMeta:
     location: str
 
 
+@dataclass
+class _CachedSkill:
+    # (mtime_ns, size) of SKILL.md when ``meta`` was parsed.
+    fingerprint: tuple[int, int]
+    meta: SkillMeta
+
+
 def _parse_frontmatter(text: str) -> dict:
     if not text.startswith("---"):
         return {}
@@ -40,25 +55,79 @@ def _parse_frontmatter(text: str) -> dict:
 
 
 class SkillService:
-    def __init__(self, skills_dir: Path, workspace_dir: Path, root_dir: Path) -> None:
+    def __init__(
+        self,
+        skills_dir: Path,
+        workspace_dir: Path,
+        root_dir: Path,
+        top_k: int = 0,
+        always_include: Iterable[str] = (),
+    ) -> None:
         self.skills_dir = skills_dir
         self.workspace_dir = workspace_dir
         self.root_dir = root_dir
+        # 0 keeps every skill in the prompt; otherwise prompts list at most top_k ranked skills.
+        self.top_k = top_k
+        self.always_include = tuple(name.strip().lower() for name in always_include if name.strip())
         self.snapshot_path = workspace_dir / "SKILLS_SNAPSHOT.md"
+        self._cache: dict[Path, _CachedSkill] = {}
+        self._snapshot: str | None = None
+        self._snapshot_fingerprint: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+        # Set by the watcher on any change under skills_dir; None when not watching.
+        self._dirty: threading.Event | None = None
+        self._watch_stop: threading.Event | None = None
+        self._index: BM25Index | None = None
+        self._indexed: dict[str, tuple[int, int]] = {}
+
+    def _skill_files(self) -> list[tuple[Path, os.stat_result]]:
+        found: list[tuple[Path, os.stat_result]] = []
+        try:
+            entries = list(os.scandir(self.skills_dir))
+        except FileNotFoundError:
+            return found
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            skill_md = Path(entry.path) / "SKILL.md"
+            try:
+                found.append((skill_md, skill_md.stat()))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def _parse(self, skill_md: Path) -> SkillMeta:
+        text = skill_md.read_text(encoding="utf-8")
+        meta = _parse_frontmatter(text)
+        name = str(meta.get("name") or skill_md.parent.name).strip()
+        description = str(meta.get("description") or "").strip()
+        location = skill_md.relative_to(self.root_dir).as_posix()
+        return SkillMeta(name=name, description=description, location=location)
 
     def scan(self) -> list[SkillMeta]:
+        """Stat every SKILL.md and re-parse only the ones whose mtime or size changed."""
         metas: list[SkillMeta] = []
-        for skill_md in sorted(self.skills_dir.glob("*/SKILL.md")):
-            text = skill_md.read_text(encoding="utf-8")
-            meta = _parse_frontmatter(text)
-            name = str(meta.get("name") or skill_md.parent.name).strip()
-            description = str(meta.get("description") or "").strip()
-            location = skill_md.relative_to(self.root_dir).as_posix()
-            metas.append(SkillMeta(name=name, description=description, location=location))
+        seen: dict[Path, _CachedSkill] = {}
+        for skill_md, stat_result in self._skill_files():
+            fingerprint = (stat_result.st_mtime_ns, stat_result.st_size)
+            cached = self._cache.get(skill_md)
+            if cached is None or cached.fingerprint != fingerprint:
+                cached = _CachedSkill(fingerprint=fingerprint, meta=self._parse(skill_md))
+            seen[skill_md] = cached
+            metas.append(cached.meta)
+        self._cache = seen
         return metas
 
-    def generate_snapshot_xml(self, skills: Iterable[SkillMeta]) -> str:
-        blocks = ["<available_skills>"]
+    def generate_snapshot_xml(self, skills: Iterable[SkillMeta], total: int | None = None) -> str:
+        skills = list(skills)
+        if total is not None and total > len(skills):
+            blocks = [
+                f'<available_skills shown="{len(skills)}" total="{total}">',
+                "  <!-- Most relevant skills for this request; the rest are under skills/*/SKILL.md. -->",
+            ]
+        else:
+            blocks = ["<available_skills>"]
         for skill in skills:
             blocks.extend(
                 [
@@ -72,9 +141,120 @@ class SkillService:
         blocks.append("</available_skills>")
         return "\n".join(blocks)
 
+    def _snapshot_file_fingerprint(self) -> tuple[int, int] | None:
+        try:
+            stat_result = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat_result.st_mtime_ns, stat_result.st_size)
+
     def refresh_snapshot(self) -> str:
-        self.workspace_dir.mkdir(parents=True, exist_ok=True)
-        skills = self.scan()
-        snapshot = self.generate_snapshot_xml(skills)
-        self.snapshot_path.write_text(snapshot, encoding="utf-8")
-        return snapshot
+        with self._lock:
+            on_disk = self._snapshot_file_fingerprint()
+            watched_and_clean = self._dirty is not None and not self._dirty.is_set()
+            if watched_and_clean and self._snapshot is not None and on_disk == self._snapshot_fingerprint:
+                return self._snapshot
+            if self._dirty is not None:
+                # Cleared before scanning so changes made during the scan trigger another one.
+                self._dirty.clear()
+
+            snapshot = self.generate_snapshot_xml(self.scan())
+            if on_disk is None or on_disk != self._snapshot_fingerprint or snapshot != self._snapshot:
+                existing = self.snapshot_path.read_text(encoding="utf-8") if on_disk is not None else None
+                if existing != snapshot:
+                    self.workspace_dir.mkdir(parents=True, exist_ok=True)
+                    self.snapshot_path.write_text(snapshot, encoding="utf-8")
+                self._snapshot_fingerprint = self._snapshot_file_fingerprint()
+            self._snapshot = snapshot
+            return snapshot
+
+    def _sync_index(self) -> BM25Index:
+        from backend.services.bm25_index import BM25Index
+
+        if self._index is None:
+            # Names and descriptions are small; the index lives in memory and is never persisted.
+            self._index = BM25Index(index_dir=self.workspace_dir / ".skill_index")
+        current = {cached.meta.location: cached for cached in self._cache.values()}
+        for location in [location for location in self._indexed if location not in current]:
+            self._index.remove(location)
+            del self._indexed[location]
+        for location, cached in current.items():
+            if self._indexed.get(location) != cached.fingerprint:
+                self._index.add(location, f"{cached.meta.name} {cached.meta.description}")
+                self._indexed[location] = cached.fingerprint
+        return self._index
+
+    def snapshot_for(self, query: str) -> str:
+        """Skills XML for one request: always-include skills plus the top_k ranked against ``query``.
+
+        Slots BM25 cannot fill are topped up with unranked skills. Small
+        libraries, or ``top_k == 0``, get the full snapshot.
+        """
+        snapshot = self.refresh_snapshot()
+        with self._lock:
+            skills = [cached.meta for cached in self._cache.values()]
+            if not self.top_k or len(skills) <= self.top_k + len(self.always_include):
+                return snapshot
+
+            chosen = [skill for skill in skills if skill.name.lower() in self.always_include]
+            by_location = {skill.location: skill for skill in skills}
+            picked = {skill.location for skill in chosen}
+            ranked = 0
+            for location, _ in self._sync_index().search(query, top_k=self.top_k + len(chosen)):
+                if ranked >= self.top_k:
+                    break
+                if location in picked or location not in by_location:
+                    continue
+                chosen.append(by_location[location])
+                picked.add(location)
+                ranked += 1
+            # Queries with little overlap (e.g. CJK-only) still get top_k skills, in library order.
+            for skill in skills:
+                if ranked >= self.top_k:
+                    break
+                if skill.location not in picked:
+                    chosen.append(skill)
+                    picked.add(skill.location)
+                    ranked += 1
+            return self.generate_snapshot_xml(chosen, total=len(skills))
+
+    def start_watching(self) -> bool:
+        """Watch skills_dir so refresh_snapshot() can skip the scan until something changes.
+
+        Uses ``watchfiles`` when it is installed; without it the fingerprint scan
+        on every refresh keeps working on its own.
+        """
+        if self._watch_stop is not None:
+            return True
+        try:
+            from watchfiles import watch
+        except ImportError:
+            logger.info("watchfiles is not installed; skill snapshot falls back to per-request scans")
+            return False
+        if not self.skills_dir.is_dir():
+            return False
+
+        dirty = threading.Event()
+        dirty.set()
+        stop = threading.Event()
+
+        def run() -> None:
+            try:
+                for _ in watch(self.skills_dir, stop_event=stop, debounce=200, step=50):
+                    dirty.set()
+            except Exception:
+                logger.exception("skill watcher stopped; falling back to per-request scans")
+            finally:
+                with self._lock:
+                    if self._watch_stop is stop:
+                        self._dirty = None
+                        self._watch_stop = None
+
+        self._dirty = dirty
+        self._watch_stop = stop
+        threading.Thread(target=run, name="skill-watcher", daemon=True).start()
+        return True
+
+    def stop_watching(self) -> None:
+        if self._watch_stop is not None:
+            self._watch_stop.set()
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+_CJK = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+# Per-message framing the chat format adds around each history message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Context windows of models we are commonly pointed at; unknown models get DEFAULT_CONTEXT_WINDOW.
+MODEL_CONTEXT_WINDOWS = {
+    "deepseek-chat": 64_000,
+    "deepseek-reasoner": 64_000,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4.1": 128_000,
+    "qwen-plus": 128_000,
+    "qwen-turbo": 128_000,
+}
+DEFAULT_CONTEXT_WINDOW = 32_000
+
+# Source of tiktoken's BPE files; its cache names each file by the SHA-1 of this URL.
+_TIKTOKEN_FILES = {
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+}
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+    def truncate(self, text: str, max_tokens: int) -> str: ...
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly one token per CJK character and per four other characters.
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class EstimateTokenizer:
+    name = "estimate"
+
+    def count(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        budget = max_tokens * 4
+        for index, char in enumerate(text):
+            budget -= 4 if _CJK.match(char) else 1
+            if budget < 0:
+                return text[:index]
+        return text
+
+
+def _seed_tiktoken_cache(cache_dir: Path) -> None:
+    # llama_index ships the BPE files it needs and points tiktoken at them only while
+    # TIKTOKEN_CACHE_DIR is unset; copy them so both keep working offline.
+    spec = importlib.util.find_spec("llama_index.core")
+    if spec is None or spec.origin is None:
+        return
+    bundled = Path(spec.origin).parent / "_static" / "tiktoken_cache"
+    for url in _TIKTOKEN_FILES.values():
+        name = hashlib.sha1(url.encode()).hexdigest()
+        if (bundled / name).is_file() and not (cache_dir / name).exists():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(bundled / name, cache_dir / name)
+
+
+def tiktoken_cache_dir() -> Path:
+    """``TIKTOKEN_CACHE_DIR``, defaulting to ./tmp/tiktoken instead of the system temp dir."""
+    if "TIKTOKEN_CACHE_DIR" not in os.environ:
+        from backend.config import get_app_config
+
+        cache_dir = get_app_config().tmp_dir / "tiktoken"
+        _seed_tiktoken_cache(cache_dir)
+        os.environ["TIKTOKEN_CACHE_DIR"] = str(cache_dir)
+    return Path(os.environ["TIKTOKEN_CACHE_DIR"])
+
+
+def tiktoken_cached(encoding_name: str) -> bool:
+    url = _TIKTOKEN_FILES.get(encoding_name)
+    # An empty TIKTOKEN_CACHE_DIR turns tiktoken's cache off, so every load would download.
+    if url is None or os.environ.get("TIKTOKEN_CACHE_DIR") == "":
+        return False
+    return (tiktoken_cache_dir() / hashlib.sha1(url.encode()).hexdigest()).is_file()
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding_name: str) -> None:
+        tiktoken_cache_dir()
+        import tiktoken
+
+        self.name = f"tiktoken:{encoding_name}"
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens]).rstrip("�")
+
+
+class HuggingFaceTokenizer:
+    """A model's own ``tokenizer.json`` through the optional ``tokenizers`` package."""
+
+    def __init__(self, path: str) -> None:
+        from tokenizers import Tokenizer as _Tokenizer
+
+        self.name = f"hf:{path}"
+        self._tokenizer = _Tokenizer.from_file(path)
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        encoding = self._tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[: encoding.offsets[max_tokens][0]]
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(spec: str | None = None) -> Tokenizer:
+    """Resolve ``PROMPT_TOKENIZER``: ``estimate``, ``tiktoken[:encoding]``, ``hf:<tokenizer.json>`` or ``auto``.
+
+    ``auto`` (the default) uses tiktoken's cl100k_base only when its BPE file
+    is already in the tiktoken cache and the estimator otherwise; it never
+    downloads. An explicit ``tiktoken`` spec may fetch the file once.
+    """
+    spec = (spec or os.getenv("PROMPT_TOKENIZER", "auto")).strip()
+    kind, _, argument = spec.partition(":")
+    if kind == "auto" and not tiktoken_cached(argument or "cl100k_base"):
+        return EstimateTokenizer()
+    try:
+        if kind == "estimate":
+            return EstimateTokenizer()
+        if kind == "hf":
+            return HuggingFaceTokenizer(argument)
+        if kind in {"auto", "tiktoken"}:
+            return TiktokenTokenizer(argument or "cl100k_base")
+    except Exception as exc:
+        if kind != "auto":
+            logger.warning("Tokenizer %r is unavailable (%s); using the estimator", spec, exc)
+        return EstimateTokenizer()
+    raise ValueError(f"unknown tokenizer spec: {spec!r}")
+
+
+def prompt_budget_for(model: str) -> int:
+    """Input tokens a request may use: PROMPT_TOKEN_BUDGET, else the model window minus a reply reserve."""
+    configured = os.getenv("PROMPT_TOKEN_BUDGET", "").strip()
+    if configured:
+        return int(configured)
+    reserve = int(os.getenv("PROMPT_RESERVE_TOKENS", "8192"))
+    window = MODEL_CONTEXT_WINDOWS.get(model.lower(), DEFAULT_CONTEXT_WINDOW)
+    return max(1_024, window - reserve)
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    # Lower numbers are funded first; ties keep declaration order.
+    priority: int
+    max_tokens: int | None = None
+
+
+@dataclass
+class SectionAllocation:
+    name: str
+    priority: int
+    requested: int
+    allocated: int
+    truncated: bool
+
+
+@dataclass
+class PromptPlan:
+    system_prompt: str
+    history: list[dict[str, Any]]
+    budget: int
+    tokenizer: str
+    allocations: list[SectionAllocation] = field(default_factory=list)
+
+    @property
+    def used(self) -> int:
+        return sum(item.allocated for item in self.allocations)
+
+    def to_event(self) -> dict[str, Any]:
+        return {
+            "type": "debug",
+            "name": "prompt_budget",
+            "content": f"prompt uses {self.used} of {self.budget} tokens ({self.tokenizer})",
+            "data": {
+                "budget": self.budget,
+                "used": self.used,
+                "tokenizer": self.tokenizer,
+                "sections": [asdict(item) for item in self.allocations],
+            },
+        }
+
+
+class TokenBudget:
+    """Hand out one token budget to prompt sections in priority order."""
+
+    def __init__(self, total: int, tokenizer: Tokenizer, marker: str = "...[truncated]") -> None:
+        self.total = total
+        self.remaining = total
+        self.tokenizer = tokenizer
+        self.marker = marker
+        self.allocations: list[SectionAllocation] = []
+
+    def reserve(self, name: str, text: str, priority: int = 0) -> None:
+        """Charge text that must be sent as-is, such as the current user message."""
+        cost = self.tokenizer.count(text) + MESSAGE_OVERHEAD_TOKENS
+        self.remaining -= cost
+        self.allocations.append(SectionAllocation(name, priority, cost, cost, False))
+
+    def fit_sections(self, sections: list[PromptSection]) -> dict[str, str]:
+        fitted: dict[str, str] = {}
+        for section in sorted(sections, key=lambda item: item.priority):
+            requested = self.tokenizer.count(section.text)
+            limit = max(0, self.remaining)
+            if section.max_tokens is not None:
+                limit = min(limit, section.max_tokens)
+            text = section.text
+            allocated = requested
+            truncated = requested > limit
+            if truncated:
+                keep = max(0, limit - self.tokenizer.count(self.marker))
+                text = f"{self.tokenizer.truncate(section.text, keep)}{self.marker}" if keep else ""
+                allocated = self.tokenizer.count(text)
+            self.remaining -= allocated
+            self.allocations.append(SectionAllocation(section.name, section.priority, requested, allocated, truncated))
+            fitted[section.name] = text
+        return fitted
+
+    def _message_cost(self, message: dict[str, Any]) -> int:
+        cost = self.tokenizer.count(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+        if message.get("tool_calls"):
+            cost += self.tokenizer.count(json.dumps(message["tool_calls"], ensure_ascii=False))
+        return cost
+
+    def fit_history(self, messages: list[dict[str, Any]], priority: int) -> list[dict[str, Any]]:
+        """Keep the newest messages that fit; history is never cut mid-message."""
+        costs = [self._message_cost(message) for message in messages]
+        start = len(messages)
+        allocated = 0
+        while start > 0 and allocated + costs[start - 1] <= self.remaining:
+            start -= 1
+            allocated += costs[start]
+        # A tool result whose tool call did not fit cannot be sent on its own.
+        while start < len(messages) and messages[start].get("role") == "tool":
+            allocated -= costs[start]
+            start += 1
+        self.remaining -= allocated
+        self.allocations.append(SectionAllocation("history", priority, sum(costs), allocated, start > 0))
+        return messages[start:]
@@ -0,0 +1,442 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+
+logger = logging.getLogger(__name__)
+
+MMAP_STORE_DIRNAME = "mmap_vectors"
+SIMPLE_STORE_FILENAMES = ("default__vector_store.json", "vector_store.json")
+SUPPORTED_DTYPES = ("float32", "int8")
+
+_META_FILE = "meta.json"
+_VECTORS_FILE = "vectors.bin"
+_SCALES_FILE = "scales.bin"
+_IDS_FILE = "ids.jsonl"
+_QUERY_BLOCK_ROWS = 65_536
+_INT8_MAX = 127.0
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return vector
+    return vector / norm
+
+
+def _quantize(vector: np.ndarray) -> tuple[np.ndarray, float]:
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = peak / _INT8_MAX if peak > 0.0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -_INT8_MAX, _INT8_MAX).astype(np.int8)
+    return quantized, scale
+
+
+def _write_json_atomic(path: Path, payload: dict[str, Any]) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """Embedding store backed by a contiguous memory-mapped matrix.
+
+    Vectors are L2-normalized on insert, so the dot product equals cosine
+    similarity. Rows live in ``vectors.bin`` (float32 or int8 with per-row
+    scales in ``scales.bin``) and node ids in ``ids.jsonl``, one row per
+    line. Only ``meta.json`` is read on load; the id map and the matrix are
+    opened on first use and the matrix is shared through the page cache.
+    """
+
+    stores_text: bool = False
+
+    persist_dir: str
+    dtype: str = "float32"
+
+    _dim: int | None = PrivateAttr(default=None)
+    _count: int = PrivateAttr(default=0)
+    _matrix: np.ndarray | None = PrivateAttr(default=None)
+    _scales: np.ndarray | None = PrivateAttr(default=None)
+    _loaded: bool = PrivateAttr(default=False)
+    _ids: list[str | None] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list[str | None] = PrivateAttr(default_factory=list)
+    _row_by_id: dict[str, int] = PrivateAttr(default_factory=dict)
+    _pending_vectors: list[np.ndarray] = PrivateAttr(default_factory=list)
+    _pending_scales: list[float] = PrivateAttr(default_factory=list)
+    _deleted: int = PrivateAttr(default=0)
+
+    def __init__(self, persist_dir: str | Path, dtype: str = "float32", **kwargs: Any) -> None:
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"unsupported vector dtype: {dtype}")
+        super().__init__(persist_dir=str(persist_dir), dtype=dtype, **kwargs)
+        meta_path = self._dir / _META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self.dtype = str(meta.get("dtype", dtype))
+            self._dim = meta.get("dim")
+            self._count = int(meta.get("count", 0))
+        else:
+            self._loaded = True
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str | Path, dtype: str = "float32") -> "MmapVectorStore":
+        return cls(persist_dir=persist_dir, dtype=dtype)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def _dir(self) -> Path:
+        return Path(self.persist_dir)
+
+    @property
+    def row_count(self) -> int:
+        return self._count + len(self._pending_vectors)
+
+    @property
+    def node_count(self) -> int:
+        # Not __len__: StorageContext checks vector stores for truthiness.
+        self._ensure_loaded()
+        return self.row_count - self._deleted
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        ids_path = self._dir / _IDS_FILE
+        if self._count == 0 or not ids_path.exists():
+            return
+
+        with ids_path.open("r", encoding="utf-8") as handle:
+            for row, line in enumerate(handle):
+                if row >= self._count:
+                    break
+                item = json.loads(line)
+                if item is None:
+                    self._ids.append(None)
+                    self._ref_doc_ids.append(None)
+                    self._deleted += 1
+                    continue
+                node_id, ref_doc_id = item
+                self._ids.append(node_id)
+                self._ref_doc_ids.append(ref_doc_id)
+                self._row_by_id[node_id] = row
+
+        self._open_matrix()
+
+    def _open_matrix(self) -> None:
+        self._matrix = None
+        self._scales = None
+        if self._count == 0 or self._dim is None:
+            return
+        self._matrix = np.memmap(
+            self._dir / _VECTORS_FILE,
+            dtype=np.dtype(self.dtype),
+            mode="r",
+            shape=(self._count, self._dim),
+        )
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._dir / _SCALES_FILE, dtype=np.float32, mode="r", shape=(self._count,))
+
+    def _append(self, node_id: str, ref_doc_id: str | None, embedding: Sequence[float]) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.ndim != 1:
+            raise ValueError("embedding must be a flat vector")
+        if self._dim is None:
+            self._dim = int(vector.shape[0])
+        elif vector.shape[0] != self._dim:
+            raise ValueError(f"embedding dim {vector.shape[0]} does not match store dim {self._dim}")
+
+        existing = self._row_by_id.get(node_id)
+        if existing is not None:
+            self._tombstone(existing)
+
+        vector = _normalize(vector)
+        if self.dtype == "int8":
+            quantized, scale = _quantize(vector)
+            self._pending_vectors.append(quantized)
+            self._pending_scales.append(scale)
+        else:
+            self._pending_vectors.append(vector)
+
+        self._row_by_id[node_id] = len(self._ids)
+        self._ids.append(node_id)
+        self._ref_doc_ids.append(ref_doc_id)
+
+    def _tombstone(self, row: int) -> None:
+        node_id = self._ids[row]
+        if node_id is None:
+            return
+        self._row_by_id.pop(node_id, None)
+        self._ids[row] = None
+        self._ref_doc_ids[row] = None
+        self._deleted += 1
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:
+        self._ensure_loaded()
+        for node in nodes:
+            self._append(node.node_id, node.ref_doc_id, node.get_embedding())
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._ensure_loaded()
+        for row, value in enumerate(self._ref_doc_ids):
+            if value == ref_doc_id:
+                self._tombstone(row)
+
+    def delete_nodes(
+        self,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        if filters is not None:
+            raise ValueError("MmapVectorStore does not store metadata and cannot filter on it")
+        self._ensure_loaded()
+        for node_id in node_ids or []:
+            row = self._row_by_id.get(node_id)
+            if row is not None:
+                self._tombstone(row)
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._scales = None
+        self._dim = None
+        self._count = 0
+        self._ids = []
+        self._ref_doc_ids = []
+        self._row_by_id = {}
+        self._pending_vectors = []
+        self._pending_scales = []
+        self._deleted = 0
+        self._loaded = True
+        for name in (_META_FILE, _VECTORS_FILE, _SCALES_FILE, _IDS_FILE):
+            (self._dir / name).unlink(missing_ok=True)
+
+    def _score_blocks(self, query_vector: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+        if self._matrix is not None:
+            for start in range(0, self._count, _QUERY_BLOCK_ROWS):
+                stop = min(start + _QUERY_BLOCK_ROWS, self._count)
+                block = np.asarray(self._matrix[start:stop], dtype=np.float32)
+                scores = block @ query_vector
+                if self._scales is not None:
+                    scores *= self._scales[start:stop]
+                yield start, scores
+
+        if self._pending_vectors:
+            block = np.vstack(self._pending_vectors).astype(np.float32, copy=False)
+            scores = block @ query_vector
+            if self.dtype == "int8":
+                scores *= np.asarray(self._pending_scales, dtype=np.float32)
+            yield self._count, scores
+
+    def _allowed_rows(self, query: VectorStoreQuery) -> np.ndarray | None:
+        if query.node_ids is None and query.doc_ids is None:
+            return None
+        rows: set[int] = set()
+        if query.node_ids is not None:
+            rows.update(self._row_by_id[node_id] for node_id in query.node_ids if node_id in self._row_by_id)
+        if query.doc_ids is not None:
+            wanted = set(query.doc_ids)
+            rows.update(row for row, ref in enumerate(self._ref_doc_ids) if ref in wanted)
+        return np.fromiter(sorted(rows), dtype=np.int64)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise ValueError("MmapVectorStore does not store metadata and cannot filter on it")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"Invalid query mode: {query.mode}")
+        if query.query_embedding is None:
+            raise ValueError("query embedding is required")
+
+        self._ensure_loaded()
+        top_k = max(1, int(query.similarity_top_k or 1))
+        if self.row_count == 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        query_vector = _normalize(np.asarray(query.query_embedding, dtype=np.float32))
+        allowed = self._allowed_rows(query)
+        live = np.fromiter((node_id is not None for node_id in self._ids), dtype=bool, count=self.row_count)
+        if allowed is not None:
+            mask = np.zeros(self.row_count, dtype=bool)
+            mask[allowed] = True
+            live &= mask
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start, scores in self._score_blocks(query_vector):
+            scores = np.where(live[start : start + scores.shape[0]], scores, -np.inf)
+            if scores.shape[0] > top_k:
+                keep = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                keep = np.arange(scores.shape[0])
+            best_rows = np.concatenate([best_rows, keep + start])
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            if best_scores.shape[0] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                best_rows = best_rows[keep]
+                best_scores = best_scores[keep]
+
+        order = np.argsort(-best_scores, kind="stable")
+        similarities: list[float] = []
+        ids: list[str] = []
+        for index in order:
+            score = float(best_scores[index])
+            if score == -np.inf:
+                continue
+            similarities.append(score)
+            ids.append(str(self._ids[int(best_rows[index])]))
+        return VectorStoreQueryResult(similarities=similarities, ids=ids)
+
+    def persist(self, persist_path: str | None = None, fs: Any = None) -> None:
+        # LlamaIndex passes a JSON file path for the default namespace; this
+        # store always writes into its own directory instead.
+        self._ensure_loaded()
+        self._dir.mkdir(parents=True, exist_ok=True)
+        if self._deleted:
+            self._compact()
+        elif self._pending_vectors:
+            self._append_pending()
+        elif not (self._dir / _META_FILE).exists():
+            self._write_meta()
+
+    def _append_pending(self) -> None:
+        first_new = self._count
+        with (self._dir / _VECTORS_FILE).open("ab") as handle:
+            handle.truncate(first_new * self._row_bytes)
+            for vector in self._pending_vectors:
+                handle.write(vector.tobytes())
+        if self.dtype == "int8":
+            with (self._dir / _SCALES_FILE).open("ab") as handle:
+                handle.truncate(first_new * 4)
+                handle.write(np.asarray(self._pending_scales, dtype=np.float32).tobytes())
+        with (self._dir / _IDS_FILE).open("a", encoding="utf-8") as handle:
+            for row in range(first_new, len(self._ids)):
+                handle.write(self._id_line(row))
+
+        self._count = len(self._ids)
+        self._pending_vectors = []
+        self._pending_scales = []
+        self._write_meta()
+        self._open_matrix()
+
+    def _compact(self) -> None:
+        vectors_tmp = self._dir / f".{_VECTORS_FILE}.tmp"
+        scales_tmp = self._dir / f".{_SCALES_FILE}.tmp"
+        ids_tmp = self._dir / f".{_IDS_FILE}.tmp"
+
+        live_ids: list[str] = []
+        live_refs: list[str | None] = []
+        with vectors_tmp.open("wb") as vectors_out, ids_tmp.open("w", encoding="utf-8") as ids_out:
+            scales_out = scales_tmp.open("wb") if self.dtype == "int8" else None
+            try:
+                for row, vector, scale in self._iter_rows():
+                    node_id = self._ids[row]
+                    if node_id is None:
+                        continue
+                    vectors_out.write(vector.tobytes())
+                    if scales_out is not None:
+                        scales_out.write(np.float32(scale).tobytes())
+                    live_ids.append(node_id)
+                    live_refs.append(self._ref_doc_ids[row])
+                    ids_out.write(json.dumps([node_id, self._ref_doc_ids[row]], ensure_ascii=False) + "\n")
+            finally:
+                if scales_out is not None:
+                    scales_out.close()
+
+        self._matrix = None
+        self._scales = None
+        os.replace(vectors_tmp, self._dir / _VECTORS_FILE)
+        if self.dtype == "int8":
+            os.replace(scales_tmp, self._dir / _SCALES_FILE)
+        os.replace(ids_tmp, self._dir / _IDS_FILE)
+
+        self._ids = list(live_ids)
+        self._ref_doc_ids = live_refs
+        self._row_by_id = {node_id: row for row, node_id in enumerate(live_ids)}
+        self._count = len(live_ids)
+        self._pending_vectors = []
+        self._pending_scales = []
+        self._deleted = 0
+        self._write_meta()
+        self._open_matrix()
+
+    def _iter_rows(self) -> Iterable[tuple[int, np.ndarray, float]]:
+        for row in range(self._count):
+            scale = float(self._scales[row]) if self._scales is not None else 1.0
+            yield row, np.asarray(self._matrix[row]), scale
+        for offset, vector in enumerate(self._pending_vectors):
+            scale = self._pending_scales[offset] if self.dtype == "int8" else 1.0
+            yield self._count + offset, vector, scale
+
+    @property
+    def _row_bytes(self) -> int:
+        return int(self._dim or 0) * np.dtype(self.dtype).itemsize
+
+    def _id_line(self, row: int) -> str:
+        node_id = self._ids[row]
+        if node_id is None:
+            return "null\n"
+        return json.dumps([node_id, self._ref_doc_ids[row]], ensure_ascii=False) + "\n"
+
+    def _write_meta(self) -> None:
+        _write_json_atomic(
+            self._dir / _META_FILE,
+            {"version": 1, "dtype": self.dtype, "dim": self._dim, "count": self._count},
+        )
+
+
+def find_simple_vector_store(storage_dir: Path) -> Path | None:
+    for name in SIMPLE_STORE_FILENAMES:
+        candidate = storage_dir / name
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def migrate_simple_vector_store(storage_dir: Path, dtype: str = "float32") -> MmapVectorStore:
+    source = find_simple_vector_store(storage_dir)
+    if source is None:
+        raise FileNotFoundError(f"no simple vector store found under {storage_dir}")
+
+    data = json.loads(source.read_text(encoding="utf-8"))
+    embeddings: dict[str, list[float]] = data.get("embedding_dict") or {}
+    ref_doc_ids: dict[str, str] = data.get("text_id_to_ref_doc_id") or {}
+
+    store = MmapVectorStore(persist_dir=storage_dir / MMAP_STORE_DIRNAME, dtype=dtype)
+    store.clear()
+    for node_id, embedding in embeddings.items():
+        ref_doc_id = ref_doc_ids.get(node_id)
+        store._append(node_id, None if ref_doc_id in (None, "None") else ref_doc_id, embedding)
+    store.persist()
+    logger.info("Migrated %d embeddings from %s to %s", len(embeddings), source.name, store.persist_dir)
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Migrate a LlamaIndex JSON vector store to the mmap store.")
+    parser.add_argument("storage_dir", type=Path)
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32")
+    args = parser.parse_args()
+    migrate_simple_vector_store(args.storage_dir, dtype=args.dtype)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from backend.services.file_service import FileService, PathSecurityError
+
+
+@dataclass
+class _PendingWrite:
+    content: str
+    base_etag: str | None
+    future: asyncio.Future[str] = field(repr=False)
+
+
+class WriteCoalescer:
+    """Debounce rapid saves to the same path into one disk write.
+
+    A save to a path that has not been written within ``window_seconds`` goes
+    to disk immediately. Saves that arrive inside the window are parked; each
+    newer one replaces the parked content, and when the window closes only the
+    latest content is written. Every parked caller gets the ETag of that write.
+    """
+
+    def __init__(self, file_service: FileService, window_seconds: float = 0.5) -> None:
+        self.file_service = file_service
+        self.window_seconds = window_seconds
+        self._last_write: dict[Path, float] = {}
+        self._pending: dict[Path, _PendingWrite] = {}
+
+    async def write_text(self, relative_path: str, content: str, base_etag: str | None = None) -> str:
+        if not self.file_service.can_write(relative_path):
+            raise PathSecurityError("write path is not allowed")
+        key = self.file_service.resolve_safe_path(relative_path)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.content = content
+            pending.base_etag = base_etag
+            return await asyncio.shield(pending.future)
+
+        wait = self._last_write.get(key, float("-inf")) + self.window_seconds - time.monotonic()
+        if wait <= 0 or self.window_seconds <= 0:
+            self._mark_written(key)
+            return await asyncio.to_thread(self.file_service.write_text, relative_path, content, base_etag)
+
+        pending = _PendingWrite(content, base_etag, asyncio.get_running_loop().create_future())
+        self._pending[key] = pending
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self._pending.pop(key, None)
+            pending.future.cancel()
+            raise
+        self._pending.pop(key, None)
+        self._mark_written(key)
+        try:
+            etag = await asyncio.to_thread(
+                self.file_service.write_text, relative_path, pending.content, pending.base_etag
+            )
+        except Exception as exc:
+            pending.future.set_exception(exc)
+            # Joined callers re-raise it; mark it retrieved in case there are none.
+            pending.future.exception()
+            raise
+        pending.future.set_result(etag)
+        return etag
+
+    def _mark_written(self, key: Path) -> None:
+        now = time.monotonic()
+        self._last_write[key] = now
+        if len(self._last_write) > 1_024:
+            cutoff = now - self.window_seconds
+            self._last_write = {path: at for path, at in self._last_write.items() if at >= cutoff}
@@ -1,9 +1,33 @@
 from __future__ import annotations
 
+import shutil
 import sys
+import uuid
 from pathlib import Path
+from typing import Iterator
+
+import pytest
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+
+@pytest.fixture()
+def work_dir(request: pytest.FixtureRequest) -> Iterator[Path]:
+    # Project rule: temporary files live under ./tmp, never the system temp dir.
+    path = PROJECT_ROOT / "tmp" / "tests" / f"{request.node.name[:48]}-{uuid.uuid4().hex[:8]}"
+    path.mkdir(parents=True, exist_ok=True)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture()
+def offline_embeddings(monkeypatch: pytest.MonkeyPatch) -> None:
+    from llama_index.core import Settings
+
+    from backend.benchmarks.offline import HashEmbedding
+
+    # The private slot, so teardown puts back exactly what was there (even None).
+    monkeypatch.setattr(Settings, "_embed_model", HashEmbedding(dim=64))
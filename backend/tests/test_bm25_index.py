@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from backend.services.bm25_index import BM25Index, tokenize
+
+
+def _corpus() -> dict[str, str]:
+    return {
+        "weather": "Putian weather today is cloudy with light rain in the evening.",
+        "python": "Python list comprehensions build lists from iterables.",
+        "tea": "莆田 的 天气 适合 种植 茶叶",
+        "rust": "Rust ownership rules prevent data races at compile time.",
+    }
+
+
+def test_tokenize_splits_words_and_cjk_bigrams() -> None:
+    assert tokenize("The Putian 天气预报") == ["putian", "天气", "气预", "预报"]
+
+
+def test_search_persist_and_reload(work_dir: Path) -> None:
+    index = BM25Index(work_dir / "bm25")
+    for doc_id, text in _corpus().items():
+        index.add(doc_id, text)
+    assert index.search("rust ownership", top_k=2)[0][0] == "rust"
+    index.persist()
+
+    reloaded = BM25Index(work_dir / "bm25")
+    assert reloaded.doc_count == 4
+    assert reloaded.search("莆田天气", top_k=1)[0][0] == "tea"
+    assert reloaded.search("cloudy weather", top_k=1)[0][0] == "weather"
+
+
+def test_incremental_add_and_remove_after_reload(work_dir: Path) -> None:
+    index = BM25Index(work_dir / "bm25")
+    for doc_id, text in _corpus().items():
+        index.add(doc_id, text)
+    index.persist()
+
+    reloaded = BM25Index(work_dir / "bm25")
+    reloaded.remove("rust")
+    reloaded.add("go", "Go goroutines communicate over channels.")
+    assert [doc_id for doc_id, _ in reloaded.search("ownership goroutines", top_k=4)] == ["go"]
+    reloaded.persist()
+
+    final = BM25Index(work_dir / "bm25")
+    assert sorted(final.doc_ids()) == ["go", "python", "tea", "weather"]
+    assert final.search("channels", top_k=1)[0][0] == "go"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_openai import ChatOpenAI
+
+from backend.benchmarks.fake_llm import FakeLLMConfig, create_fake_llm_app
+from backend.benchmarks.load import SessionResult, compare_reports, prepare_root, summarize
+from backend.config import get_app_config
+
+
+def _model(config: FakeLLMConfig) -> ChatOpenAI:
+    client = TestClient(create_fake_llm_app(config))
+    return ChatOpenAI(model="fake-model", api_key="fake-key", base_url="http://testserver/v1", http_client=client)
+
+
+def test_fake_llm_streams_scripted_tool_calls_then_the_reply() -> None:
+    script = [{"tool_calls": [{"name": "read_file", "arguments": {"file_path": "memory/MEMORY.md"}}]}]
+    model = _model(FakeLLMConfig(first_token_ms=0, tokens_per_second=0, reply="all done here", script=script))
+
+    chunks = list(model.stream([{"role": "user", "content": "read memory"}]))
+    message = chunks[0]
+    for chunk in chunks[1:]:
+        message = message + chunk
+    assert [(call["name"], call["args"]) for call in message.tool_calls] == [
+        ("read_file", {"file_path": "memory/MEMORY.md"})
+    ]
+
+    followup = [
+        {"role": "user", "content": "read memory"},
+        {"role": "assistant", "content": "", "tool_calls": [{"id": "c1", "name": "read_file", "args": {}}]},
+        {"role": "tool", "tool_call_id": "c1", "content": "memory text"},
+    ]
+    pieces = [chunk.content for chunk in model.stream(followup) if chunk.content]
+    assert pieces == ["all", " done", " here"]
+    assert model.invoke(followup).content == "all done here"
+
+
+def test_load_summary_and_baseline_comparison() -> None:
+    results = [
+        SessionResult(ok=True, ttft_ms=100.0 + index, latency_ms=500.0 + 10 * index, events=6, tool_calls=1)
+        for index in range(10)
+    ]
+    results.append(SessionResult(ok=False, ttft_ms=None, latency_ms=30.0, events=1, tool_calls=0, error="boom"))
+    summary = summarize(results, wall_seconds=2.0)
+    assert (summary["completed"], summary["failed"], summary["throughput_rps"]) == (10, 1, 5.0)
+    assert summary["latency_p50_ms"] == pytest.approx(550.0, abs=10.0)
+    assert summary["latency_p99_ms"] == 590.0
+    assert summary["errors"] == ["boom"]
+
+    lines = compare_reports({"results": summary}, {"results": {**summary, "throughput_rps": 4.0}})
+    assert "throughput_rps: 4.000 -> 5.000 (+25.0%)" in lines
+    assert "cpu_seconds: n/a" in lines
+
+
+def test_load_backend_runs_against_an_isolated_root(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> None:
+    source = work_dir / "source"
+    (source / "memory").mkdir(parents=True)
+    (source / "memory" / "MEMORY.md").write_text("likes tea", encoding="utf-8")
+    (source / "knowledge").mkdir()
+    (source / "knowledge" / "manual.md").write_text("do not index me", encoding="utf-8")
+
+    root = work_dir / "root"
+    prepare_root(root, source)
+    assert (root / "memory" / "MEMORY.md").read_text(encoding="utf-8") == "likes tea"
+    assert list((root / "knowledge").iterdir()) == [] and (root / "storage").is_dir()
+
+    monkeypatch.setenv("BACKEND_ROOT_DIR", str(root))
+    get_app_config.cache_clear()
+    try:
+        config = get_app_config()
+        assert (config.root_dir, config.sessions_dir, config.storage_dir) == (root, root / "sessions", root / "storage")
+        assert config.backend_root.name == "backend"
+    finally:
+        get_app_config.cache_clear()
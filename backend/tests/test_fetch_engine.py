@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from backend.tools import fetch_tool
+from backend.tools.fetch_engine import FetchEngine, HttpCache
+from backend.tools.fetch_tool import create_fetch_urls_tool, fetch_many
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: dict[str, int] = {}
+    not_modified: dict[str, int] = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early or timed out, which is what some tests want.
+            pass
+
+    def do_GET(self) -> None:
+        _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                _Handler.not_modified[self.path] = _Handler.not_modified.get(self.path, 0) + 1
+                self._send(304, b"", {"ETag": '"v1"'})
+                return
+            self._send(200, b"<p>etag body</p>", {"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"'})
+        elif self.path == "/fresh":
+            self._send(200, b"fresh body", {"Content-Type": "text/plain", "Cache-Control": "max-age=300"})
+        elif self.path == "/no-store":
+            self._send(200, b"secret", {"Content-Type": "text/plain", "Cache-Control": "no-store", "ETag": '"x"'})
+        elif self.path == "/large":
+            self._send(200, b"a" * 200_000, {"Content-Type": "text/plain"})
+        elif self.path == "/large-fresh":
+            self._send(200, b"a" * 200_000, {"Content-Type": "text/plain", "Cache-Control": "max-age=300"})
+        elif self.path.startswith("/page/"):
+            with _Handler.lock:
+                _Handler.active += 1
+                _Handler.peak = max(_Handler.peak, _Handler.active)
+            threading.Event().wait(0.15)
+            with _Handler.lock:
+                _Handler.active -= 1
+            body = f"<html><body><p>{self.path} {'word ' * 2000}</p></body></html>".encode()
+            self._send(200, body, {"Content-Type": "text/html"})
+        elif self.path == "/slow":
+            threading.Event().wait(1.0)
+            self._send(200, b"late", {"Content-Type": "text/plain"})
+        else:
+            self._send(404, b"missing", {"Content-Type": "text/plain"})
+
+
+@pytest.fixture()
+def server() -> Iterator[str]:
+    _Handler.hits = {}
+    _Handler.not_modified = {}
+    _Handler.active = 0
+    _Handler.peak = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_conditional_request_reuses_cached_body(server: str, work_dir: Path) -> None:
+    engine = FetchEngine(cache_dir=work_dir / "cache")
+    first = engine.fetch(f"{server}/etag")
+    assert first.text == "<p>etag body</p>" and not first.from_cache
+
+    second = FetchEngine(cache_dir=work_dir / "cache").fetch(f"{server}/etag")
+    assert second.text == "<p>etag body</p>"
+    assert second.from_cache and second.revalidated
+    assert _Handler.not_modified["/etag"] == 1
+
+
+def test_max_age_skips_the_network_and_no_store_is_not_cached(server: str, work_dir: Path) -> None:
+    engine = FetchEngine(cache_dir=work_dir / "cache")
+    engine.fetch(f"{server}/fresh")
+    cached = engine.fetch(f"{server}/fresh")
+    assert cached.from_cache and not cached.revalidated
+    assert _Handler.hits["/fresh"] == 1
+
+    engine.fetch(f"{server}/no-store")
+    assert not engine.fetch(f"{server}/no-store").from_cache
+    assert _Handler.hits["/no-store"] == 2
+
+
+def test_streaming_read_stops_at_byte_budget(server: str) -> None:
+    engine = FetchEngine(max_bytes=10_000)
+    result = engine.fetch(f"{server}/large")
+    assert len(result.text) == 10_000
+    assert result.truncated
+
+    missing = engine.fetch(f"{server}/nothing")
+    assert missing.status == 404 and missing.text == "missing"
+
+
+def test_truncated_bodies_are_not_cached(server: str, work_dir: Path) -> None:
+    engine = FetchEngine(cache_dir=work_dir / "cache", max_bytes=10_000)
+    assert engine.fetch(f"{server}/large-fresh").truncated
+    again = engine.fetch(f"{server}/large-fresh")
+    assert again.truncated and not again.from_cache
+    assert _Handler.hits["/large-fresh"] == 2
+    assert list((work_dir / "cache").glob("*.json")) == []
+
+
+def test_cache_evicts_least_recently_used_entries(work_dir: Path) -> None:
+    headers = {"Content-Type": "text/plain", "Cache-Control": "max-age=300"}
+    cache = HttpCache(work_dir / "cache", max_total_bytes=2_500)
+    for name in ("a", "b", "c"):
+        cache.store(f"https://example.com/{name}", headers, name.encode() * 700, truncated=False)
+    assert cache.load("https://example.com/a") is None
+    assert cache.load("https://example.com/b") is not None
+
+    cache.store("https://example.com/d", headers, b"d" * 700, truncated=False)
+    assert cache.load("https://example.com/c") is None
+    assert cache.load("https://example.com/b") is not None
+    assert len(list((work_dir / "cache").glob("*.body"))) == 2
+
+    restarted = HttpCache(work_dir / "cache", max_total_bytes=2_500)
+    restarted.store("https://example.com/e", headers, b"e" * 700, truncated=False)
+    assert restarted.load("https://example.com/e") is not None
+
+
+def test_read_timeout(server: str) -> None:
+    import requests
+
+    engine = FetchEngine(read_timeout=0.2)
+    with pytest.raises(requests.Timeout):
+        engine.fetch(f"{server}/slow")
+
+
+@pytest.mark.parametrize(("concurrency", "per_host", "expected_peak"), [(8, 2, 2), (3, 8, 3)])
+def test_fetch_many_caps_concurrency(
+    monkeypatch: pytest.MonkeyPatch, server: str, concurrency: int, per_host: int, expected_peak: int
+) -> None:
+    # The test server lives on 127.0.0.1, which the tools block by design.
+    monkeypatch.setattr(fetch_tool, "_is_blocked_target", lambda url: False)
+    urls = [f"{server}/page/{index}" for index in range(6)]
+    results = asyncio.run(
+        fetch_many(FetchEngine(), urls, max_chars=3_000, concurrency=concurrency, per_host=per_host)
+    )
+    assert [url for url, _ in results] == urls
+    assert _Handler.peak == expected_peak
+    assert all(text.startswith(f"/page/{index}") for index, (_, text) in enumerate(results))
+    assert sum(len(text) for _, text in results) <= 3_000
+
+
+def test_fetch_urls_tool_keeps_blocked_target_checks() -> None:
+    tool = create_fetch_urls_tool(engine=FetchEngine())
+    output = tool.invoke({"urls": ["http://localhost:9/a", "ftp://example.org/b", "http://localhost:9/a"]})
+    assert output == (
+        "## [1] http://localhost:9/a\nBlocked URL target.\n\n"
+        "## [2] ftp://example.org/b\nOnly http(s) URLs are allowed."
+    )
+    assert asyncio.run(tool.ainvoke({"urls": []})) == "No URLs given."
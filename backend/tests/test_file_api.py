@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import app as backend_app
+from backend.services.file_service import FileService
+
+
+@pytest.fixture()
+def client(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> TestClient:
+    (work_dir / "memory").mkdir()
+    (work_dir / "memory" / "MEMORY.md").write_text("# Memory\nlikes tea\n", encoding="utf-8")
+    services = backend_app.AppServices(backend_app.config)
+    services.file_service = FileService(root_dir=work_dir)
+    monkeypatch.setattr(backend_app, "services", services)
+    return TestClient(backend_app.app)
+
+
+def test_conditional_get_returns_304_until_the_file_changes(client: TestClient, work_dir: Path) -> None:
+    first = client.get("/api/files", params={"path": "memory/MEMORY.md"})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json() == {"path": "memory/MEMORY.md", "content": "# Memory\nlikes tea\n", "etag": etag}
+
+    cached = client.get("/api/files", params={"path": "memory/MEMORY.md"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    since = client.get(
+        "/api/files",
+        params={"path": "memory/MEMORY.md"},
+        headers={"If-Modified-Since": first.headers["last-modified"]},
+    )
+    assert since.status_code == 304
+
+    target = work_dir / "memory" / "MEMORY.md"
+    target.write_text("# Memory\nlikes coffee\n", encoding="utf-8")
+    stat_result = target.stat()
+    os.utime(target, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 2_000_000_000))
+    changed = client.get("/api/files", params={"path": "memory/MEMORY.md"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["content"].endswith("coffee\n")
+    assert changed.headers["etag"] != etag
+    stale = formatdate(stat_result.st_mtime - 10, usegmt=True)
+    assert (
+        client.get("/api/files", params={"path": "memory/MEMORY.md"}, headers={"If-Modified-Since": stale}).status_code
+        == 200
+    )
+
+
+def test_raw_mode_streams_bytes_and_serves_ranges(client: TestClient, work_dir: Path) -> None:
+    (work_dir / "workspace").mkdir()
+    (work_dir / "workspace" / "data.log").write_bytes(b"0123456789" * 1000)
+
+    full = client.get("/api/files", params={"path": "workspace/data.log", "raw": True})
+    assert full.status_code == 200
+    assert len(full.content) == 10_000
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = client.get("/api/files", params={"path": "workspace/data.log"}, headers={"Range": "bytes=9995-"})
+    assert part.status_code == 206
+    assert part.content == b"56789"
+    assert part.headers["content-range"] == "bytes 9995-9999/10000"
+    assert part.headers["etag"] == full.headers["etag"]
+
+    lines = client.get("/api/files", params={"path": "memory/MEMORY.md"}, headers={"Range": "bytes=9-"})
+    assert lines.status_code == 206
+    assert lines.content == b"likes tea\n"
+    assert lines.headers["content-range"] == "bytes 9-18/19"
+
+
+def test_missing_and_unsafe_paths(client: TestClient) -> None:
+    assert client.get("/api/files", params={"path": "memory/missing.md"}).status_code == 404
+    assert client.get("/api/files", params={"path": "memory"}).status_code == 404
+    assert client.get("/api/files", params={"path": "../secret"}).status_code == 400
+
+
+def test_save_is_atomic_and_rejects_stale_base_etag(client: TestClient, work_dir: Path) -> None:
+    loaded = client.get("/api/files", params={"path": "memory/MEMORY.md"}).json()
+
+    saved = client.post(
+        "/api/files", json={"path": "memory/MEMORY.md", "content": "v2\n", "base_etag": loaded["etag"]}
+    )
+    assert saved.status_code == 200
+    assert saved.json()["etag"] == saved.headers["etag"] != loaded["etag"]
+    assert (work_dir / "memory" / "MEMORY.md").read_text(encoding="utf-8") == "v2\n"
+    assert not list((work_dir / "memory").glob(".*.part"))
+
+    stale = client.post(
+        "/api/files", json={"path": "memory/MEMORY.md", "content": "v3\n", "base_etag": loaded["etag"]}
+    )
+    assert stale.status_code == 409
+    assert stale.json()["etag"] == saved.json()["etag"]
+    assert (work_dir / "memory" / "MEMORY.md").read_text(encoding="utf-8") == "v2\n"
+
+    created = client.post("/api/files", json={"path": "memory/new.md", "content": "x", "base_etag": ""})
+    assert created.status_code == 200
+    again = client.post("/api/files", json={"path": "memory/new.md", "content": "y", "base_etag": ""})
+    assert again.status_code == 409
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import mmap
+from pathlib import Path
+
+from backend.tools import file_tool
+from backend.tools.file_tool import FileReader, create_read_file_tool
+
+
+def _write_log(path: Path, lines: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"row {i} {'ERROR' if i % 1000 == 5 else 'ok'}\n" for i in range(lines)), encoding="utf-8")
+
+
+def test_line_paging_reports_size_and_next_offset(monkeypatch, work_dir: Path) -> None:
+    # A small stride exercises the checkpoint index without a huge fixture file.
+    monkeypatch.setattr(file_tool, "_LINE_STRIDE", 16)
+    _write_log(work_dir / "logs" / "app.log", 5_000)
+    tool = create_read_file_tool(root_dir=work_dir)
+
+    page = tool.invoke({"file_path": "logs/app.log", "offset": 4_321, "limit": 2})
+    header, body = page.split("\n---\n")
+    size = (work_dir / "logs" / "app.log").stat().st_size
+    assert header == (
+        f"file: logs/app.log | size: {size} bytes | lines: 5000\n"
+        "showing lines 4322-4323 of 5000; next offset: 4323"
+    )
+    assert body == "row 4321 ok\nrow 4322 ok\n"
+
+    last = tool.invoke({"file_path": str(work_dir / "logs" / "app.log"), "offset": 4_999})
+    assert last.endswith("showing lines 5000-5000 of 5000\n---\nrow 4999 ok\n")
+
+
+def test_byte_ranges_and_output_budget(work_dir: Path) -> None:
+    (work_dir / "wide.txt").write_text("x" * 50_000, encoding="utf-8")
+    reader = FileReader(root_dir=work_dir, max_chars=1_000)
+
+    ranged = reader.read("wide.txt", offset=100, limit=10, mode="bytes")
+    assert ranged.endswith("showing bytes 100-109 of 50000; next offset: 110\n---\nxxxxxxxxxx")
+    assert "lines: 1" in ranged
+
+    capped = reader.read("wide.txt")
+    assert "use mode=bytes" in capped
+    assert len(capped.split("\n---\n")[1]) == 1_000
+
+
+def test_grep_mode_pages_through_matches(work_dir: Path) -> None:
+    _write_log(work_dir / "app.log", 5_000)
+    reader = FileReader(root_dir=work_dir)
+
+    first = reader.read("app.log", mode="grep", pattern=r"ERROR$", limit=2)
+    assert first.endswith(
+        "2 matching lines for 'ERROR$' from line 1; more matches, next offset: 2005\n---\n"
+        "6: row 5 ERROR\n1006: row 1005 ERROR"
+    )
+    rest = reader.read("app.log", mode="grep", pattern=r"ERROR$", offset=2_005)
+    assert rest.endswith("---\n2006: row 2005 ERROR\n3006: row 3005 ERROR\n4006: row 4005 ERROR")
+
+
+def test_grep_counts_lines_across_checkpoints_without_copying(monkeypatch, work_dir: Path) -> None:
+    path = work_dir / "sparse.log"
+    lines = ("ERROR\n" if i in (3, 9_000) else f"{'x' * (i % 7)}\n" for i in range(12_000))
+    path.write_text("".join(lines), encoding="utf-8")
+    data = path.read_bytes()
+    monkeypatch.setattr(file_tool, "_SCAN_CHUNK", 4_096)
+    reader = FileReader(root_dir=work_dir)
+
+    assert reader.read("sparse.log", mode="grep", pattern="ERROR").endswith("---\n4: ERROR\n9001: ERROR")
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = file_tool._build_line_index(mapped, len(data), 0)
+        for start, end in ((0, len(data)), (5, 40_000), (7_000, 7_003), (123, 45_678)):
+            assert file_tool._count_newlines(mapped, index, start, end) == data[start:end].count(b"\n")
+
+
+def test_rejects_paths_outside_root(work_dir: Path) -> None:
+    reader = FileReader(root_dir=work_dir)
+    assert reader.read("../secret.txt").startswith("Error: Access denied")
+    assert reader.read("/etc/hostname").startswith("Error: Access denied")
+    assert reader.read("missing.txt") == "Error: no such file or directory: missing.txt"
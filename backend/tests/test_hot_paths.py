@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from backend.benchmarks.hot_paths import THRESHOLDS_PATH, CaseResult, build_cases, evaluate, measure
+
+
+def test_every_case_runs_and_has_a_threshold(work_dir: Path) -> None:
+    cases = build_cases(work_dir / "hot_paths", quick=True)
+    results = [measure(case, min_time=0.0, min_rounds=1) for case in cases]
+    assert all(result.rounds == 1 and result.median_us > 0 for result in results)
+
+    thresholds = json.loads(THRESHOLDS_PATH.read_text(encoding="utf-8"))
+    assert {result.name for result in results} <= set(thresholds)
+
+
+def test_evaluate_flags_thresholds_and_baseline_regressions() -> None:
+    results = [
+        CaseResult(name="fast", rounds=5, min_us=9.0, median_us=10.0, mean_us=10.0),
+        CaseResult(name="slow", rounds=5, min_us=90.0, median_us=100.0, mean_us=100.0),
+        CaseResult(name="drifted", rounds=5, min_us=40.0, median_us=50.0, mean_us=50.0),
+    ]
+    baseline = {"results": [{"name": "fast", "median_us": 9.0}, {"name": "drifted", "median_us": 30.0}]}
+
+    failures = evaluate(results, {"fast": 20.0, "slow": 80.0}, baseline, max_regression=0.25)
+
+    assert [result.status for result in results] == ["ok", "over_threshold", "regressed"]
+    assert failures == [
+        "slow: median 100us > threshold 80us",
+        "drifted: median 30us -> 50us (+66.7%)",
+    ]
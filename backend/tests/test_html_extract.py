@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from backend.benchmarks.fetch_clean import generate_pages, run
+from backend.tools.fetch_tool import FetchCleaner
+from backend.tools.html_extract import MarkdownExtractor, html_to_markdown
+
+PAGE = """<html><head><title>Guide</title><style>p { color: red }</style></head><body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<script>window.tracking = true;</script>
+<main><h1>Install   guide</h1>
+<p>Run <code>pip install</code> and read the <a href="https://example.org/docs">docs</a>.</p>
+<ul><li>fast</li><li>small<ol><li>first</li><li>second</li></ol></li></ul>
+<pre>x = 1
+y = 2</pre>
+<table><tr><th>Name</th><th>Size</th></tr><tr><td>a</td><td>1</td></tr></table></main>
+<footer>Copyright</footer></body></html>"""
+
+
+def test_single_pass_markdown_drops_boilerplate() -> None:
+    markdown, truncated = html_to_markdown(PAGE, budget=2_000)
+    assert not truncated
+    assert markdown == (
+        "# Install guide\n\n"
+        "Run `pip install` and read the [docs](https://example.org/docs).\n\n"
+        "- fast\n- small\n  1. first\n  2. second\n\n"
+        "```\nx = 1\ny = 2\n```\n\n"
+        "Name | Size\na | 1"
+    )
+    for noise in ("Home", "tracking", "Copyright", "color", "Guide"):
+        assert noise not in markdown
+
+
+def test_article_headers_are_kept_and_unclosed_boilerplate_ends() -> None:
+    page = (
+        "<body><header><a href='/'>Site</a></header>"
+        "<article><header><h1>Title</h1></header><p>Body text.</p></article>"
+        "<div><nav><a href='/x'>Menu</a><br/><span>more</div><p>After the nav.</p></body>"
+    )
+    markdown, _ = html_to_markdown(page, budget=2_000)
+    assert markdown == "# Title\n\nBody text.\n\nAfter the nav."
+
+
+def test_extractor_stops_parsing_at_budget() -> None:
+    extractor = MarkdownExtractor(budget=50)
+    page = "<html><body>" + "<p>lorem ipsum dolor sit amet</p>" * 10_000 + "</body></html>"
+    chunks = [page[start : start + 1024] for start in range(0, len(page), 1024)]
+    fed = 0
+    for chunk in chunks:
+        extractor.feed(chunk)
+        fed += 1
+        if extractor.done:
+            break
+    assert extractor.done
+    assert fed == 1
+    assert len(extractor.text) <= 50
+
+    cleaned = FetchCleaner(max_chars=100).clean(page)
+    assert cleaned.endswith("...[truncated]")
+    assert len(cleaned) <= 100
+
+
+def test_fetch_clean_benchmark_on_small_pages(work_dir: Path) -> None:
+    generate_pages(work_dir, sizes_kb=(4, 16))
+    report = run(work_dir, repeat=1)
+    assert [item["page"] for item in report["results"]] == ["synthetic-16kb.html", "synthetic-4kb.html"]
+    assert all(item["single_pass_chars"] > 0 for item in report["results"])
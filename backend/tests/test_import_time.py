@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from backend.benchmarks.importtime import format_report, loaded_heavy_packages, profile_import, total_ms
+
+# About 0.7s on a dev laptop, nearly all of it FastAPI; 3.5s before imports were deferred.
+IMPORT_BUDGET_MS = float(os.getenv("BACKEND_IMPORT_BUDGET_MS", "1500"))
+
+
+@pytest.mark.parametrize("module", ["backend.app", "backend.tools"])
+def test_import_defers_heavy_packages(module: str) -> None:
+    records = profile_import(module)
+    assert loaded_heavy_packages(records) == [], format_report(records, module, top=15)
+
+
+def test_app_import_time_budget() -> None:
+    records = profile_import("backend.app")
+    assert total_ms(records, "backend.app") < IMPORT_BUDGET_MS, format_report(records, "backend.app", top=15)
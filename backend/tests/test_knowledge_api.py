@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import app as backend_app
+from backend.config import ModelSettings
+from backend.services.file_service import FileService
+from backend.services.knowledge_service import KnowledgeService
+
+
+@pytest.fixture()
+def client(monkeypatch: pytest.MonkeyPatch, work_dir: Path, offline_embeddings: None) -> TestClient:
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "1")
+    (work_dir / "knowledge").mkdir()
+    service = KnowledgeService(
+        knowledge_dir=work_dir / "knowledge",
+        storage_dir=work_dir / "storage",
+        model_settings=ModelSettings(base_url="", api_key="", model=""),
+    )
+    services = backend_app.AppServices(backend_app.config)
+    services.file_service = FileService(root_dir=work_dir)
+    services.knowledge_service = service
+    monkeypatch.setattr(backend_app, "services", services)
+    return TestClient(backend_app.app)
+
+
+def test_upload_list_search_and_delete(client: TestClient) -> None:
+    def body():
+        yield b"Owls hunt at night. "
+        yield b"Their feathers muffle the sound of flight."
+
+    response = client.post("/api/knowledge/documents", params={"path": "birds/owls.md"}, content=body())
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["path"] == "birds/owls.md"
+    assert payload["chunks"] == 1
+    assert payload["index_seconds"] >= 0
+    assert payload["size_bytes"] == 62
+
+    listed = client.get("/api/knowledge/documents").json()["documents"]
+    assert listed == [
+        {"path": "birds/owls.md", "size_bytes": 62, "updated_at": listed[0]["updated_at"], "chunks": 1}
+    ]
+    assert "feathers" in backend_app.services.knowledge_service.search("owl feathers", top_k=1)
+
+    deleted = client.delete("/api/knowledge/documents", params={"path": "birds/owls.md"})
+    assert deleted.status_code == 200
+    assert deleted.json()["removed_chunks"] == 1
+    assert client.get("/api/knowledge/documents").json()["documents"] == []
+    assert backend_app.services.knowledge_service.search("owl feathers", top_k=1) == "No relevant knowledge found."
+
+
+def test_upload_rejects_bad_paths_and_types(client: TestClient) -> None:
+    assert client.post("/api/knowledge/documents", params={"path": "../app.py"}, content=b"x").status_code == 400
+    assert client.post("/api/knowledge/documents", params={"path": "tool.exe"}, content=b"x").status_code == 400
+    assert client.delete("/api/knowledge/documents", params={"path": "missing.md"}).status_code == 404
+
+
+def test_upload_enforces_size_limit(monkeypatch: pytest.MonkeyPatch, client: TestClient, work_dir: Path) -> None:
+    monkeypatch.setattr(backend_app, "KNOWLEDGE_MAX_UPLOAD_BYTES", 8)
+    response = client.post("/api/knowledge/documents", params={"path": "big.txt"}, content=b"0123456789")
+    assert response.status_code == 413
+    assert list((work_dir / "knowledge").iterdir()) == []
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from backend.config import ModelSettings
+from backend.services.bm25_index import BM25Index
+from backend.services.knowledge_service import KnowledgeService
+
+
+@pytest.fixture()
+def knowledge_dirs(monkeypatch: pytest.MonkeyPatch, work_dir: Path, offline_embeddings: None) -> tuple[Path, Path]:
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "1")
+    knowledge_dir = work_dir / "knowledge"
+    knowledge_dir.mkdir()
+    (knowledge_dir / "pandas.md").write_text("Red pandas live in bamboo forests and eat bamboo.", encoding="utf-8")
+    (knowledge_dir / "rust.md").write_text("The rust compiler enforces ownership and borrowing.", encoding="utf-8")
+    return knowledge_dir, work_dir / "storage"
+
+
+def _service(knowledge_dir: Path, storage_dir: Path) -> KnowledgeService:
+    return KnowledgeService(
+        knowledge_dir=knowledge_dir,
+        storage_dir=storage_dir,
+        model_settings=ModelSettings(base_url="", api_key="", model=""),
+    )
+
+
+def test_mmap_backend_builds_and_reloads(monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]) -> None:
+    monkeypatch.setenv("KNOWLEDGE_VECTOR_STORE", "mmap")
+    knowledge_dir, storage_dir = knowledge_dirs
+
+    first = _service(knowledge_dir, storage_dir)
+    assert "bamboo" in first.search("where do red pandas live", top_k=1)
+    assert (storage_dir / "mmap_vectors" / "meta.json").exists()
+
+    second = _service(knowledge_dir, storage_dir)
+    assert "ownership" in second.search("rust ownership borrowing", top_k=1)
+
+
+def test_mmap_backend_migrates_json_store(monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    _service(knowledge_dir, storage_dir).initialize()
+    assert (storage_dir / "default__vector_store.json").exists()
+
+    monkeypatch.setenv("KNOWLEDGE_VECTOR_STORE", "mmap")
+    migrated = _service(knowledge_dir, storage_dir)
+    assert "bamboo" in migrated.search("red pandas bamboo", top_k=1)
+    assert (storage_dir / "mmap_vectors" / "vectors.bin").exists()
+
+
+def test_bm25_statistics_are_reused_across_restarts(
+    monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]
+) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    _service(knowledge_dir, storage_dir).initialize()
+    assert (storage_dir / "bm25" / "meta.json").exists()
+
+    def fail_add(self: BM25Index, doc_id: str, text: str) -> None:
+        raise AssertionError("corpus was re-tokenized on restart")
+
+    monkeypatch.setattr(BM25Index, "add", fail_add)
+    restarted = _service(knowledge_dir, storage_dir)
+    restarted.initialize()
+    hits = restarted.bm25_retriever.retrieve("bamboo forests")
+    assert hits and "bamboo" in hits[0].node.get_content()
+
+
+def test_bm25_resyncs_when_node_ids_change_but_count_does_not(knowledge_dirs: tuple[Path, Path]) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    _service(knowledge_dir, storage_dir).initialize()
+    stale = BM25Index(storage_dir / "bm25")
+    count = stale.doc_count
+    stale.clear()
+    for index in range(count):
+        stale.add(f"stale-{index}", "bamboo forests")
+    stale.persist()
+
+    restarted = _service(knowledge_dir, storage_dir)
+    restarted.initialize()
+    assert not any(doc_id.startswith("stale-") for doc_id in restarted.bm25_index.doc_ids())
+    hits = restarted.bm25_retriever.retrieve("bamboo forests")
+    assert hits and "bamboo" in hits[0].node.get_content()
+
+
+def test_search_fuses_by_node_id_and_caches_results(
+    monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]
+) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    service = _service(knowledge_dir, storage_dir)
+
+    hybrid = service.retrieve("red pandas bamboo", top_k=2)
+    assert len({item.node.node_id for item in hybrid}) == len(hybrid)
+    assert "bamboo" in hybrid[0].node.get_content()
+    assert service.retrieve("bamboo", top_k=1, mode="bm25")[0].node.get_content().startswith("Red pandas")
+
+    first = service.search("Red   Pandas bamboo", top_k=2)
+    calls: list[str] = []
+    monkeypatch.setattr(service, "_retrieve", lambda *args, **kwargs: calls.append("retrieve") or ([], True))
+    assert service.search("red pandas BAMBOO", top_k=2) == first
+    assert calls == []
+
+    service._mark_index_changed()
+    assert service.search("red pandas bamboo", top_k=2) == "No relevant knowledge found."
+    assert calls == ["retrieve"]
+
+
+def test_search_does_not_cache_after_a_retriever_failure(
+    monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]
+) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    service = _service(knowledge_dir, storage_dir)
+    service.initialize()
+    safe_retrieve = service._safe_retrieve
+    vector_down = True
+
+    def flaky(kind: str, query: str, top_k: int) -> list[object] | None:
+        if kind == "vector" and vector_down:
+            return None
+        return safe_retrieve(kind, query, top_k)
+
+    monkeypatch.setattr(service, "_safe_retrieve", flaky)
+    assert service.retrieve("bamboo", top_k=1)[0].node.get_content().startswith("Red pandas")
+    service.search("bamboo", top_k=1)
+    assert len(service._result_cache._entries) == 0
+
+    vector_down = False
+    service.search("bamboo", top_k=1)
+    assert len(service._result_cache._entries) == 1
+
+
+def test_parallel_ingest_reports_per_file_errors(
+    monkeypatch: pytest.MonkeyPatch, knowledge_dirs: tuple[Path, Path]
+) -> None:
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "2")
+    knowledge_dir, storage_dir = knowledge_dirs
+    (knowledge_dir / "broken.pdf").write_bytes(b"not really a pdf")
+
+    service = _service(knowledge_dir, storage_dir)
+    service.initialize()
+
+    report = service.last_ingest_report
+    assert report.workers == 2
+    by_name = {Path(item["path"]).name: item for item in report.files}
+    assert by_name["broken.pdf"]["error"]
+    assert by_name["pandas.md"]["error"] is None
+    assert by_name["pandas.md"]["chunks"] == 1
+    assert by_name["pandas.md"]["parse_seconds"] > 0
+    assert "ownership" in service.search("rust ownership", top_k=1)
+
+
+def test_first_upload_is_not_ingested_twice(knowledge_dirs: tuple[Path, Path]) -> None:
+    knowledge_dir, storage_dir = knowledge_dirs
+    service = _service(knowledge_dir, storage_dir)
+    parsed: list[list[Path]] = []
+    parse_and_embed = service._parse_and_embed
+
+    def counting_parse(paths: list[Path], workers: int):
+        parsed.append(list(paths))
+        return parse_and_embed(paths, workers)
+
+    service._parse_and_embed = counting_parse  # type: ignore[method-assign]
+    result = service.add_document(knowledge_dir / "pandas.md")
+
+    assert len(parsed) == 1
+    assert result["chunks"] == 1
+    assert result["replaced_chunks"] == 0
+    assert service.list_documents()[0]["chunks"] == 1
+
+    result = service.add_document(knowledge_dir / "pandas.md")
+    assert parsed[-1] == [knowledge_dir / "pandas.md"]
+    assert result["replaced_chunks"] == 1
+
+
+def test_searches_do_not_wait_for_upload_embedding(knowledge_dirs: tuple[Path, Path]) -> None:
+    from llama_index.core import Settings
+
+    knowledge_dir, storage_dir = knowledge_dirs
+    service = _service(knowledge_dir, storage_dir)
+    service.initialize()
+
+    embedding_started = threading.Event()
+    release = threading.Event()
+    embed_model = Settings.embed_model
+    get_batch = embed_model.get_text_embedding_batch
+
+    def slow_batch(texts: list[str], **kwargs: object) -> list[list[float]]:
+        embedding_started.set()
+        release.wait(timeout=10)
+        return get_batch(texts, **kwargs)
+
+    object.__setattr__(embed_model, "get_text_embedding_batch", slow_batch)
+    (knowledge_dir / "tea.md").write_text("Green tea is steamed, black tea is oxidised.", encoding="utf-8")
+    upload = threading.Thread(target=service.add_document, args=(knowledge_dir / "tea.md",))
+    upload.start()
+    try:
+        assert embedding_started.wait(timeout=10)
+        hits: list[object] = []
+        search = threading.Thread(target=lambda: hits.extend(service.retrieve("rust ownership", 1, "bm25")))
+        search.start()
+        search.join(timeout=5)
+        assert not search.is_alive(), "search waited for the upload's embedding"
+        assert "ownership" in service._node_content(hits[0])
+    finally:
+        release.set()
+        upload.join()
+    assert "oxidised" in service.search("black tea oxidised", top_k=1)
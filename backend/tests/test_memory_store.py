@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from backend.services.memory_store import MemoryStore, chunk_markdown, estimate_tokens
+
+
+def _touch_later(path: Path) -> None:
+    stat_result = path.stat()
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+
+
+def test_chunk_markdown_keeps_heading_per_entry() -> None:
+    chunks = chunk_markdown("MEMORY.md", "# Prefs\n- likes tea\n  strongly\n- hates noise\n\n# Work\nShips on Fridays.\n")
+    assert [(chunk.heading, chunk.text) for chunk in chunks] == [
+        ("Prefs", "- likes tea\n  strongly"),
+        ("Prefs", "- hates noise"),
+        ("Work", "Ships on Fridays."),
+    ]
+
+
+def test_small_memory_is_injected_whole_and_logs_fill_the_rest(work_dir: Path) -> None:
+    memory = work_dir / "memory" / "MEMORY.md"
+    (work_dir / "memory" / "logs").mkdir(parents=True)
+    memory.write_text("# Facts\n- user is called Lin\n", encoding="utf-8")
+    (work_dir / "memory" / "logs" / "2026-10-18.md").write_text(
+        "# 2026-10-18\n- debugged the kafka consumer lag\n- booked dentist\n", encoding="utf-8"
+    )
+    store = MemoryStore(memory_file=memory, logs_dir=work_dir / "memory" / "logs", token_budget=200)
+
+    context = store.context_for("how is the kafka consumer doing?")
+    assert context.startswith("# Facts\n- user is called Lin")
+    assert "## logs/2026-10-18.md / 2026-10-18\n- debugged the kafka consumer lag" in context
+    assert "dentist" not in context
+
+
+def test_large_memory_is_retrieved_within_budget_and_reindexed_on_change(work_dir: Path) -> None:
+    memory = work_dir / "memory" / "MEMORY.md"
+    memory.parent.mkdir(parents=True)
+    facts = [f"- fact {index} about topic{index} and some filler words" for index in range(300)]
+    memory.write_text("# Facts\n" + "\n".join(facts) + "\n", encoding="utf-8")
+    store = MemoryStore(memory_file=memory, logs_dir=work_dir / "memory" / "logs", token_budget=100)
+
+    context = store.context_for("tell me about topic299")
+    assert estimate_tokens(context) <= 110
+    assert "- fact 299 about topic299" in context
+    assert "topic0 " not in context
+
+    memory.write_text(memory.read_text(encoding="utf-8") + "- newest fact: moved to Berlin\n", encoding="utf-8")
+    _touch_later(memory)
+    assert "moved to Berlin" in store.context_for("where does the user live, Berlin?")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from backend.services.blob_store import BlobStore
+from backend.services.token_budget import EstimateTokenizer
+from backend.tools.output_compression import (
+    ToolOutputCompressionMiddleware,
+    ToolOutputStore,
+    compress_text,
+    create_read_tool_output_tool,
+)
+
+
+def _build_log() -> str:
+    lines = ["$ make test", "collecting..."]
+    lines += [f"test_case_{index} PASSED in 0.01s" for index in range(400)]
+    lines[250] = "test_payment_refund FAILED: AssertionError refund amount mismatch"
+    lines += ["[exit code 1]"]
+    return "\n".join(lines)
+
+
+def _request(name: str, args: dict, question: str) -> ToolCallRequest:
+    return ToolCallRequest(
+        tool_call={"name": name, "args": args, "id": "call-1"},
+        tool=None,
+        state={"messages": [HumanMessage(content=question)]},
+        runtime=None,
+    )
+
+
+def test_compress_text_keeps_head_tail_and_relevant_lines() -> None:
+    text, kept, total = compress_text(_build_log(), "why did the refund test fail?", 60, EstimateTokenizer())
+    lines = text.splitlines()
+    assert lines[0] == "$ make test" and lines[-1] == "[exit code 1]"
+    assert "test_payment_refund FAILED: AssertionError refund amount mismatch" in lines
+    assert any(line.startswith("[... ") and line.endswith(" lines omitted ...]") for line in lines)
+    assert kept < total == 403
+
+
+def test_compress_text_cuts_a_single_oversized_line() -> None:
+    rows = ",".join(f'{{"id":{index},"status":"ok"}}' for index in range(3_000))
+    raw = f'{{"rows":[{rows}],"error":"quota exceeded"}}'
+
+    text, kept, total = compress_text(raw, "why did it fail?", 800, EstimateTokenizer())
+
+    assert (kept, total) == (1, 1)
+    assert text.startswith('{"rows":[{"id":0,')
+    assert text.endswith('"error":"quota exceeded"}')
+    assert "chars omitted ..." in text
+    assert 600 < EstimateTokenizer().count(text) <= 800
+
+
+def test_middleware_compresses_and_full_output_stays_readable(work_dir: Path) -> None:
+    store = ToolOutputStore(BlobStore(work_dir / "blobs"))
+    middleware = ToolOutputCompressionMiddleware(store, budgets={"terminal": 120}, tokenizer=EstimateTokenizer())
+    raw = _build_log()
+    request = _request("terminal", {"command": "make test"}, "why did the refund test fail?")
+
+    result = middleware.wrap_tool_call(request, lambda _: ToolMessage(content=raw, tool_call_id="call-1"))
+    assert result.tool_call_id == "call-1"
+    assert "refund amount mismatch" in result.content
+    footer = result.content.splitlines()[-1]
+    assert footer.startswith("[compressed: kept ")
+    ref = footer.split('ref="')[1].split('"')[0]
+
+    reader = create_read_tool_output_tool(store)
+    page = reader.invoke({"ref": ref, "mode": "grep", "pattern": "FAILED"})
+    assert "251: test_payment_refund FAILED" in page
+    assert reader.invoke({"ref": "../etc/passwd"}).startswith("Error: unknown tool output reference")
+
+    small = ToolMessage(content="ok", tool_call_id="call-2")
+    assert middleware.wrap_tool_call(request, lambda _: small) is small
+
+    async def handler(_: ToolCallRequest) -> ToolMessage:
+        return ToolMessage(content=raw, tool_call_id="call-3")
+
+    assert len(asyncio.run(middleware.awrap_tool_call(request, handler)).content) < len(raw) // 4
+
+
+def test_skill_files_and_unlisted_tools_pass_through(work_dir: Path) -> None:
+    middleware = ToolOutputCompressionMiddleware(
+        ToolOutputStore(BlobStore(work_dir / "blobs")), budgets={"read_file": 10}, tokenizer=EstimateTokenizer()
+    )
+    message = ToolMessage(content="step\n" * 500, tool_call_id="call-1")
+    skill = _request("read_file", {"file_path": "skills/weather/SKILL.md"}, "weather?")
+    assert middleware.wrap_tool_call(skill, lambda _: message) is message
+    other = _request("python_repl", {"code": "print(1)"}, "weather?")
+    assert middleware.wrap_tool_call(other, lambda _: message) is message
+
+
+def test_read_tool_output_stays_registered_without_compression(monkeypatch: pytest.MonkeyPatch) -> None:
+    import backend.app as backend_app
+
+    monkeypatch.setattr(backend_app, "TOOL_OUTPUT_COMPRESSION", False)
+    services = backend_app.AppServices(backend_app.config)
+
+    assert services._agent_middleware() == []
+    assert "read_tool_output" in {tool.name for tool in services.core_tools}
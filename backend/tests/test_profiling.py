@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import app as backend_app
+from backend.services.profiling import ProfileStore
+
+
+def _encode_for(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        json.dumps({"rows": list(range(200))})
+
+
+class _ToolCallingAgent:
+    async def stream_chat(self, message: str, session_id: str) -> AsyncIterator[dict[str, Any]]:
+        yield {"type": "tool_call", "name": "encode", "input": {}}
+        # Tools run in executor threads; the sampler has to see them too.
+        await asyncio.to_thread(_encode_for, 0.15)
+        yield {"type": "final", "content": f"done: {message}"}
+
+
+@pytest.fixture()
+def client(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> TestClient:
+    services = backend_app.AppServices(backend_app.config)
+    services.agent_service = _ToolCallingAgent()
+    services.profile_store = ProfileStore(work_dir / "profiles", max_profiles=2)
+    monkeypatch.setattr(backend_app, "services", services)
+    monkeypatch.setattr(backend_app, "PROFILE_ALLOW_HEADER", True)
+    return TestClient(backend_app.app)
+
+
+def test_chat_is_profiled_only_on_request(
+    client: TestClient, work_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    plain = client.post("/api/chat", json={"message": "hi", "session_id": "p1", "stream": False})
+    assert plain.status_code == 200 and "x-profile-id" not in plain.headers
+    monkeypatch.setattr(backend_app, "PROFILE_ALLOW_HEADER", False)
+    ignored = client.post(
+        "/api/chat", json={"message": "hi", "session_id": "p1", "stream": False}, headers={"X-Profile": "1"}
+    )
+    assert "x-profile-id" not in ignored.headers
+    assert client.get("/api/debug/profiles").json() == {"profiles": []}
+    monkeypatch.setattr(backend_app, "PROFILE_ALLOW_HEADER", True)
+
+    profiled = client.post(
+        "/api/chat", json={"message": "hi", "session_id": "p1", "stream": True}, headers={"X-Profile": "1"}
+    )
+    assert profiled.status_code == 200 and "event: final" in profiled.text
+    profile_id = profiled.headers["x-profile-id"]
+
+    [record] = client.get("/api/debug/profiles").json()["profiles"]
+    assert record["id"] == profile_id and record["session_id"] == "p1" and record["samples"] > 0
+    collapsed = client.get(f"/api/debug/profiles/{profile_id}").text
+    assert any("_encode_for" in line and line.startswith("asyncio_") for line in collapsed.splitlines())
+    assert client.get("/api/debug/profiles/..%2Fsecrets").status_code in {400, 404}
+
+    for _ in range(2):
+        body = {"message": "again", "session_id": "p2", "stream": False}
+        client.post("/api/chat", json=body, headers={"X-Profile": "yes"})
+    assert len(client.get("/api/debug/profiles").json()["profiles"]) == 2
+    assert len(list((work_dir / "profiles").glob("*.collapsed"))) == 2
+
+
+def test_profile_is_saved_when_the_stream_is_cancelled(work_dir: Path) -> None:
+    import anyio
+
+    from backend.services.profiling import profiled
+
+    store = ProfileStore(work_dir / "profiles")
+    profile_id = store.new_id()
+
+    async def events() -> AsyncIterator[dict[str, Any]]:
+        yield {"type": "token", "content": "partial"}
+        await asyncio.sleep(3600)
+
+    async def disconnect() -> None:
+        # anyio cancellation is level-triggered, like Starlette's on client disconnect:
+        # every await in the generator's finally block is cancelled again.
+        with anyio.move_on_after(0.2):
+            async for _ in profiled(events(), store, profile_id, {"path": "/api/chat"}, interval=0.001):
+                pass
+        deadline = time.monotonic() + 5
+        while not store.list() and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+
+    asyncio.run(disconnect())
+    [record] = store.list()
+    assert record["id"] == profile_id and record["samples"] > 0
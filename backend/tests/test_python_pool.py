@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from typing import Iterator
+
+import pytest
+
+from backend.services.python_pool import PythonWorkerPool
+from backend.tools.python_tool import create_python_repl_tool, sanitize_code
+
+
+@pytest.fixture()
+def pool() -> Iterator[PythonWorkerPool]:
+    worker_pool = PythonWorkerPool(
+        workers=2, preload=("math",), cpu_seconds=5, memory_mb=256, timeout=1.0, max_executions=4
+    )
+    yield worker_pool
+    worker_pool.close()
+
+
+def _config(session_id: str) -> dict:
+    return {"configurable": {"session_id": session_id}}
+
+
+def test_sessions_keep_separate_namespaces(pool: PythonWorkerPool) -> None:
+    tool = create_python_repl_tool(pool=pool)
+    assert tool.invoke({"code": "```python\nimport math\nx = 41\n```"}, config=_config("a")) == "(no output)"
+    assert tool.invoke({"code": "x + 1"}, config=_config("a")) == "42"
+    assert tool.invoke({"code": "print(math.pi > 3)"}, config=_config("a")) == "True"
+    assert tool.invoke({"code": "x"}, config=_config("b")) == "NameError: name 'x' is not defined"
+    assert pool._assignments["a"] is not pool._assignments["b"]
+
+
+def test_recycling_carries_picklable_state(pool: PythonWorkerPool) -> None:
+    pool.execute("a", "import math\nitems = [1, 2]\nhandle = open(__import__('os').devnull)")
+    worker = pool._assignments["a"]
+    for _ in range(3):
+        pool.execute("a", "items.append(len(items))")
+
+    assert pool._assignments["a"] is not worker
+    assert not worker.process.is_alive()
+    assert pool.execute("a", "items, math.floor(2.5)").output.strip() == "([1, 2, 2, 3, 4], 2)"
+    assert "NameError" in (pool.execute("a", "handle").error or "")
+
+
+def test_limits_stop_runaway_code_without_losing_the_session(pool: PythonWorkerPool) -> None:
+    pool.execute("a", "kept = 'yes'")
+
+    spin = pool.execute("a", "try:\n    while True: pass\nexcept Exception:\n    pass")
+    assert spin.timed_out and not spin.namespace_reset
+    assert spin.error == "Execution stopped: wall-clock timeout exceeded"
+
+    hog = pool.execute("a", "block = bytearray(512 * 1024 * 1024)")
+    assert hog.error == "MemoryError"
+
+    noisy = pool.execute("a", "for i in range(100000): print(i)")
+    assert noisy.output.endswith("...[truncated]") and len(noisy.output) < 9_000
+
+    assert pool.execute("a", "kept").output.strip() == "'yes'"
+
+
+def test_idle_sessions_expire_and_workers_cap_namespaces() -> None:
+    pool = PythonWorkerPool(workers=1, preload=(), memory_mb=256, timeout=1.0, max_sessions_per_worker=2)
+    try:
+        for session_id in ("a", "b", "c"):
+            pool.execute(session_id, f"name = {session_id!r}")
+        assert set(pool._assignments) == {"b", "c"}
+        assert "NameError" in (pool.execute("a", "name").error or "")
+
+        pool.idle_seconds = 0
+        time.sleep(0.01)
+        pool.execute("d", "1")
+        assert set(pool._assignments) == {"d"}
+        worker = pool._assignments["d"]
+        assert set(worker.request(("export",), 5.0)[1]) == {"d"}
+    finally:
+        pool.close()
+
+
+def test_sanitize_code_strips_markdown_fences() -> None:
+    assert sanitize_code("```python\nprint(1)\n```") == "print(1)"
+    assert sanitize_code("  print(2)  ") == "print(2)"
+    assert sanitize_code("```py\nx = 1\n```\n") == "x = 1"
+    assert sanitize_code("```Python print(3)```") == "print(3)"
+    assert sanitize_code("`len(items)`") == "len(items)"
+    assert sanitize_code("python_version = 3\nprint(python_version)") == "python_version = 3\nprint(python_version)"
+    assert sanitize_code("```\npython_version = 3\n```") == "python_version = 3"
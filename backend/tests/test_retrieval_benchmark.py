@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from backend.benchmarks.retrieval import build_phase, compare_reports, generate_corpus, query_phase
+
+
+def test_small_corpus_end_to_end(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> None:
+    from llama_index.core import Settings
+
+    monkeypatch.setenv("KNOWLEDGE_INGEST_WORKERS", "1")
+    embed_model = Settings._embed_model
+    cases = generate_corpus(work_dir / "corpus", size=40, queries=10)
+    assert len(cases) == 10
+    assert len(list((work_dir / "corpus" / "knowledge").iterdir())) == 40
+
+    build = build_phase(work_dir / "corpus", work_dir / "storage")
+    assert build["chunks"] == 40
+    assert build["failed_files"] == 0
+
+    result = query_phase(work_dir / "corpus", work_dir / "storage", top_k=5)
+    assert set(result["modes"]) == {"vector", "bm25", "hybrid"}
+    assert result["modes"]["bm25"]["recall@5"] == 1.0
+    assert result["modes"]["hybrid"]["p99_ms"] >= result["modes"]["hybrid"]["p50_ms"]
+    assert Settings._embed_model is embed_model
+
+
+def _report(build_seconds: float, p50_ms: float) -> dict:
+    return {
+        "results": [
+            {
+                "size": 10,
+                "build_seconds": build_seconds,
+                "load_seconds": 1.0,
+                "peak_rss_mb": 100.0,
+                "modes": {"bm25": {"p50_ms": p50_ms}},
+            }
+        ]
+    }
+
+
+def test_compare_reports_lists_relative_changes() -> None:
+    lines = compare_reports(_report(1.0, 1.5), _report(2.0, 1.0))
+    assert "10 build_seconds: 2.0000 -> 1.0000 (-50.0%)" in lines
+    assert "10 bm25 p50_ms: 1.0000 -> 1.5000 (+50.0%)" in lines
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from langchain_core.messages.utils import convert_to_messages
+
+from backend.benchmarks.tool_replay import call_signature, count_repeated_calls
+from backend.services.session_service import SessionEntry, SessionService
+
+
+def _tool(name: str, args: dict, output: str | None = None, **extra: str) -> SessionEntry:
+    record: dict = {"name": name, "input": args, **extra}
+    if output is not None:
+        record["output"] = output
+    return SessionEntry(type="tool", content=f"{name} {'result' if output is not None else 'called'}", tool=record)
+
+
+def test_tool_history_rebuilds_calls_and_summarized_results(work_dir: Path) -> None:
+    service = SessionService(sessions_dir=work_dir)
+    service.append(
+        "s1",
+        [
+            SessionEntry(type="user", content="read the plan"),
+            # Legacy entries without ids, two calls in flight before their results.
+            _tool("read_file", {"file_path": "plan.md"}),
+            _tool("terminal", {"command": "wc -l plan.md"}),
+            _tool("read_file", {"file_path": "plan.md"}, "x" * 900),
+            _tool("terminal", {"command": "wc -l plan.md"}, "3 plan.md"),
+            _tool("fetch_url", {"url": "https://example.com"}),
+            SessionEntry(type="assistant", content="beta is due 2026-12-01"),
+        ],
+    )
+
+    assert service.to_chat_messages("s1") == [
+        {"role": "user", "content": "read the plan"},
+        {"role": "assistant", "content": "beta is due 2026-12-01"},
+    ]
+
+    messages = service.to_chat_messages("s1", include_tools=True)
+    assert [message["role"] for message in messages] == ["user", "assistant", "tool", "assistant", "tool", "assistant"]
+    assert messages[1]["tool_calls"] == [{"id": "call_1", "name": "read_file", "args": {"file_path": "plan.md"}}]
+    assert messages[2]["tool_call_id"] == "call_1"
+    assert messages[2]["content"].endswith("[... truncated; full output not kept]")
+    assert len(messages[2]["content"]) < 700
+    assert messages[4] == {"role": "tool", "tool_call_id": "call_2", "content": "3 plan.md"}
+    assert len(convert_to_messages(messages)) == 6
+
+    # The window counts user/assistant turns; the last reply keeps the tool calls made before it.
+    assert service.to_chat_messages("s1", max_messages=2, include_tools=True) == messages
+    assert service.to_chat_messages("s1", max_messages=1, include_tools=True) == messages[1:]
+
+
+def test_tool_heavy_turn_does_not_push_out_earlier_turns(work_dir: Path) -> None:
+    service = SessionService(sessions_dir=work_dir)
+    entries = [SessionEntry(type="user", content="my name is Ada"), SessionEntry(type="assistant", content="hi Ada")]
+    entries.append(SessionEntry(type="user", content="list the files"))
+    for index in range(20):
+        entries.append(_tool("terminal", {"command": f"ls {index}"}, id=f"run-{index}"))
+        entries.append(_tool("terminal", {"command": f"ls {index}"}, "a.txt", id=f"run-{index}"))
+    entries.append(SessionEntry(type="assistant", content="done"))
+    service.append("s1", entries)
+
+    messages = service.to_chat_messages("s1", max_messages=4, include_tools=True)
+    assert messages[0] == {"role": "user", "content": "my name is Ada"}
+    assert len(messages) == 44
+
+
+def test_tool_results_are_stored_as_shared_blobs(work_dir: Path) -> None:
+    service = SessionService(sessions_dir=work_dir)
+    output = "\n".join(f"row {index}" for index in range(200))
+    for session in ("a", "b"):
+        service.append(
+            session,
+            [
+                SessionEntry(type="user", content="dump the table"),
+                _tool("terminal", {"command": "cat table.txt"}, id="run-1"),
+                SessionEntry(type="tool", content="terminal result", tool=service.tool_result("terminal", "run-1", output)),
+                SessionEntry(type="assistant", content="done"),
+            ],
+        )
+
+    saved = service.load("a")[2]["tool"]
+    assert "output" not in saved and saved["output_chars"] == len(output)
+    assert list(service.blob_store.root.glob("??/*.txt")) == [service.blob_store.path_for(saved["output_blob"])]
+
+    messages = service.to_chat_messages("a", include_tools=True)
+    assert messages[1]["tool_calls"][0]["args"] == {"command": "cat table.txt"}
+    assert messages[2]["content"].startswith("row 0\nrow 1")
+    assert f'read_tool_output(ref="out_{saved["output_blob"]}")' in messages[2]["content"]
+    assert service.hydrate(service.load("a"), max_chars=100)[2]["tool"]["output"].endswith("...[truncated]")
+
+    (work_dir / "a.json").unlink()
+    assert service.gc_blobs(min_age_seconds=0).removed == 0
+    (work_dir / "b.json").unlink()
+    orphan = service.blob_store.put("nobody refers to this")
+    assert service.gc_blobs(min_age_seconds=3_600).removed == 0
+    result = service.gc_blobs(min_age_seconds=0)
+    assert result.removed == 2 and result.kept == 0
+    assert service.blob_store.get(orphan) is None
+
+
+def test_count_repeated_calls_across_turns() -> None:
+    read_plan = call_signature("read_file", {"file_path": "plan.md"})
+    grep = call_signature("terminal", {"command": "grep ERROR app.log"})
+    assert count_repeated_calls([[read_plan, read_plan], [read_plan, grep], [grep]]) == 2
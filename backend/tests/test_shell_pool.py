@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from backend.tools.shell_pool import ShellPool
+from backend.tools.terminal_tool import create_terminal_tool
+
+
+def _config(session_id: str) -> dict:
+    return {"configurable": {"session_id": session_id}}
+
+
+def test_session_state_persists_and_is_isolated(work_dir: Path) -> None:
+    (work_dir / "sub").mkdir()
+    pool = ShellPool(root_dir=work_dir)
+    tool = create_terminal_tool(root_dir=work_dir, pool=pool)
+    try:
+        assert tool.invoke({"command": "cd sub && export GREETING=hi"}, config=_config("a")) == "(no output)"
+        assert tool.invoke({"command": "pwd; echo $GREETING"}, config=_config("a")) == f"{work_dir / 'sub'}\nhi"
+        assert tool.invoke({"command": "pwd; echo ${GREETING:-unset}"}, config=_config("b")) == f"{work_dir}\nunset"
+        assert tool.invoke({"command": "false"}, config=_config("a")) == "[exit code 1]"
+        assert tool.invoke({"command": "rm -rf /"}, config=_config("a")) == "Blocked dangerous command pattern."
+        assert pool.size == 2
+    finally:
+        pool.close()
+
+
+def test_runaway_output_and_timeouts_are_bounded(work_dir: Path) -> None:
+    pool = ShellPool(root_dir=work_dir, timeout=0.5, max_output=1_000, drain_limit=100_000)
+    try:
+        started = time.monotonic()
+        flood = pool.run("s", "yes")
+        assert flood.truncated and flood.restarted
+        assert len(flood.output) == 1_000
+        assert time.monotonic() - started < 5
+
+        pool.run("s", "cd /")
+        slow = pool.run("s", "sleep 5")
+        assert slow.timed_out and slow.exit_code is None
+        assert pool.run("s", "pwd").output.strip() == str(work_dir)
+
+        large = pool.run("s", "head -c 50000 /dev/zero | tr '\\0' x; echo; echo done")
+        assert large.exit_code == 0 and large.truncated and not large.restarted
+    finally:
+        pool.close()
+
+
+def test_idle_and_capacity_eviction(work_dir: Path) -> None:
+    pool = ShellPool(root_dir=work_dir, max_workers=2, idle_seconds=60)
+    try:
+        for session_id in ("a", "b", "c"):
+            pool.run(session_id, "true")
+        assert pool.size == 2
+
+        pool.idle_seconds = 0
+        time.sleep(0.01)
+        assert pool.evict_idle() == 2
+        assert pool.size == 0
+    finally:
+        pool.close()
+
+
+def test_idle_workers_are_reaped_without_further_runs(work_dir: Path) -> None:
+    pool = ShellPool(root_dir=work_dir, idle_seconds=0.1)
+    try:
+        pool.run("finished", "true")
+        assert pool.size == 1
+        deadline = time.monotonic() + 5
+        while pool.size and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.size == 0
+    finally:
+        pool.close()
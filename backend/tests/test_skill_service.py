@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from backend.services import skill_service as skill_module
+from backend.services.skill_service import SkillService
+
+
+def _write_skill(root: Path, name: str, description: str) -> Path:
+    path = root / "skills" / name / "SKILL.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"---\nname: {name}\ndescription: {description}\n---\nbody\n", encoding="utf-8")
+    return path
+
+
+def _service(root: Path) -> SkillService:
+    return SkillService(skills_dir=root / "skills", workspace_dir=root / "workspace", root_dir=root)
+
+
+def test_refresh_reparses_only_changed_skills_and_skips_identical_writes(
+    monkeypatch: pytest.MonkeyPatch, work_dir: Path
+) -> None:
+    for index in range(5):
+        _write_skill(work_dir, f"skill-{index}", f"does thing {index}")
+    service = _service(work_dir)
+    parsed: list[str] = []
+    original = skill_module._parse_frontmatter
+    monkeypatch.setattr(skill_module, "_parse_frontmatter", lambda text: parsed.append(text) or original(text))
+
+    first = service.refresh_snapshot()
+    assert len(parsed) == 5 and first.count("<skill>") == 5
+    snapshot_mtime = service.snapshot_path.stat().st_mtime_ns
+
+    parsed.clear()
+    assert service.refresh_snapshot() == first
+    assert parsed == []
+    assert service.snapshot_path.stat().st_mtime_ns == snapshot_mtime
+
+    changed = _write_skill(work_dir, "skill-2", "does something else")
+    stat_result = changed.stat()
+    os.utime(changed, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+    (work_dir / "skills" / "skill-4" / "SKILL.md").unlink()
+    updated = service.refresh_snapshot()
+    assert len(parsed) == 1
+    assert "does something else" in updated and "skill-4" not in updated
+    assert service.snapshot_path.read_text(encoding="utf-8") == updated
+
+    # A fresh service (new process) finds an identical snapshot on disk and leaves it alone.
+    mtime = service.snapshot_path.stat().st_mtime_ns
+    _service(work_dir).refresh_snapshot()
+    assert service.snapshot_path.stat().st_mtime_ns == mtime
+
+
+def test_watcher_skips_scans_until_skills_change(work_dir: Path) -> None:
+    pytest.importorskip("watchfiles")
+    _write_skill(work_dir, "alpha", "first")
+    service = _service(work_dir)
+    assert service.start_watching()
+    try:
+        time.sleep(0.3)
+        service.refresh_snapshot()
+        scans: list[int] = []
+        original_scan = service.scan
+        service.scan = lambda: scans.append(1) or original_scan()  # type: ignore[method-assign]
+        service.refresh_snapshot()
+        assert scans == []
+
+        _write_skill(work_dir, "beta", "second")
+        deadline = time.monotonic() + 5
+        while "beta" not in service.refresh_snapshot() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert "beta" in service.refresh_snapshot()
+        assert scans
+    finally:
+        service.stop_watching()
+
+
+def test_snapshot_for_ranks_skills_and_keeps_always_include(work_dir: Path) -> None:
+    topics = ["weather forecast", "pdf extraction", "git history", "image resize", "stock quotes", "calendar events"]
+    for topic in topics:
+        _write_skill(work_dir, topic.replace(" ", "-"), f"Helps with {topic}")
+    service = SkillService(
+        skills_dir=work_dir / "skills",
+        workspace_dir=work_dir / "workspace",
+        root_dir=work_dir,
+        top_k=2,
+        always_include=["calendar-events"],
+    )
+
+    selected = service.snapshot_for("what's the weather forecast for tomorrow?")
+    assert selected.startswith('<available_skills shown="3" total="6">')
+    assert "<name>calendar-events</name>" in selected and "<name>weather-forecast</name>" in selected
+    # The one slot BM25 could not fill goes to the first unranked skill in library order.
+    assert "<name>git-history</name>" in selected and "pdf-extraction" not in selected
+
+    unmatched = service.snapshot_for("\u660e\u5929\u5929\u6c14\u600e\u4e48\u6837")
+    assert unmatched.startswith('<available_skills shown="3" total="6">')
+    assert "<name>git-history</name>" in unmatched and "<name>image-resize</name>" in unmatched
+    # The on-disk snapshot still lists every skill.
+    assert service.snapshot_path.read_text(encoding="utf-8").count("<skill>") == 6
+
+    _write_skill(work_dir, "pdf-extraction", "Reads invoices and weather reports")
+    path = work_dir / "skills" / "pdf-extraction" / "SKILL.md"
+    stat_result = path.stat()
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+    assert "<name>pdf-extraction</name>" in service.snapshot_for("summarize these invoices")
+
+    small = _service(work_dir)
+    assert small.snapshot_for("anything") == small.refresh_snapshot()
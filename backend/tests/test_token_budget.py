@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from backend.services.prompt_service import PromptService
+from backend.services.token_budget import EstimateTokenizer, get_tokenizer, prompt_budget_for, tiktoken_cached
+
+
+def test_estimator_counts_cjk_per_character() -> None:
+    tokenizer = EstimateTokenizer()
+    assert tokenizer.count("你好世界") == 4
+    assert tokenizer.count("abcdefgh") == 2
+    assert tokenizer.count(tokenizer.truncate("你好世界abcdefgh", 5)) == 5
+    assert get_tokenizer("estimate").name == "estimate"
+    assert get_tokenizer("hf:/missing/tokenizer.json").name == "estimate"
+
+
+def test_auto_tokenizer_never_downloads(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> None:
+    import tiktoken.load
+
+    def no_network(blobpath: str) -> bytes:
+        raise AssertionError(f"unexpected download of {blobpath}")
+
+    monkeypatch.setattr(tiktoken.load, "read_file", no_network)
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(work_dir / "tiktoken"))
+    get_tokenizer.cache_clear()
+    try:
+        assert not tiktoken_cached("cl100k_base")
+        assert get_tokenizer("auto").name == "estimate"
+    finally:
+        get_tokenizer.cache_clear()
+
+
+def test_prompt_budget_uses_model_window_and_override(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PROMPT_TOKEN_BUDGET", raising=False)
+    monkeypatch.setenv("PROMPT_RESERVE_TOKENS", "4000")
+    assert prompt_budget_for("deepseek-chat") == 60_000
+    assert prompt_budget_for("some-local-model") == 28_000
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "5000")
+    assert prompt_budget_for("deepseek-chat") == 5_000
+
+
+def test_plan_funds_sections_by_priority_and_keeps_recent_history(work_dir: Path) -> None:
+    workspace = work_dir / "workspace"
+    workspace.mkdir()
+    (workspace / "SOUL.md").write_text("灵魂" * 200, encoding="utf-8")
+    (workspace / "AGENTS.md").write_text("protocol " * 400, encoding="utf-8")
+    service = PromptService(workspace_dir=workspace, memory_file=work_dir / "MEMORY.md", tokenizer=EstimateTokenizer())
+    history = [{"role": "user", "content": f"turn {index} " + "x" * 400} for index in range(20)]
+
+    plan = service.plan(message="hello", history=history, memory="记忆" * 100, budget=1_200)
+    sections = {item.name: item for item in plan.allocations}
+
+    assert plan.used <= 1_200
+    assert not sections["SOUL.md"].truncated and sections["SOUL.md"].allocated == 400
+    assert sections["AGENTS.md"].requested == 900 and sections["AGENTS.md"].truncated
+    assert plan.system_prompt.count("...[truncated]") == 1
+    assert sections["MEMORY.md"].allocated == 0 and sections["history"].allocated == 0
+    assert plan.history == []
+
+    roomy = service.plan(message="hello", history=history, budget=2_500)
+    assert 0 < len(roomy.history) < len(history)
+    assert roomy.history[-1] is history[-1]
+    event = roomy.to_event()
+    assert event["type"] == "debug" and event["data"]["sections"][0]["name"] == "message"
+
+
+def test_fit_history_never_starts_with_an_orphan_tool_result() -> None:
+    from backend.services.token_budget import TokenBudget
+
+    history = [
+        {"role": "assistant", "content": "", "tool_calls": [{"id": "c1", "name": "read_file", "args": {"p": "x" * 200}}]},
+        {"role": "tool", "tool_call_id": "c1", "content": "result"},
+        {"role": "assistant", "content": "done"},
+    ]
+    budget = TokenBudget(30, EstimateTokenizer())
+    assert budget.fit_history(history, priority=4) == history[2:]
+    assert budget.allocations[0].allocated == EstimateTokenizer().count("done") + 4
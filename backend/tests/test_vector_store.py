@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from backend.services.vector_store import MmapVectorStore, migrate_simple_vector_store
+
+
+def _nodes(count: int, dim: int = 16, seed: int = 7) -> list[TextNode]:
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(id_=f"node-{idx}", text=f"chunk {idx}", embedding=rng.normal(size=dim).tolist())
+        for idx in range(count)
+    ]
+
+
+def _query(store: MmapVectorStore, embedding: list[float], top_k: int = 3) -> list[str]:
+    result = store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k))
+    return list(result.ids or [])
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_persist_reload_and_query(work_dir: Path, dtype: str) -> None:
+    nodes = _nodes(50)
+    store = MmapVectorStore(persist_dir=work_dir, dtype=dtype)
+    store.add(nodes)
+    assert _query(store, nodes[10].embedding)[0] == "node-10"
+    store.persist()
+
+    reloaded = MmapVectorStore.from_persist_dir(work_dir)
+    assert reloaded.dtype == dtype
+    assert reloaded.node_count == 50
+    assert _query(reloaded, nodes[42].embedding)[0] == "node-42"
+
+
+def test_delete_then_compact_and_append(work_dir: Path) -> None:
+    nodes = _nodes(20)
+    store = MmapVectorStore(persist_dir=work_dir)
+    store.add(nodes)
+    store.persist()
+
+    store.delete_nodes(["node-3"])
+    assert "node-3" not in _query(store, nodes[3].embedding, top_k=20)
+    store.persist()
+
+    extra = _nodes(5, seed=11)
+    for idx, node in enumerate(extra):
+        node.id_ = f"extra-{idx}"
+    store.add(extra)
+    store.persist()
+
+    reloaded = MmapVectorStore.from_persist_dir(work_dir)
+    assert reloaded.node_count == 24
+    assert _query(reloaded, extra[2].embedding)[0] == "extra-2"
+    assert _query(reloaded, nodes[3].embedding, top_k=24).count("node-3") == 0
+
+
+def test_migrate_from_simple_json_store(work_dir: Path) -> None:
+    nodes = _nodes(12)
+    simple = SimpleVectorStore()
+    simple.add(nodes)
+    simple.persist(persist_path=str(work_dir / "default__vector_store.json"))
+
+    store = migrate_simple_vector_store(work_dir, dtype="int8")
+
+    meta = json.loads((work_dir / "mmap_vectors" / "meta.json").read_text(encoding="utf-8"))
+    assert meta["count"] == 12
+    assert meta["dtype"] == "int8"
+    assert _query(store, nodes[5].embedding)[0] == "node-5"
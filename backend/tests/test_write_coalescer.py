@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from backend.services.file_service import FileService, WriteConflictError
+from backend.services.write_coalescer import WriteCoalescer
+
+
+def test_burst_of_saves_becomes_one_trailing_write(monkeypatch: pytest.MonkeyPatch, work_dir: Path) -> None:
+    service = FileService(root_dir=work_dir)
+    writes: list[str] = []
+    original = service.write_text
+
+    def counting_write(relative_path: str, content: str, base_etag: str | None = None) -> str:
+        writes.append(content)
+        return original(relative_path, content, base_etag)
+
+    monkeypatch.setattr(service, "write_text", counting_write)
+    coalescer = WriteCoalescer(service, window_seconds=0.2)
+
+    async def burst() -> list[str]:
+        first = await coalescer.write_text("memory/MEMORY.md", "draft 0")
+        rest = [asyncio.create_task(coalescer.write_text("memory/MEMORY.md", f"draft {i}")) for i in range(1, 6)]
+        return [first, *await asyncio.gather(*rest)]
+
+    etags = asyncio.run(burst())
+
+    assert writes == ["draft 0", "draft 5"]
+    assert len(set(etags[1:])) == 1 and etags[1] != etags[0]
+    assert (work_dir / "memory" / "MEMORY.md").read_text(encoding="utf-8") == "draft 5"
+
+
+def test_identical_content_does_not_touch_the_file(work_dir: Path) -> None:
+    service = FileService(root_dir=work_dir)
+    etag = service.write_text("memory/MEMORY.md", "same")
+    mtime_ns = (work_dir / "memory" / "MEMORY.md").stat().st_mtime_ns
+
+    assert service.write_text("memory/MEMORY.md", "same", base_etag=etag) == etag
+    assert (work_dir / "memory" / "MEMORY.md").stat().st_mtime_ns == mtime_ns
+    with pytest.raises(WriteConflictError):
+        service.write_text("memory/MEMORY.md", "other", base_etag='"0-0"')
+
+
+def test_write_locks_are_released_after_each_write(work_dir: Path) -> None:
+    service = FileService(root_dir=work_dir)
+    for index in range(50):
+        service.write_text(f"workspace/note-{index}.md", str(index))
+
+    assert len(service._write_locks) == 0
+    lock = service._write_lock(work_dir / "workspace" / "note-0.md")
+    assert service._write_lock(work_dir / "workspace" / "note-0.md") is lock
+    assert len(service._write_locks) == 1
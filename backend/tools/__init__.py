@@ -1,5 +1,19 @@
 """Core tools registry."""
 
-from backend.tools.registry import build_core_tools
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from backend.tools.registry import build_core_tools
 
 __all__ = ["build_core_tools"]
+
+
+def __getattr__(name: str) -> Any:
+    # Tool modules pull in langchain, requests and numpy; load them on first use.
+    if name == "build_core_tools":
+        from backend.tools.registry import build_core_tools
+
+        return build_core_tools
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "mini-openclaw-fetch/0.1"
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    content_type: str
+    text: str
+    from_cache: bool = False
+    revalidated: bool = False
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+
+
+def _parse_cache_control(value: str) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _charset(content_type: str) -> str:
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"')
+    return "utf-8"
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    try:
+        return body.decode(_charset(content_type), errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _parse_http_date(value: str) -> float | None:
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed.timestamp() if parsed.tzinfo is not None else None
+
+
+class HttpCache:
+    """On-disk response cache keyed by URL, honoring validators and Cache-Control.
+
+    Only complete bodies are stored. Entries past ``max_total_bytes`` are evicted
+    least recently used first; file mtimes carry the order across restarts.
+    """
+
+    def __init__(self, cache_dir: Path, max_total_bytes: int = 64 * 1024 * 1024) -> None:
+        self.cache_dir = cache_dir
+        self.max_total_bytes = max_total_bytes
+        # Entry key -> size in bytes, least recently used first; read from disk on first use.
+        self._entries: OrderedDict[str, int] | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths_for_key(self, key: str) -> tuple[Path, Path]:
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        return self._paths_for_key(self._key(url))
+
+    def _index_locked(self) -> OrderedDict[str, int]:
+        if self._entries is None:
+            found: list[tuple[int, str, int]] = []
+            for meta_path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = meta_path.stat()
+                    size = stat.st_size + meta_path.with_suffix(".body").stat().st_size
+                except OSError:
+                    continue
+                found.append((stat.st_mtime_ns, meta_path.stem, size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+        return self._entries
+
+    def load(self, url: str) -> tuple[dict[str, Any], bytes] | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        # Entries written before truncated bodies stopped being stored are misses.
+        if meta.get("url") != url or meta.get("truncated"):
+            return None
+        with self._lock:
+            entries = self._index_locked()
+            if meta_path.stem in entries:
+                entries.move_to_end(meta_path.stem)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def remove(self, url: str) -> None:
+        key = self._key(url)
+        with self._lock:
+            self._index_locked().pop(key, None)
+        for path in self._paths_for_key(key):
+            path.unlink(missing_ok=True)
+
+    def store(self, url: str, headers: Any, body: bytes, truncated: bool) -> None:
+        directives = _parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in directives or "private" in directives:
+            return
+        if truncated:
+            # Replaying a cut-off body as the page would hide the truncation; the
+            # older entry is stale too, since the server sent a new 200.
+            self.remove(url)
+            return
+
+        expires_at: float | None = None
+        max_age = directives.get("s-maxage") or directives.get("max-age")
+        if max_age is not None and max_age.isdigit():
+            expires_at = time.time() + int(max_age)
+        elif headers.get("Expires"):
+            expires_at = _parse_http_date(headers["Expires"])
+
+        meta = {
+            "url": url,
+            "content_type": headers.get("Content-Type", ""),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "expires_at": expires_at,
+            "no_cache": "no-cache" in directives,
+            "stored_at": time.time(),
+        }
+        if not (meta["etag"] or meta["last_modified"] or expires_at):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        body_tmp = body_path.with_name(body_path.name + suffix)
+        meta_tmp = meta_path.with_name(meta_path.name + suffix)
+        body_tmp.write_bytes(body)
+        meta_tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(body_tmp, body_path)
+        os.replace(meta_tmp, meta_path)
+        self._track(meta_path.stem, len(body) + meta_path.stat().st_size)
+
+    def _track(self, key: str, size: int) -> None:
+        evicted: list[str] = []
+        with self._lock:
+            entries = self._index_locked()
+            entries[key] = size
+            entries.move_to_end(key)
+            total = sum(entries.values())
+            while total > self.max_total_bytes and len(entries) > 1:
+                old_key, old_size = entries.popitem(last=False)
+                total -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            for path in self._paths_for_key(old_key):
+                path.unlink(missing_ok=True)
+
+    def refresh(self, url: str, meta: dict[str, Any], headers: Any, body: bytes) -> None:
+        # A 304 may carry updated freshness headers; the stored body is reused.
+        merged = CaseInsensitiveDict(
+            {
+                "Content-Type": meta.get("content_type", ""),
+                "ETag": headers.get("ETag") or meta.get("etag") or "",
+                "Last-Modified": headers.get("Last-Modified") or meta.get("last_modified") or "",
+                "Cache-Control": headers.get("Cache-Control", ""),
+                "Expires": headers.get("Expires", ""),
+            }
+        )
+        self.store(url, merged, body, truncated=False)
+
+
+class FetchEngine:
+    """Pooled HTTP client that reads at most ``max_bytes`` and revalidates cached pages."""
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 15.0,
+        max_bytes: int = 1_000_000,
+        pool_size: int = 16,
+        user_agent: str = DEFAULT_USER_AGENT,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.cache = HttpCache(cache_dir, max_total_bytes=cache_max_bytes) if cache_dir is not None else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = user_agent
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _read_limited(self, response: requests.Response) -> tuple[bytes, bool]:
+        chunks: list[bytes] = []
+        received = 0
+        truncated = False
+        for chunk in response.iter_content(chunk_size=16_384):
+            if not chunk:
+                continue
+            remaining = self.max_bytes - received
+            if len(chunk) >= remaining:
+                chunks.append(chunk[:remaining])
+                received += remaining
+                truncated = len(chunk) > remaining or self._has_more(response)
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+        return b"".join(chunks), truncated
+
+    def _has_more(self, response: requests.Response) -> bool:
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit():
+            return int(declared) > self.max_bytes
+        return True
+
+    def fetch(self, url: str) -> FetchResult:
+        started = time.perf_counter()
+        cached = self.cache.load(url) if self.cache is not None else None
+        request_headers: dict[str, str] = {}
+        if cached is not None:
+            meta, body = cached
+            fresh = meta.get("expires_at") is not None and time.time() < float(meta["expires_at"])
+            if fresh and not meta.get("no_cache"):
+                return FetchResult(
+                    url=url,
+                    status=200,
+                    content_type=meta.get("content_type", ""),
+                    text=_decode(body, meta.get("content_type", "")),
+                    from_cache=True,
+                    elapsed_ms=(time.perf_counter() - started) * 1000.0,
+                )
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self.session.get(url, headers=request_headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached is not None:
+                meta, body = cached
+                self.cache.refresh(url, meta, response.headers, body)
+                return FetchResult(
+                    url=url,
+                    status=200,
+                    content_type=meta.get("content_type", ""),
+                    text=_decode(body, meta.get("content_type", "")),
+                    from_cache=True,
+                    revalidated=True,
+                    elapsed_ms=(time.perf_counter() - started) * 1000.0,
+                )
+
+            body, truncated = self._read_limited(response)
+            content_type = response.headers.get("Content-Type", "")
+            if self.cache is not None and response.status_code == 200:
+                try:
+                    self.cache.store(url, response.headers, body, truncated)
+                except OSError:
+                    logger.warning("Failed to cache response for %s", url, exc_info=True)
+            return FetchResult(
+                url=url,
+                status=response.status_code,
+                content_type=content_type,
+                text=_decode(body, content_type),
+                truncated=truncated,
+                elapsed_ms=(time.perf_counter() - started) * 1000.0,
+            )
@@ -1,34 +1,37 @@
 from __future__ import annotations
 
-from bs4 import BeautifulSoup
-from html2text import HTML2Text
-from langchain_community.tools.requests.tool import RequestsGetTool
-from langchain_community.utilities.requests import TextRequestsWrapper
-from langchain_core.tools import BaseTool, tool
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+from langchain_core.tools import BaseTool, StructuredTool, tool
 from urllib.parse import urlparse
 
+from backend.tools.fetch_engine import FetchEngine
+from backend.tools.html_extract import html_to_markdown
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = "...[truncated]"
+
 
 class FetchCleaner:
-    def __init__(self) -> None:
-        self.get_tool = RequestsGetTool(
-            requests_wrapper=TextRequestsWrapper(),
-            allow_dangerous_requests=True,
-        )
-        self.converter = HTML2Text()
-        self.converter.ignore_links = False
-        self.converter.ignore_images = True
-        self.converter.body_width = 0
+    def __init__(self, max_chars: int = 6_000) -> None:
+        self.max_chars = max_chars
 
     def clean(self, raw: str) -> str:
         text = raw.strip()
-        if "<html" in text.lower() or "<body" in text.lower():
-            soup = BeautifulSoup(text, "html.parser")
-            extracted = soup.get_text("\n")
-            markdown = self.converter.handle(text)
-            text = markdown.strip() if len(markdown.strip()) >= len(extracted.strip()) else extracted.strip()
-
-        if len(text) > 6_000:
-            text = f"{text[:5990]}...[truncated]"
+        budget = self.max_chars - len(TRUNCATION_MARKER)
+        lowered = text.lower()
+        if "<html" in lowered or "<body" in lowered:
+            markdown, truncated = html_to_markdown(text, budget)
+            return f"{markdown}{TRUNCATION_MARKER}" if truncated else markdown
+
+        if len(text) > self.max_chars:
+            text = f"{text[:budget]}{TRUNCATION_MARKER}"
         return text
 
 
@@ -42,17 +45,95 @@ def _is_blocked_target(url: str) -> bool:
     return host in blocked_hosts
 
 
-def create_fetch_url_tool() -> BaseTool:
+def create_fetch_engine(cache_dir: Path | None = None) -> FetchEngine:
+    return FetchEngine(
+        cache_dir=cache_dir,
+        connect_timeout=float(os.getenv("FETCH_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("FETCH_READ_TIMEOUT", "15")),
+        max_bytes=int(os.getenv("FETCH_MAX_BYTES", "1000000")),
+        cache_max_bytes=int(os.getenv("FETCH_CACHE_MAX_MB", "64")) * 1024 * 1024,
+    )
+
+
+def _fetch_and_clean(engine: FetchEngine, url: str, cleaner: FetchCleaner) -> str:
+    target = url.strip()
+    if not (target.startswith("http://") or target.startswith("https://")):
+        return "Only http(s) URLs are allowed."
+    if _is_blocked_target(target):
+        return "Blocked URL target."
+
+    try:
+        result = engine.fetch(target)
+    except requests.RequestException as exc:
+        logger.warning("fetch_url failed for %s: %s", target, exc)
+        return f"Fetch failed: {type(exc).__name__}: {exc}"
+
+    text = cleaner.clean(result.text)
+    if result.status >= 400:
+        return f"HTTP {result.status}\n{text}"
+    return text
+
+
+async def fetch_many(
+    engine: FetchEngine,
+    urls: list[str],
+    max_chars: int = 12_000,
+    concurrency: int = 8,
+    per_host: int = 2,
+) -> list[tuple[str, str]]:
+    """Fetch ``urls`` concurrently and split ``max_chars`` evenly across them."""
+    targets = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+    if not targets:
+        return []
+
+    cleaner = FetchCleaner(max_chars=max(500, max_chars // len(targets)))
+    overall = asyncio.Semaphore(concurrency)
+    hosts: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def fetch_one(target: str) -> tuple[str, str]:
+        host = (urlparse(target).hostname or "").lower()
+        async with hosts[host], overall:
+            text = await asyncio.to_thread(_fetch_and_clean, engine, target, cleaner)
+        return target, text
+
+    return list(await asyncio.gather(*(fetch_one(target) for target in targets)))
+
+
+def create_fetch_url_tool(cache_dir: Path | None = None, engine: FetchEngine | None = None) -> BaseTool:
+    engine = engine or create_fetch_engine(cache_dir)
+
     @tool("fetch_url")
     def fetch_url(url: str) -> str:
         """Fetch a URL and return cleaned markdown/plain text."""
-        target = url.strip()
-        if not (target.startswith("http://") or target.startswith("https://")):
-            return "Only http(s) URLs are allowed."
-        if _is_blocked_target(target):
-            return "Blocked URL target."
-
-        raw = str(fetch_cleaner.get_tool.invoke({"url": target}))
-        return fetch_cleaner.clean(raw)
+        return _fetch_and_clean(engine, url, fetch_cleaner)
 
     return fetch_url
+
+
+def create_fetch_urls_tool(cache_dir: Path | None = None, engine: FetchEngine | None = None) -> BaseTool:
+    engine = engine or create_fetch_engine(cache_dir)
+    max_urls = int(os.getenv("FETCH_URLS_MAX", "10"))
+    max_chars = int(os.getenv("FETCH_URLS_MAX_CHARS", "12000"))
+    concurrency = int(os.getenv("FETCH_URLS_CONCURRENCY", "8"))
+    per_host = int(os.getenv("FETCH_URLS_PER_HOST", "2"))
+
+    async def _run(urls: list[str]) -> str:
+        if len(urls) > max_urls:
+            return f"Too many URLs: {len(urls)} given, at most {max_urls} per call."
+        results = await fetch_many(engine, urls, max_chars=max_chars, concurrency=concurrency, per_host=per_host)
+        if not results:
+            return "No URLs given."
+        return "\n\n".join(f"## [{index}] {url}\n{text}" for index, (url, text) in enumerate(results, start=1))
+
+    def fetch_urls(urls: list[str]) -> str:
+        return asyncio.run(_run(urls))
+
+    return StructuredTool.from_function(
+        func=fetch_urls,
+        coroutine=_run,
+        name="fetch_urls",
+        description=(
+            "Fetch several URLs concurrently and return cleaned markdown/plain text for each. "
+            "Prefer this over repeated fetch_url calls when you already know the URLs."
+        ),
+    )
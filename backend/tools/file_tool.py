@@ -1,10 +1,238 @@
 from __future__ import annotations
 
+import bisect
+import mmap
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
 
-from langchain_community.tools.file_management import ReadFileTool
-from langchain_core.tools import BaseTool
+import numpy as np
+from langchain_core.tools import BaseTool, tool
+
+from backend.services.file_service import FileService, PathSecurityError
+
+READ_MODES = ("lines", "bytes", "grep")
+DEFAULT_LINE_LIMIT = 200
+DEFAULT_MATCH_LIMIT = 50
+MAX_OUTPUT_CHARS = 8_000
+MAX_MATCH_LINE_CHARS = 300
+_LINE_STRIDE = 1_024
+_SCAN_CHUNK = 64 * 1024 * 1024
+
+
+@dataclass
+class _LineIndex:
+    size: int
+    mtime_ns: int
+    line_count: int
+    # Byte offset where every ``_LINE_STRIDE``-th line starts.
+    checkpoints: list[int]
+
+
+def _build_line_index(data: mmap.mmap, size: int, mtime_ns: int) -> _LineIndex:
+    checkpoints = [0]
+    newlines = 0
+    for base in range(0, size, _SCAN_CHUNK):
+        chunk = np.frombuffer(data, dtype=np.uint8, count=min(_SCAN_CHUNK, size - base), offset=base)
+        positions = np.flatnonzero(chunk == 10)
+        # Line ``newlines + i + 1`` starts right after the i-th newline in this chunk.
+        first = -(-(newlines + 1) // _LINE_STRIDE) * _LINE_STRIDE
+        picked = positions[np.arange(first - newlines - 1, len(positions), _LINE_STRIDE)]
+        checkpoints.extend((picked + base + 1).tolist())
+        newlines += len(positions)
+        # Release the buffer exports before the mmap is closed.
+        del chunk, positions, picked
+    trailing = 1 if size and data[size - 1] != 10 else 0
+    return _LineIndex(size=size, mtime_ns=mtime_ns, line_count=newlines + trailing, checkpoints=checkpoints)
+
+
+def _scan_newlines(data: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    for base in range(start, end, _SCAN_CHUNK):
+        chunk = np.frombuffer(data, dtype=np.uint8, count=min(_SCAN_CHUNK, end - base), offset=base)
+        count += int(np.count_nonzero(chunk == 10))
+        del chunk
+    return count
+
+
+def _count_newlines(data: mmap.mmap, index: _LineIndex, start: int, end: int) -> int:
+    """Newlines in ``data[start:end]``; whole checkpoint strides are counted without reading them."""
+    first = bisect.bisect_left(index.checkpoints, start)
+    last = bisect.bisect_right(index.checkpoints, end) - 1
+    if first >= last:
+        return _scan_newlines(data, start, end)
+    strides = (last - first) * _LINE_STRIDE
+    return _scan_newlines(data, start, index.checkpoints[first]) + strides + _scan_newlines(
+        data, index.checkpoints[last], end
+    )
+
+
+class FileReader:
+    """Paged, ranged and grep-style reads that never load a whole large file."""
+
+    def __init__(self, root_dir: Path, max_chars: int = MAX_OUTPUT_CHARS, cache_size: int = 32) -> None:
+        self.file_service = FileService(root_dir=root_dir)
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._indexes: OrderedDict[Path, _LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _resolve(self, file_path: str) -> Path:
+        candidate = Path(file_path.strip())
+        if candidate.is_absolute():
+            try:
+                candidate = candidate.resolve().relative_to(self.file_service.root_dir)
+            except ValueError as exc:
+                raise PathSecurityError("path escapes backend root") from exc
+        return self.file_service.resolve_safe_path(candidate.as_posix())
+
+    def _line_index(self, path: Path, data: mmap.mmap, size: int, mtime_ns: int) -> _LineIndex:
+        with self._lock:
+            cached = self._indexes.get(path)
+            if cached is not None and cached.size == size and cached.mtime_ns == mtime_ns:
+                self._indexes.move_to_end(path)
+                return cached
+        index = _build_line_index(data, size, mtime_ns)
+        with self._lock:
+            self._indexes[path] = index
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _line_start(data: mmap.mmap, index: _LineIndex, line: int) -> int:
+        if line >= index.line_count:
+            return index.size
+        position = index.checkpoints[line // _LINE_STRIDE]
+        for _ in range(line % _LINE_STRIDE):
+            position = data.find(b"\n", position) + 1
+        return position
+
+    def _header(self, file_path: str, index: _LineIndex, detail: str) -> str:
+        return f"file: {file_path} | size: {index.size} bytes | lines: {index.line_count}\n{detail}\n---\n"
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 0, mode: str = "lines", pattern: str = "") -> str:
+        if mode not in READ_MODES:
+            return f"Error: mode must be one of {', '.join(READ_MODES)}"
+        if mode == "grep" and not pattern:
+            return "Error: grep mode needs a pattern"
+        try:
+            path = self._resolve(file_path)
+        except PathSecurityError:
+            return f"Error: Access denied to file_path: {file_path}. Permission granted exclusively to the backend root."
+        if not path.is_file():
+            return f"Error: no such file or directory: {file_path}"
+
+        offset = max(0, offset)
+        stat = path.stat()
+        if stat.st_size == 0:
+            return f"file: {file_path} | size: 0 bytes | lines: 0\n(empty file)"
+
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = self._line_index(path, data, stat.st_size, stat.st_mtime_ns)
+            if mode == "bytes":
+                return self._read_bytes(file_path, data, index, offset, limit)
+            if mode == "grep":
+                return self._grep(file_path, data, index, pattern, offset, limit)
+            return self._read_lines(file_path, data, index, offset, limit)
+
+    def _read_lines(self, file_path: str, data: mmap.mmap, index: _LineIndex, offset: int, limit: int) -> str:
+        limit = limit or DEFAULT_LINE_LIMIT
+        position = self._line_start(data, index, offset)
+        lines: list[str] = []
+        used = 0
+        cut = False
+        while len(lines) < limit and position < index.size:
+            end = data.find(b"\n", position)
+            end = index.size if end < 0 else end + 1
+            line = data[position:end].decode("utf-8", errors="replace")
+            if used + len(line) > self.max_chars:
+                if not lines:
+                    lines.append(line[: self.max_chars])
+                    cut = True
+                break
+            lines.append(line)
+            used += len(line)
+            position = end
+
+        if not lines:
+            return self._header(file_path, index, f"offset {offset} is past the last line")
+        next_offset = offset + len(lines)
+        detail = f"showing lines {offset + 1}-{next_offset} of {index.line_count}"
+        if cut:
+            detail += "; the line is longer than the output budget, use mode=bytes to page through it"
+        elif next_offset < index.line_count:
+            detail += f"; next offset: {next_offset}"
+        return self._header(file_path, index, detail) + "".join(lines)
+
+    def _read_bytes(self, file_path: str, data: mmap.mmap, index: _LineIndex, offset: int, limit: int) -> str:
+        limit = min(limit or self.max_chars, self.max_chars)
+        if offset >= index.size:
+            return self._header(file_path, index, f"offset {offset} is past the end of the file")
+        end = min(index.size, offset + limit)
+        detail = f"showing bytes {offset}-{end - 1} of {index.size}"
+        if end < index.size:
+            detail += f"; next offset: {end}"
+        return self._header(file_path, index, detail) + data[offset:end].decode("utf-8", errors="replace")
+
+    def _grep(
+        self, file_path: str, data: mmap.mmap, index: _LineIndex, pattern: str, offset: int, limit: int
+    ) -> str:
+        limit = limit or DEFAULT_MATCH_LIMIT
+        # MULTILINE so ``^`` and ``$`` anchor at line boundaries, as in grep.
+        try:
+            regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+        except re.error:
+            regex = re.compile(re.escape(pattern.encode("utf-8")))
+
+        start = self._line_start(data, index, offset)
+        line_number = offset
+        counted_to = start
+        matches: list[str] = []
+        used = 0
+        next_offset: int | None = None
+        position = start
+        while position < index.size:
+            match = regex.search(data, position)
+            if match is None:
+                break
+            line_start = data.rfind(b"\n", 0, match.start()) + 1
+            line_end = data.find(b"\n", match.start())
+            line_end = index.size if line_end < 0 else line_end
+            line_number += _count_newlines(data, index, counted_to, line_start)
+            counted_to = line_start
+            if len(matches) >= limit:
+                next_offset = line_number
+                break
+            text = data[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")
+            entry = f"{line_number + 1}: {text[:MAX_MATCH_LINE_CHARS]}"
+            if used + len(entry) > self.max_chars:
+                next_offset = line_number
+                break
+            matches.append(entry)
+            used += len(entry) + 1
+            position = line_end + 1
+
+        detail = f"{len(matches)} matching lines for {pattern!r} from line {offset + 1}"
+        if next_offset is not None:
+            detail += f"; more matches, next offset: {next_offset}"
+        return self._header(file_path, index, detail) + "\n".join(matches)
 
 
 def create_read_file_tool(root_dir: Path) -> BaseTool:
-    return ReadFileTool(root_dir=str(root_dir))
+    reader = FileReader(root_dir=root_dir)
+
+    @tool("read_file")
+    def read_file(file_path: str, offset: int = 0, limit: int = 0, mode: str = "lines", pattern: str = "") -> str:
+        """Read a file under the backend root, one page at a time.
+
+        mode="lines" (default): skip `offset` lines and return up to `limit` lines (default 200).
+        mode="bytes": return up to `limit` bytes starting at byte `offset`.
+        mode="grep": return lines matching the regex `pattern`, starting at line `offset`, up to `limit` matches.
+        The header reports file size, total line count and the next offset to continue paging.
+        """
+        return reader.read(file_path, offset=offset, limit=limit, mode=mode, pattern=pattern)
+
+    return read_file
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+
+BOILERPLATE_TAGS = frozenset(
+    {
+        "aside",
+        "button",
+        "footer",
+        "form",
+        "head",
+        "header",
+        "iframe",
+        "nav",
+        "noscript",
+        "script",
+        "select",
+        "style",
+        "svg",
+        "template",
+    }
+)
+_PARAGRAPH_TAGS = frozenset(
+    {"article", "blockquote", "dl", "figure", "main", "ol", "p", "section", "table", "ul"}
+)
+_LINE_TAGS = frozenset({"br", "div", "dd", "dt", "tr"})
+# A <header> inside these is the content's own title block, not site chrome.
+_CONTENT_TAGS = frozenset({"article", "main"})
+_VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+)
+_HEADINGS = {f"h{level}": level for level in range(1, 7)}
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_SPACES = re.compile(r"[ \t]+\n")
+
+
+class _BudgetReached(Exception):
+    pass
+
+
+class MarkdownExtractor(HTMLParser):
+    """Incremental HTML to Markdown converter with a hard output budget.
+
+    Boilerplate subtrees are dropped while parsing; one left unclosed ends when
+    an element opened before it closes. Once ``budget`` characters have been
+    emitted the extractor stops, and ``feed`` ignores further input.
+    """
+
+    def __init__(self, budget: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.budget = budget
+        self.done = False
+        self._parts: list[str] = []
+        self._length = 0
+        self._pending_break = ""
+        self._at_line_start = True
+        # Open elements outside skipped subtrees, and the open skipped subtree.
+        self._open: list[str] = []
+        self._skipped: list[str] = []
+        self._pre_depth = 0
+        self._lists: list[int | None] = []
+        self._link_href: str | None = None
+        self._link_text: list[str] | None = None
+        self._row_cells = 0
+
+    def feed(self, data: str) -> None:
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except _BudgetReached:
+            self.done = True
+
+    def close(self) -> None:
+        if self.done:
+            return
+        try:
+            super().close()
+            self._flush_link()
+        except _BudgetReached:
+            self.done = True
+
+    @property
+    def text(self) -> str:
+        return _TRAILING_SPACES.sub("\n", "".join(self._parts)).strip()
+
+    def _break(self, separator: str) -> None:
+        if self._length and len(separator) > len(self._pending_break):
+            self._pending_break = separator
+
+    def _write(self, text: str) -> None:
+        if not text:
+            return
+        if self._link_text is not None:
+            self._link_text.append(text)
+            return
+        if self._pending_break:
+            text = self._pending_break + text
+            self._pending_break = ""
+        remaining = self.budget - self._length
+        if len(text) >= remaining:
+            self._parts.append(text[:remaining])
+            self._length = self.budget
+            raise _BudgetReached
+        self._parts.append(text)
+        self._length += len(text)
+        self._at_line_start = text.endswith("\n")
+
+    def _flush_link(self) -> None:
+        if self._link_text is None:
+            return
+        label = _WHITESPACE.sub(" ", "".join(self._link_text)).strip()
+        href = self._link_href
+        self._link_text = None
+        self._link_href = None
+        if label:
+            self._write(f"[{label}]({href})")
+
+    def _is_boilerplate(self, tag: str) -> bool:
+        if tag == "header":
+            return not any(name in _CONTENT_TAGS for name in self._open)
+        return tag in BOILERPLATE_TAGS
+
+    @staticmethod
+    def _pop_to(stack: list[str], tag: str) -> None:
+        del stack[len(stack) - 1 - stack[::-1].index(tag) :]
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self._skipped or self._is_boilerplate(tag):
+            if tag not in _VOID_TAGS:
+                self._skipped.append(tag)
+            return
+        if tag not in _VOID_TAGS:
+            self._open.append(tag)
+
+        if tag in _HEADINGS:
+            self._break("\n\n")
+            self._write("#" * _HEADINGS[tag] + " ")
+        elif tag == "pre":
+            self._break("\n\n")
+            self._write("```\n")
+            self._pre_depth += 1
+        elif tag in ("ul", "ol"):
+            self._break("\n\n" if not self._lists else "\n")
+            self._lists.append(0 if tag == "ol" else None)
+        elif tag == "li":
+            self._break("\n")
+            marker = "- "
+            if self._lists and self._lists[-1] is not None:
+                self._lists[-1] += 1
+                marker = f"{self._lists[-1]}. "
+            self._write("  " * max(0, len(self._lists) - 1) + marker)
+        elif tag == "tr":
+            self._break("\n")
+            self._row_cells = 0
+        elif tag in ("td", "th"):
+            if self._row_cells:
+                self._write(" | ")
+            self._row_cells += 1
+        elif tag == "code" and not self._pre_depth:
+            self._write("`")
+        elif tag == "a":
+            href = dict(attrs).get("href") or ""
+            if href and not href.startswith(("#", "javascript:")):
+                self._link_href = href
+                self._link_text = []
+        elif tag == "hr":
+            self._break("\n\n")
+            self._write("---")
+            self._break("\n\n")
+        elif tag in _PARAGRAPH_TAGS:
+            self._break("\n\n")
+        elif tag in _LINE_TAGS:
+            self._break("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skipped:
+            if tag in self._skipped:
+                self._pop_to(self._skipped, tag)
+                return
+            if tag not in self._open:
+                return
+            # Closes an element opened before the skipped subtree, so its root was never closed.
+            self._skipped.clear()
+        if tag in self._open:
+            self._pop_to(self._open, tag)
+
+        if tag == "a":
+            self._flush_link()
+        elif tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+            if not self._at_line_start:
+                self._write("\n")
+            self._write("```")
+            self._break("\n\n")
+        elif tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+            self._break("\n\n" if not self._lists else "\n")
+        elif tag == "code" and not self._pre_depth:
+            self._write("`")
+        elif tag in _HEADINGS or tag in _PARAGRAPH_TAGS:
+            self._break("\n\n")
+        elif tag in _LINE_TAGS or tag == "li":
+            self._break("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._skipped or not data:
+            return
+        if self._pre_depth:
+            self._write(data)
+            return
+        text = _WHITESPACE.sub(" ", data)
+        if self._at_line_start or self._pending_break:
+            text = text.lstrip()
+        if text.strip():
+            self._write(text)
+        elif text and not self._at_line_start and self._link_text is None:
+            self._write(" ")
+
+
+def html_to_markdown(html: str, budget: int, chunk_size: int = 16_384) -> tuple[str, bool]:
+    """Convert ``html`` in one pass; returns the Markdown and whether the budget cut it short."""
+    extractor = MarkdownExtractor(budget)
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start : start + chunk_size])
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.text, extractor.done
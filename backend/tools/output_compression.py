@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.tools import BaseTool, tool
+
+from backend.services.blob_store import BlobStore
+from backend.services.bm25_index import tokenize
+from backend.services.token_budget import Tokenizer, get_tokenizer
+from backend.tools.file_tool import FileReader
+
+# Token budget per tool for what goes back into the model context; unlisted tools pass through.
+DEFAULT_TOOL_BUDGETS = {
+    "fetch_url": 800,
+    "fetch_urls": 1_500,
+    "terminal": 800,
+    "python_repl": 800,
+    "search_knowledge_base": 1_000,
+    "read_file": 1_500,
+}
+HEAD_UNITS = 3
+TAIL_UNITS = 2
+_LONG_LINE_CHARS = 400
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？；;])\s*")
+
+
+def split_units(text: str) -> list[str]:
+    """Lines, with long prose lines split further into sentences."""
+    units: list[str] = []
+    for line in text.splitlines():
+        if len(line) <= _LONG_LINE_CHARS:
+            units.append(line)
+            continue
+        units.extend(part for part in _SENTENCE_END.split(line) if part)
+    return units
+
+
+def _scores(units: list[str], query: str, k1: float = 1.2, b: float = 0.75) -> list[float]:
+    terms = set(tokenize(query))
+    counts = [Counter(tokenize(unit)) for unit in units]
+    if not terms or not units:
+        return [0.0] * len(units)
+    lengths = [sum(count.values()) for count in counts]
+    avg = max(sum(lengths) / len(units), 1.0)
+    df = Counter(term for count in counts for term in terms if term in count)
+    idf = {term: math.log(1.0 + (len(units) - df[term] + 0.5) / (df[term] + 0.5)) for term in df}
+    scores: list[float] = []
+    for count, length in zip(counts, lengths):
+        norm = k1 * (1.0 - b + b * length / avg)
+        scores.append(sum(idf[term] * count[term] * (k1 + 1.0) / (count[term] + norm) for term in idf if term in count))
+    return scores
+
+
+def cut_unit(unit: str, max_tokens: int, tokenizer: Tokenizer) -> str:
+    """Head and tail of one oversized unit (minified JSON, base64, unbroken CJK) within ``max_tokens``."""
+    chars = len(unit) * max_tokens // max(tokenizer.count(unit), 1)
+    while chars > 0:
+        head, tail = unit[: chars // 2], unit[len(unit) - chars // 2 :]
+        cut = f"{head} [... {len(unit) - 2 * (chars // 2)} chars omitted ...] {tail}"
+        if tokenizer.count(cut) + 1 <= max_tokens:
+            return cut
+        chars = chars * 3 // 4
+    return ""
+
+
+def compress_text(text: str, query: str, budget: int, tokenizer: Tokenizer) -> tuple[str, int, int]:
+    """Keep the head, the tail and the units most relevant to ``query`` within ``budget`` tokens.
+
+    Returns (text, kept units, total units); omitted runs become a one-line marker.
+    Units too large to ever fit are cut to their own head and tail first.
+    """
+    units = split_units(text)
+    costs = [tokenizer.count(unit) + 1 for unit in units]
+    unit_cap = budget if len(units) == 1 else budget // 2
+    for index, cost in enumerate(costs):
+        if cost > unit_cap:
+            units[index] = cut_unit(units[index], unit_cap, tokenizer)
+            costs[index] = tokenizer.count(units[index]) + 1
+    keep: set[int] = set()
+    used = 0
+
+    def take(index: int) -> None:
+        nonlocal used
+        if index not in keep and used + costs[index] <= budget:
+            keep.add(index)
+            used += costs[index]
+
+    for index in [*range(min(HEAD_UNITS, len(units))), *range(max(0, len(units) - TAIL_UNITS), len(units))]:
+        take(index)
+    scores = _scores(units, query)
+    for index in sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i]):
+        take(index)
+    # Leftover budget goes to the leading context, which is what a plain head cut would have kept.
+    for index in range(len(units)):
+        take(index)
+
+    lines: list[str] = []
+    skipped = 0
+    for index, unit in enumerate(units):
+        if index in keep:
+            if skipped:
+                lines.append(f"[... {skipped} lines omitted ...]")
+                skipped = 0
+            lines.append(unit)
+        else:
+            skipped += 1
+    if skipped:
+        lines.append(f"[... {skipped} lines omitted ...]")
+    return "\n".join(lines), len(keep), len(units)
+
+
+class ToolOutputStore:
+    """Full tool outputs as session blobs, exposed to the model as ``out_<key>`` references."""
+
+    def __init__(self, blob_store: BlobStore) -> None:
+        self.blob_store = blob_store
+        self.reader = FileReader(root_dir=blob_store.root)
+
+    def put(self, text: str) -> str:
+        return f"out_{self.blob_store.put(text)}"
+
+    def read(self, ref: str, offset: int = 0, limit: int = 0, mode: str = "lines", pattern: str = "") -> str:
+        key = ref.strip().removeprefix("out_")
+        if not BlobStore.is_key(key):
+            return f"Error: unknown tool output reference: {ref}"
+        relative = self.blob_store.path_for(key).relative_to(self.blob_store.root).as_posix()
+        return self.reader.read(relative, offset=offset, limit=limit, mode=mode, pattern=pattern)
+
+
+def _latest_user_message(state: Any) -> str:
+    messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", [])
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            if isinstance(message.content, str):
+                return message.content
+            return " ".join(block.get("text", "") for block in message.content if isinstance(block, dict))
+    return ""
+
+
+class ToolOutputCompressionMiddleware(AgentMiddleware):
+    """Shrink large tool results to the parts relevant to the user's request.
+
+    The model sees the compressed text plus a reference; ``read_tool_output``
+    pages through the full result. Streamed tool events and the saved session
+    still carry the raw output.
+    """
+
+    def __init__(
+        self,
+        store: ToolOutputStore,
+        budgets: dict[str, int] | None = None,
+        tokenizer: Tokenizer | None = None,
+    ) -> None:
+        super().__init__()
+        self.store = store
+        self.budgets = dict(DEFAULT_TOOL_BUDGETS if budgets is None else budgets)
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer()
+        return self._tokenizer
+
+    def compress(self, request: ToolCallRequest, result: Any) -> Any:
+        if not isinstance(result, ToolMessage) or not isinstance(result.content, str):
+            return result
+        name = str(request.tool_call.get("name", ""))
+        args = request.tool_call.get("args") or {}
+        budget = self.budgets.get(name)
+        # Skill files are instructions the agent must follow verbatim.
+        if budget is None or (name == "read_file" and str(args.get("file_path", "")).endswith("SKILL.md")):
+            return result
+        total = self.tokenizer.count(result.content)
+        if total <= budget:
+            return result
+
+        query = f"{_latest_user_message(request.state)}\n{json.dumps(args, ensure_ascii=False)}"
+        text, kept, units = compress_text(result.content, query, budget, self.tokenizer)
+        ref = self.store.put(result.content)
+        footer = (
+            f"[compressed: kept {kept} of {units} lines most relevant to the request, "
+            f"{self.tokenizer.count(text)} of {total} tokens; full output: read_tool_output(ref=\"{ref}\")]"
+        )
+        return result.model_copy(update={"content": f"{text}\n{footer}"})
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], Any]) -> Any:
+        return self.compress(request, handler(request))
+
+    async def awrap_tool_call(
+        self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], Awaitable[Any]]
+    ) -> Any:
+        return self.compress(request, await handler(request))
+
+
+def create_read_tool_output_tool(store: ToolOutputStore) -> BaseTool:
+    @tool("read_tool_output")
+    def read_tool_output(ref: str, offset: int = 0, limit: int = 0, mode: str = "lines", pattern: str = "") -> str:
+        """Read the full output of an earlier tool call that was shown compressed.
+
+        `ref` comes from the "[compressed: ...]" footer. Paging works like read_file:
+        mode="lines" | "bytes" | "grep" with `offset`, `limit` and `pattern`.
+        """
+        return store.read(ref, offset=offset, limit=limit, mode=mode, pattern=pattern)
+
+    return read_tool_output
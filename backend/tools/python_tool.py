@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import re
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, tool
+
+from backend.services.python_pool import DEFAULT_PRELOAD, PythonWorkerPool
+from backend.tools.runtime import session_id_from_config
+
+
+# Models often wrap code in markdown fences; a language tag only counts right after one.
+_OPENING_FENCE = re.compile(r"^\s*(?:`{3,}[ \t]*(?:python3?|py)?(?:[ \t]*\n|[ \t]+|$)|`+)", re.IGNORECASE)
+_CLOSING_FENCE = re.compile(r"`+\s*$")
+
+
+def sanitize_code(code: str) -> str:
+    code = _OPENING_FENCE.sub("", code, count=1)
+    return _CLOSING_FENCE.sub("", code, count=1).strip()
+
+
+def create_python_pool() -> PythonWorkerPool:
+    preload = os.getenv("PYTHON_REPL_PRELOAD")
+    return PythonWorkerPool(
+        workers=int(os.getenv("PYTHON_REPL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        preload=tuple(name.strip() for name in preload.split(",") if name.strip()) if preload else DEFAULT_PRELOAD,
+        cpu_seconds=int(os.getenv("PYTHON_REPL_CPU_SECONDS", "30")),
+        memory_mb=int(os.getenv("PYTHON_REPL_MEMORY_MB", "1024")),
+        timeout=float(os.getenv("PYTHON_REPL_TIMEOUT", "30")),
+        max_executions=int(os.getenv("PYTHON_REPL_MAX_EXECUTIONS", "100")),
+        max_output=int(os.getenv("PYTHON_REPL_MAX_OUTPUT", "8000")),
+        idle_seconds=float(os.getenv("PYTHON_REPL_IDLE_SECONDS", "1800")),
+        max_sessions_per_worker=int(os.getenv("PYTHON_REPL_SESSIONS_PER_WORKER", "32")),
+    )
+
+
+def create_python_repl_tool(pool: PythonWorkerPool | None = None) -> BaseTool:
+    worker_pool = pool if pool is not None else create_python_pool()
+
+    @tool("python_repl")
+    def python_repl(code: str, config: RunnableConfig) -> str:
+        """Run Python code in an isolated worker process. Variables persist within the session; use print() or end with an expression to see results."""
+        cleaned = sanitize_code(code)
+        if not cleaned:
+            return "No code provided."
+
+        result = worker_pool.execute(session_id_from_config(config), cleaned)
+        text = result.output
+        if result.error:
+            text = f"{text}\n{result.error}" if text else result.error
+        if result.namespace_reset:
+            text = f"{text}\n[worker restarted; session variables were reset]"
+        return text.strip() or "(no output)"
+
+    return python_repl
@@ -3,20 +3,33 @@ from __future__ import annotations
 from pathlib import Path
 
 from langchain_core.tools import BaseTool
-from langchain_experimental.tools import PythonREPLTool
 
 from backend.services.knowledge_service import KnowledgeService
-from backend.tools.fetch_tool import create_fetch_url_tool
+from backend.services.python_pool import PythonWorkerPool
+from backend.tools.fetch_tool import create_fetch_engine, create_fetch_url_tool, create_fetch_urls_tool
 from backend.tools.file_tool import create_read_file_tool
 from backend.tools.kb_tool import create_search_knowledge_tool
+from backend.tools.output_compression import ToolOutputStore, create_read_tool_output_tool
+from backend.tools.python_tool import create_python_repl_tool
 from backend.tools.terminal_tool import create_terminal_tool
 
 
-def build_core_tools(root_dir: Path, knowledge_service: KnowledgeService) -> list[BaseTool]:
-    return [
+def build_core_tools(
+    root_dir: Path,
+    knowledge_service: KnowledgeService,
+    fetch_cache_dir: Path | None = None,
+    python_pool: PythonWorkerPool | None = None,
+    output_store: ToolOutputStore | None = None,
+) -> list[BaseTool]:
+    fetch_engine = create_fetch_engine(cache_dir=fetch_cache_dir)
+    tools = [
         create_terminal_tool(root_dir=root_dir),
-        PythonREPLTool(),
-        create_fetch_url_tool(),
+        create_python_repl_tool(pool=python_pool),
+        create_fetch_url_tool(engine=fetch_engine),
+        create_fetch_urls_tool(engine=fetch_engine),
         create_read_file_tool(root_dir=root_dir),
         create_search_knowledge_tool(knowledge_service=knowledge_service),
     ]
+    if output_store is not None:
+        tools.append(create_read_tool_output_tool(output_store))
+    return tools
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from langchain_core.runnables import RunnableConfig
+
+
+def session_id_from_config(config: RunnableConfig | None) -> str:
+    """Session id that AgentService passes to tools through the run config."""
+    configurable = (config or {}).get("configurable") or {}
+    return str(configurable.get("session_id") or "default")
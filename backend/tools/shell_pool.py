@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import re
+import select
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShellResult:
+    output: str
+    exit_code: int | None
+    timed_out: bool = False
+    truncated: bool = False
+    restarted: bool = False
+    elapsed_ms: float = 0.0
+
+
+class ShellWorker:
+    """A long-lived bash process; cwd, variables and exports persist between commands."""
+
+    def __init__(self, root_dir: Path) -> None:
+        self.root_dir = root_dir
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._marker = f"__MINI_OPENCLAW_DONE_{uuid.uuid4().hex}__".encode()
+        self._done_pattern = re.compile(rb"\n" + re.escape(self._marker) + rb" (\d+)\n")
+        self.process = subprocess.Popen(
+            ["/bin/bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=str(root_dir),
+            start_new_session=True,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self) -> None:
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            if stream is not None:
+                stream.close()
+
+    def run(self, command: str, timeout: float, max_output: int, drain_limit: int) -> ShellResult:
+        """Run ``command`` and keep at most ``max_output`` bytes of its output.
+
+        Output past ``max_output`` is read and discarded so the command can finish.
+        If it produces more than ``drain_limit`` bytes, or runs past ``timeout``,
+        the worker is killed; the caller must then replace it.
+        """
+        started = time.monotonic()
+        self.last_used = started
+        # eval keeps syntax errors from terminating the shell; stdin is detached so
+        # the command cannot swallow the completion marker.
+        script = (
+            f"{{ eval {shlex.quote(command)}\n}} < /dev/null 2>&1\n"
+            f"printf '\\n%s %s\\n' {self._marker.decode()} \"$?\"\n"
+        )
+        assert self.process.stdin is not None and self.process.stdout is not None
+        try:
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            return ShellResult(output="Shell worker exited.", exit_code=None, restarted=True)
+
+        fd = self.process.stdout.fileno()
+        head = bytearray()
+        pending = b""
+        received = 0
+        deadline = started + timeout
+        # Bytes that could still be the start of the marker are held back.
+        window = len(self._marker) + 32
+
+        def finish(exit_code: int | None, timed_out: bool = False, killed: bool = False) -> ShellResult:
+            self.last_used = time.monotonic()
+            return ShellResult(
+                output=bytes(head).decode("utf-8", errors="replace"),
+                exit_code=exit_code,
+                timed_out=timed_out,
+                truncated=received > max_output,
+                restarted=killed,
+                elapsed_ms=(self.last_used - started) * 1000.0,
+            )
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.kill()
+                return finish(None, timed_out=True, killed=True)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65_536)
+            if not chunk:
+                self.kill()
+                return finish(None, killed=True)
+
+            pending += chunk
+            match = self._done_pattern.search(pending)
+            if match is not None:
+                body = pending[: match.start()]
+                self._keep(head, body, max_output)
+                received += len(body)
+                return finish(int(match.group(1)))
+
+            committed, pending = pending[:-window], pending[-window:]
+            self._keep(head, committed, max_output)
+            received += len(committed)
+            if received > drain_limit:
+                self.kill()
+                return finish(None, killed=True)
+
+    @staticmethod
+    def _keep(head: bytearray, chunk: bytes, max_output: int) -> None:
+        room = max_output - len(head)
+        if room > 0:
+            head.extend(chunk[:room])
+
+
+class ShellPool:
+    """One ShellWorker per session, evicted after ``idle_seconds`` or when the pool is full.
+
+    A daemon thread started with the first worker reaps idle workers, so shells
+    of finished sessions do not live until the process exits.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        max_workers: int = 16,
+        idle_seconds: float = 600.0,
+        timeout: float = 60.0,
+        max_output: int = 8_000,
+        drain_limit: int = 1_000_000,
+    ) -> None:
+        self.root_dir = root_dir
+        self.max_workers = max_workers
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.max_output = max_output
+        self.drain_limit = drain_limit
+        self._workers: OrderedDict[str, ShellWorker] = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper: threading.Thread | None = None
+        atexit.register(self.close)
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    def _is_stale(self, worker: ShellWorker, now: float) -> bool:
+        if not worker.alive:
+            return True
+        return now - worker.last_used > self.idle_seconds and not worker.lock.locked()
+
+    def _evict_locked(self) -> list[ShellWorker]:
+        now = time.monotonic()
+        evicted = [
+            self._workers.pop(session_id)
+            for session_id, worker in list(self._workers.items())
+            if self._is_stale(worker, now)
+        ]
+        # Least recently used first; busy workers are never evicted mid-command.
+        for session_id, worker in list(self._workers.items()):
+            if len(self._workers) < self.max_workers:
+                break
+            if not worker.lock.locked():
+                evicted.append(self._workers.pop(session_id))
+        return evicted
+
+    def _checkout(self, session_id: str) -> ShellWorker:
+        with self._lock:
+            worker = self._workers.get(session_id)
+            evicted: list[ShellWorker] = []
+            if worker is None or not worker.alive:
+                self._workers.pop(session_id, None)
+                evicted = self._evict_locked()
+                worker = ShellWorker(self.root_dir)
+                self._workers[session_id] = worker
+                self._start_reaper()
+            worker.last_used = time.monotonic()
+            self._workers.move_to_end(session_id)
+        for stale in evicted:
+            logger.info("Evicting shell worker pid=%s", stale.process.pid)
+            stale.kill()
+        return worker
+
+    def run(self, session_id: str, command: str, timeout: float | None = None) -> ShellResult:
+        worker = self._checkout(session_id)
+        with worker.lock:
+            result = worker.run(
+                command,
+                timeout=timeout or self.timeout,
+                max_output=self.max_output,
+                drain_limit=self.drain_limit,
+            )
+        if result.restarted:
+            with self._lock:
+                if self._workers.get(session_id) is worker:
+                    del self._workers[session_id]
+        return result
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None and not self._closed.is_set():
+            self._reaper = threading.Thread(target=self._reap, name="shell-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        while not self._closed.wait(min(max(self.idle_seconds / 2, 0.05), 60.0)):
+            try:
+                evicted = self.evict_idle()
+            except Exception:  # pragma: no cover - keep reaping after unexpected errors
+                logger.exception("Shell worker reaper failed")
+                continue
+            if evicted:
+                logger.info("Reaped %d idle shell workers", evicted)
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            evicted = [
+                self._workers.pop(session_id)
+                for session_id, worker in list(self._workers.items())
+                if self._is_stale(worker, time.monotonic())
+            ]
+        for worker in evicted:
+            worker.kill()
+        return len(evicted)
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import shlex
+import os
 from pathlib import Path
 
-from langchain_community.tools import ShellTool
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool, tool
 
+from backend.tools.runtime import session_id_from_config
+from backend.tools.shell_pool import ShellPool
+
 DANGEROUS_PATTERNS = (
     "rm -rf /",
     "mkfs",
@@ -17,12 +20,23 @@ DANGEROUS_PATTERNS = (
 )
 
 
-def create_terminal_tool(root_dir: Path) -> BaseTool:
-    shell_tool = ShellTool()
+def create_shell_pool(root_dir: Path) -> ShellPool:
+    return ShellPool(
+        root_dir=root_dir,
+        max_workers=int(os.getenv("TERMINAL_MAX_WORKERS", "16")),
+        idle_seconds=float(os.getenv("TERMINAL_IDLE_SECONDS", "600")),
+        timeout=float(os.getenv("TERMINAL_TIMEOUT", "60")),
+        max_output=int(os.getenv("TERMINAL_MAX_OUTPUT", "8000")),
+        drain_limit=int(os.getenv("TERMINAL_DRAIN_LIMIT", "1000000")),
+    )
+
+
+def create_terminal_tool(root_dir: Path, pool: ShellPool | None = None) -> BaseTool:
+    shell_pool = pool if pool is not None else create_shell_pool(root_dir)
 
     @tool("terminal")
-    def terminal(command: str) -> str:
-        """Execute shell commands in backend root with safety guards."""
+    def terminal(command: str, config: RunnableConfig) -> str:
+        """Execute shell commands in backend root with safety guards. Shell state (cwd, variables) persists within the session."""
         normalized = command.strip()
         if not normalized:
             return "No command provided."
@@ -33,11 +47,16 @@ def create_terminal_tool(root_dir: Path) -> BaseTool:
         if ".." in normalized:
             return "Blocked path traversal pattern in command."
 
-        wrapped = f"cd {shlex.quote(str(root_dir))} && {normalized}"
-        result = shell_tool.invoke({"commands": [wrapped]})
-        text = str(result)
-        if len(text) > 8_000:
-            return f"{text[:7990]}...[truncated]"
-        return text
+        result = shell_pool.run(session_id_from_config(config), normalized)
+        text = result.output
+        if result.truncated:
+            text = f"{text}...[truncated]"
+        if result.timed_out:
+            text = f"{text}\n[timed out after {shell_pool.timeout:.0f}s; shell state was reset]"
+        elif result.restarted:
+            text = f"{text}\n[command stopped; shell state was reset]"
+        elif result.exit_code:
+            text = f"{text}\n[exit code {result.exit_code}]"
+        return text.strip() or "(no output)"
 
     return terminal
@@ -62,6 +62,11 @@ function parseSkillPaths(snapshotContent: string): string[] {
 }
 
 function appendEventToTimeline(current: TimelineItem[], event: ChatEvent): TimelineItem[] {
+  if (event.type === "debug") {
+    console.debug(event.name, event.data);
+    return current;
+  }
+
   if (event.type === "thought") {
     const rawChunk = event.content ?? "";
     if (!rawChunk.trim()) {
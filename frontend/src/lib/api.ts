@@ -21,27 +21,56 @@ export async function getSession(sessionId: string): Promise<SessionEntry[]> {
   return payload.entries ?? [];
 }
 
+const fileCache = new Map<string, { etag: string; content: string }>();
+
 export async function readFile(path: string): Promise<string> {
+  const cached = fileCache.get(path);
   const response = await fetch(`${API_BASE}/api/files?path=${encodeURIComponent(path)}`, {
     cache: "no-store",
+    headers: cached ? { "If-None-Match": cached.etag } : undefined,
   });
+  if (response.status === 304 && cached) {
+    return cached.content;
+  }
   if (!response.ok) {
     throw new Error("读取文件失败");
   }
   const payload = await response.json();
-  return payload.content ?? "";
+  const content = payload.content ?? "";
+  if (payload.etag) {
+    fileCache.set(path, { etag: payload.etag, content });
+  }
+  return content;
+}
+
+export class FileConflictError extends Error {
+  readonly path: string;
+
+  constructor(path: string) {
+    super("文件已被其他地方修改，请重新加载后再保存");
+    this.path = path;
+  }
 }
 
 export async function saveFile(path: string, content: string): Promise<void> {
+  const cached = fileCache.get(path);
   const response = await fetch(`${API_BASE}/api/files`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ path, content }),
+    body: JSON.stringify({ path, content, base_etag: cached?.etag ?? null }),
   });
 
+  if (response.status === 409) {
+    fileCache.delete(path);
+    throw new FileConflictError(path);
+  }
   if (!response.ok) {
     throw new Error("保存文件失败");
   }
+  const payload = await response.json();
+  if (payload.etag) {
+    fileCache.set(path, { etag: payload.etag, content });
+  }
 }
 
 export async function createSession(sessionId: string): Promise<void> {
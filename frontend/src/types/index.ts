@@ -1,4 +1,4 @@
-export type ChatEventType = "thought" | "tool_call" | "tool_result" | "final" | "error";
+export type ChatEventType = "thought" | "tool_call" | "tool_result" | "final" | "error" | "debug";
 
 export interface ChatEvent {
   type: ChatEventType;
@@ -6,6 +6,7 @@ export interface ChatEvent {
   name?: string;
   input?: unknown;
   output?: string;
+  data?: unknown;
 }
 
 export interface SessionSummary {